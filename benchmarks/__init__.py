@@ -0,0 +1,3 @@
+"""
+Замеры производительности (запуск: python -m benchmarks.<имя_модуля>)
+"""
@@ -0,0 +1,71 @@
+"""
+Пропускная способность добавления расходов несколькими одновременными
+производителями (задачами asyncio):
+- синхронный SQLiteRepository через asyncio.to_thread (поток на вызов
+  из пула по умолчанию, транзакция на каждый расход);
+- AsyncSQLiteRepository (отдельный поток базы и групповая фиксация);
+- AsyncMemoryRepository.
+
+Запуск: python -m benchmarks.bench_async_repository [-p 16] [-n 500]
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from typing import Awaitable, Callable
+
+from bookkeeper.models.expense import Expense
+from bookkeeper.repository.async_memory_repository import AsyncMemoryRepository
+from bookkeeper.repository.async_sqlite_repository import AsyncSQLiteRepository
+from bookkeeper.repository.sqlite_repository import SQLiteRepository
+
+Add = Callable[[Expense], Awaitable[int]]
+
+
+async def produce(add: Add, producers: int, n: int) -> None:
+    """ producers задач, каждая добавляет n расходов по одному """
+    async def producer(number: int) -> None:
+        for i in range(n):
+            await add(Expense(amount=float(i), category=str(number), comment='bench'))
+
+    await asyncio.gather(*(producer(number) for number in range(producers)))
+
+
+def measure(add: Add, producers: int, n: int) -> float:
+    """ Вернуть число добавлений в секунду """
+    start = time.perf_counter()
+    asyncio.run(produce(add, producers, n))
+    return producers * n / (time.perf_counter() - start)
+
+
+def main() -> None:
+    """ Точка входа """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-p', '--producers', type=int, default=16,
+                        help='число производителей')
+    parser.add_argument('-n', type=int, default=500,
+                        help='число расходов от каждого производителя')
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        sync_repo = SQLiteRepository.repository_factory(
+            [Expense], os.path.join(tmp, 'sync.sqlite.db'))[Expense]
+        to_thread = measure(lambda obj: asyncio.to_thread(sync_repo.add, obj),
+                            args.producers, args.n)
+        sync_repo.pool.close()
+
+        async_repo = AsyncSQLiteRepository.repository_factory(
+            [Expense], os.path.join(tmp, 'async.sqlite.db'))[Expense]
+        threaded = measure(async_repo.add, args.producers, args.n)
+        async_repo.close()
+
+    memory = measure(AsyncMemoryRepository().add, args.producers, args.n)
+    print(f'sqlite, to_thread per call: {to_thread:10.0f} adds/s')
+    print(f'AsyncSQLiteRepository:      {threaded:10.0f} adds/s')
+    print(f'AsyncMemoryRepository:      {memory:10.0f} adds/s')
+    print(f'speedup over to_thread:     {threaded / to_thread:10.1f}x')
+
+
+if __name__ == '__main__':
+    main()
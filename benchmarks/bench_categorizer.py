@@ -0,0 +1,146 @@
+"""
+Категоризация расходов по правилам (см. bookkeeper.categorizer)
+
+Синтетический набор из --rules правил по дереву категорий benchmarks.ledger:
+подстроки (названия магазинов), регулярные выражения с обязательной
+подстрокой, несколько выражений без нее и правила по диапазону сумм.
+Тексты расходов содержат название магазина из правил или случайный текст.
+
+Замеряются:
+- компиляция правил;
+- проверка правил по одному на --naive текстах (как без компиляции);
+- Categorizer.classify в одном процессе на --single текстах;
+- Categorizer.classify_many в пуле процессов на всех --rows текстах.
+
+Запуск: python -m benchmarks.bench_categorizer [--rows 1000000] [--rules 10000]
+        [--processes 4]
+"""
+
+import argparse
+import os
+import random
+import re
+import string
+import time
+
+from benchmarks.ledger import category_tree
+from bookkeeper.categorizer import Categorizer, Rule
+from bookkeeper.models.category import Category
+from bookkeeper.repository.memory_repository import MemoryRepository
+
+
+def word(rng: random.Random) -> str:
+    """ Случайное слово из 5-10 букв """
+    return ''.join(rng.choices(string.ascii_lowercase, k=rng.randint(5, 10)))
+
+
+def generate_rules(n: int, names: list[str], seed: int) -> tuple[list[Rule], list[str]]:
+    """ n правил и названия магазинов, на которые они срабатывают """
+    rng = random.Random(seed)
+    rules = []
+    merchants = []
+    for number in range(n):
+        category = rng.choice(names)
+        merchant = f'{word(rng)} {word(rng)}'
+        kind = number % 100
+        if kind < 90:
+            rules.append(Rule(category, merchant))
+        elif kind < 98:
+            rules.append(Rule(category, rf'{re.escape(merchant)}\s*#?\d+',
+                              kind='regex'))
+            merchant += f' #{rng.randrange(1000)}'
+        elif kind < 99:
+            code = rng.randrange(10 ** 6)
+            rules.append(Rule(category, rf'(?:ref|id){code:06d}\b', kind='regex'))
+            merchant = f'ref{code:06d}'
+        else:
+            low = rng.uniform(10_000, 100_000)
+            rules.append(Rule(category, min_amount=low, max_amount=low * 1.01))
+            continue
+        merchants.append(merchant)
+    return rules, merchants
+
+
+def generate_rows(n: int, merchants: list[str], seed: int) -> list[tuple[str, float]]:
+    """ n пар (текст, сумма); у 70% текстов есть название магазина из правил """
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(n):
+        if rng.random() < 0.7:
+            text = f'POS {rng.choice(merchants).upper()} card *{rng.randrange(10000):04d}'
+        else:
+            text = f'transfer {word(rng)} {rng.randrange(10 ** 6)}'
+        rows.append((text, round(rng.lognormvariate(6.2, 1.0), 2)))
+    return rows
+
+
+def classify_naive(rules: list[Rule],
+                   compiled: list[re.Pattern[str] | None],
+                   text: str,
+                   amount: float) -> str | None:
+    """ Проверить правила по одному, вернуть категорию первого подошедшего """
+    lowered = text.lower()
+    for rule, pattern in zip(rules, compiled):
+        if not rule.amount_matches(amount):
+            continue
+        if pattern is not None:
+            if pattern.search(text):
+                return rule.category
+        elif rule.pattern.lower() in lowered:
+            return rule.category
+    return None
+
+
+def report(name: str, rows: int, seconds: float) -> None:
+    """ Напечатать строку результата """
+    print(f'{name:28} {rows:>9} {seconds:9.2f} s {rows / seconds:12.0f} rows/s',
+          flush=True)
+
+
+def main() -> None:
+    """ Точка входа """
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000, help='число текстов')
+    parser.add_argument('--rules', type=int, default=10_000, help='число правил')
+    parser.add_argument('--naive', type=int, default=500,
+                        help='текстов для проверки правил по одному')
+    parser.add_argument('--single', type=int, default=100_000,
+                        help='текстов для замера в одном процессе')
+    parser.add_argument('--processes', type=int, default=os.cpu_count(),
+                        help='число процессов classify_many')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    cat_repo = MemoryRepository[Category]()
+    categories = Category.create_from_tree(category_tree(3, 5), cat_repo)
+    rules, merchants = generate_rules(args.rules, [cat.name for cat in categories],
+                                      args.seed)
+    rows = generate_rows(args.rows, merchants, args.seed)
+
+    start = time.perf_counter()
+    categorizer = Categorizer(rules, categories)
+    print(f'compile {len(rules)} rules: {time.perf_counter() - start:.2f} s')
+
+    compiled = [re.compile(rule.pattern, re.IGNORECASE) if rule.kind == 'regex'
+                else None for rule in rules]
+    sample = rows[:args.naive]
+    start = time.perf_counter()
+    for text, amount in sample:
+        classify_naive(rules, compiled, text, amount)
+    report('rules one by one', len(sample), time.perf_counter() - start)
+
+    sample = rows[:args.single]
+    start = time.perf_counter()
+    found = sum(categorizer.classify(text, amount) is not None for text, amount in sample)
+    report('compiled, 1 process', len(sample), time.perf_counter() - start)
+    print(f'classified {found / len(sample):.0%} of texts')
+
+    start = time.perf_counter()
+    categorizer.classify_many(rows, processes=args.processes)
+    report(f'compiled, {args.processes} processes', len(rows),
+           time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Суммы расходов по поддеревьям категорий: по одной категории
+(get_subcategories и выборка расходов каждой подкатегории) и
+сводка category_rollup по всем категориям сразу.
+
+Запуск: python -m benchmarks.bench_category_rollup
+        [--categories 5000] [-n 1000000] [--probes 20] [--seed 0]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.bench_category_tree import random_tree
+from bookkeeper.models.category import Category
+from bookkeeper.models.expense import Expense
+from bookkeeper.reports import category_rollup
+from bookkeeper.repository.abstract_repository import AbstractRepository
+from bookkeeper.repository.memory_repository import MemoryRepository
+from bookkeeper.repository.sqlite_repository import SQLiteRepository
+
+
+def subtree_total(category: Category,
+                  cat_repo: AbstractRepository[Category],
+                  expense_repo: AbstractRepository[Expense]) -> float:
+    """ Сумма по поддереву без сводки: запрос расходов на каждую подкатегорию """
+    total = 0.0
+    for cat in [category, *category.get_subcategories(cat_repo)]:
+        total += sum(e.amount for e in expense_repo.get_all(where={'category': cat.pk}))
+    return total
+
+
+def main() -> None:
+    """ Точка входа """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--categories', type=int, default=5000)
+    parser.add_argument('-n', type=int, default=1_000_000, help='число расходов')
+    parser.add_argument('--probes', type=int, default=20,
+                        help='число категорий для подсчета по одной')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    rnd = random.Random(args.seed)
+    cat_repo = MemoryRepository()
+    cat_repo.add_many(Category(cat.name, cat.parent) for cat in
+                      random_tree(args.categories, args.seed))
+    start_date = datetime(2023, 1, 1)
+    with tempfile.TemporaryDirectory() as tmp:
+        expense_repo = SQLiteRepository(Expense, os.path.join(tmp, 'bench.sqlite.db'))
+        expense_repo.add_many(
+            Expense(amount=rnd.randint(1, 1000), category=rnd.randint(1, args.categories),
+                    expense_date=start_date + timedelta(minutes=i))
+            for i in range(args.n))
+
+        probes = rnd.sample(cat_repo.get_all(), args.probes)
+        start = time.perf_counter()
+        expected = [subtree_total(cat, cat_repo, expense_repo) for cat in probes]
+        per_category = (time.perf_counter() - start) / args.probes
+
+        start = time.perf_counter()
+        report = category_rollup(cat_repo, expense_repo)
+        rollup = time.perf_counter() - start
+        expense_repo.pool.close()
+
+    nodes = {}
+    stack = list(report.items())
+    while stack:
+        pk, node = stack.pop()
+        nodes[pk] = node
+        stack.extend((key, value) for key, value in node.items() if isinstance(key, int))
+    assert [nodes[cat.pk]['total'] for cat in probes] == expected
+
+    print(f'{args.categories} categories, {args.n} expenses')
+    print(f'per category: {per_category:9.4f} s '
+          f'(all categories ~{per_category * args.categories:9.1f} s)')
+    print(f'rollup:       {rollup:9.4f} s for all categories')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Построение json-подобного дерева категорий из случайного дерева:
+поэлементная вставка с рекурсивным поиском родителя (прежние функции
+bookkeeper.utils, их копия - ниже) и однопроходный CategoryTree,
+а также поиск узлов и родителей.
+
+Запуск: python -m benchmarks.bench_category_tree [-n 10000] [--seed 0]
+"""
+
+import argparse
+import random
+import time
+from typing import Any, Callable
+
+from bookkeeper.models.category import Category
+from bookkeeper.utils import CategoryTree
+
+
+def random_tree(n: int, seed: int) -> list[Category]:
+    """ Случайное дерево из n категорий в топологическом порядке """
+    rnd = random.Random(seed)
+    cats = []
+    for pk in range(1, n + 1):
+        parent = rnd.randint(1, pk - 1) if pk > 1 and rnd.random() > 0.05 else None
+        cats.append(Category(f'category {pk}', parent, pk))
+    return cats
+
+
+def _get_elem_in_tree(tree: dict, pk: int) -> Any:
+    """ Поиск узла по id обходом всего дерева (прежняя версия) """
+    for key, value in tree.items():
+        if key != pk and isinstance(key, int):
+            item = _get_elem_in_tree(value, pk)
+            if item is not None:
+                return item
+        elif key == pk:
+            return value
+    return None
+
+
+def _get_elem_parent(tree: dict, pk: int, prev_parent: int | None = None) -> int | None:
+    """ Поиск id родителя обходом всего дерева (прежняя версия) """
+    for key, value in tree.items():
+        if key != pk and isinstance(key, int):
+            parent = _get_elem_parent(value, pk, key)
+            if parent is not None:
+                return parent
+        elif key == pk:
+            return prev_parent
+    return None
+
+
+def _set_elem_in_tree(tree: dict, elem: Category) -> None:
+    """ Вставка элемента с рекурсивным поиском родителя (прежняя версия) """
+    if elem.parent is None:
+        tree[elem.pk] = {"name": elem.name}
+    elif isinstance(tree, dict):
+        for key, value in tree.items():
+            if key != elem.parent:
+                _set_elem_in_tree(value, elem)
+            else:
+                value[elem.pk] = {"name": elem.name}
+                break
+
+
+def recursive_build(cats: list[Category]) -> dict[Any, Any]:
+    """ Построение дерева вставкой каждого элемента с обходом всего дерева """
+    tree: dict[Any, Any] = {}
+    for cat in cats:
+        _set_elem_in_tree(tree, cat)
+    return tree
+
+
+def timed(func: Callable[[], Any]) -> tuple[float, Any]:
+    """ Время выполнения функции в секундах и ее результат """
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def main() -> None:
+    """ Точка входа """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-n', type=int, default=10000, help='число категорий')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--lookups', type=int, default=200,
+                        help='число поисков узла и родителя')
+    args = parser.parse_args()
+    cats = random_tree(args.n, args.seed)
+    shuffled = random.Random(args.seed).sample(cats, len(cats))
+    probes = [cat.pk for cat in random.Random(args.seed).sample(cats, args.lookups)]
+
+    old_build, old_tree = timed(lambda: recursive_build(cats))
+    new_build, index = timed(lambda: CategoryTree(shuffled))
+    assert index.tree == old_tree
+    old_lookup, _ = timed(lambda: [(_get_elem_in_tree(old_tree, pk),
+                                    _get_elem_parent(old_tree, pk)) for pk in probes])
+    new_lookup, _ = timed(lambda: [(index.get(pk), index.parent(pk)) for pk in probes])
+
+    print(f'{args.n} categories, {args.lookups} lookups')
+    print(f'build   recursive: {old_build:9.4f} s   CategoryTree: {new_build:9.4f} s')
+    print(f'lookup  recursive: {old_lookup:9.4f} s   CategoryTree: {new_lookup:9.4f} s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Сравнение задержки операций SQLiteRepository: соединение на каждый вызов
+(как было до появления пула) и общий пул долгоживущих соединений.
+
+Запуск: python -m benchmarks.bench_connection_pool [-n 2000]
+"""
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+from bookkeeper.repository.sqlite_repository import SQLiteRepository
+
+
+@dataclass
+class Row:
+    """ Тестовая модель """
+    amount: float = 0.0
+    comment: str = ''
+    pk: int = 0
+
+
+def connect_per_call(db_file: str, n: int) -> None:
+    """ Вставка и чтение с новым соединением и PRAGMA на каждую операцию """
+    for i in range(n):
+        with sqlite3.connect(db_file) as con:
+            con.execute('PRAGMA foreign_keys = ON')
+            cur = con.execute('INSERT INTO row (amount, comment) VALUES (?, ?)',
+                              (float(i), 'x'))
+            pk = cur.lastrowid
+        con.close()
+        with sqlite3.connect(db_file) as con:
+            con.execute('SELECT * FROM row WHERE pk = ?', (pk,)).fetchone()
+        con.close()
+
+
+def pooled(db_file: str, n: int) -> None:
+    """ Те же операции через репозиторий с пулом соединений """
+    repo = SQLiteRepository.repository_factory([Row], db_file)[Row]
+    for i in range(n):
+        pk = repo.add(Row(amount=float(i), comment='x'))
+        repo.get(pk)
+    repo.pool.close()
+
+
+def measure(func: Callable[[str, int], None], n: int) -> float:
+    """ Вернуть среднее время одной операции в микросекундах """
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = os.path.join(tmp, 'bench.sqlite.db')
+        SQLiteRepository(Row, db_file).pool.close()
+        start = time.perf_counter()
+        func(db_file, n)
+        elapsed = time.perf_counter() - start
+    return elapsed / (2 * n) * 1e6
+
+
+def main() -> None:
+    """ Точка входа """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-n', type=int, default=2000, help='число пар add/get')
+    args = parser.parse_args()
+    before = measure(connect_per_call, args.n)
+    after = measure(pooled, args.n)
+    print(f'connect per call: {before:8.1f} us/op')
+    print(f'connection pool:  {after:8.1f} us/op')
+    print(f'speedup:          {before / after:8.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+Импорт выписки CSV (см. bookkeeper.importer) в сравнении с добавлением
+расходов по одному, как при вводе в окне программы: поиск категории
+запросом get_all({'name': ...}) и add на каждую строку.
+
+Выписка из n синтетических расходов (см. benchmarks.ledger) записывается
+во временный файл; оба способа пишут в новую базу sqlite.
+
+Запуск: python -m benchmarks.bench_importer [-n 50000] [--batch-size 1000]
+"""
+
+import argparse
+import csv
+import os
+import tempfile
+import time
+
+from benchmarks.ledger import create_categories, generate_expenses
+from bookkeeper.importer import ExpenseImporter, parse_amount, parse_date, read_csv
+from bookkeeper.models.category import Category
+from bookkeeper.models.expense import Expense
+from bookkeeper.repository.sqlite_repository import SQLiteRepository
+
+
+def write_statement(path: str, expenses: list[Expense]) -> None:
+    """ Записать расходы в CSV с разделителем ';' и датами дд.мм.гггг чч:мм """
+    with open(path, 'w', encoding='utf-8', newline='') as file:
+        writer = csv.writer(file, delimiter=';')
+        writer.writerow(['date', 'amount', 'category', 'comment'])
+        for expense in expenses:
+            writer.writerow([expense.expense_date.strftime('%d.%m.%Y %H:%M'),
+                             f'{expense.amount:.2f}'.replace('.', ','),
+                             expense.category, expense.comment])
+
+
+def repositories(tmp: str, name: str, profile: str | None,
+                 depth: int, fanout: int) -> dict[type, SQLiteRepository]:
+    """ Новая база с деревом категорий """
+    repos = SQLiteRepository.repository_factory(
+        [Category, Expense], os.path.join(tmp, name), profile=profile)
+    create_categories(repos[Category], depth, fanout)
+    return repos
+
+
+def import_one_by_one(path: str, repos: dict[type, SQLiteRepository]) -> int:
+    """ Добавить расходы из выписки по одному, вернуть их число """
+    count = 0
+    with open(path, encoding='utf-8', newline='') as file:
+        for _, row in read_csv(file):
+            category = repos[Category].get_all({'name': row['category']})[0]
+            repos[Expense].add(Expense(amount=parse_amount(row['amount']),
+                                       category=category.name,
+                                       expense_date=parse_date(row['date']),
+                                       comment=row['comment']))
+            count += 1
+    return count
+
+
+def main() -> None:
+    """ Точка входа """
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-n', type=int, default=50_000, help='строк в выписке')
+    parser.add_argument('--one-by-one', type=int, default=2000,
+                        help='строк для замера добавления по одному')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--profile', default='interactive',
+                        help='профиль хранения sqlite (см. storage_profile)')
+    parser.add_argument('--depth', type=int, default=3, help='глубина дерева категорий')
+    parser.add_argument('--fanout', type=int, default=5, help='подкатегорий у категории')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        repos = repositories(tmp, 'import.sqlite.db', args.profile,
+                             args.depth, args.fanout)
+        names = [cat.name for cat in repos[Category].get_all()]
+        expenses = generate_expenses(args.n, names)
+        statement = os.path.join(tmp, 'statement.csv')
+        write_statement(statement, expenses)
+
+        report = ExpenseImporter(repos[Category], repos[Expense],
+                                 batch_size=args.batch_size).import_file(statement)
+        print(f'importer:    {report.imported:>8} rows {report.seconds:8.2f} s '
+              f'{report.rows_per_second:10.0f} rows/s, '
+              f'rejected {len(report.rejected)}')
+        repos[Expense].pool.close()
+
+        small = os.path.join(tmp, 'small.csv')
+        write_statement(small, expenses[:args.one_by_one])
+        repos = repositories(tmp, 'one_by_one.sqlite.db', args.profile,
+                             args.depth, args.fanout)
+        start = time.perf_counter()
+        count = import_one_by_one(small, repos)
+        seconds = time.perf_counter() - start
+        print(f'one by one:  {count:>8} rows {seconds:8.2f} s '
+              f'{count / seconds:10.0f} rows/s')
+        repos[Expense].pool.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+Повторные выборки get_all(where=...) с разными значениями:
+SQL со значениями, подставленными в текст (как было раньше),
+и параметризованный SQL из кэша QueryBuilder.
+
+Запуск: python -m benchmarks.bench_query_builder [-n 20000] [--rows 10000]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from dataclasses import dataclass
+
+from bookkeeper.repository.sqlite_repository import SQLiteRepository
+
+
+@dataclass
+class Row:
+    """ Тестовая модель """
+    category: int = 0
+    comment: str = ''
+    pk: int = 0
+
+
+def interpolated(repo: SQLiteRepository[Row], n: int) -> None:
+    """ Каждое значение дает новый текст запроса """
+    parse = repo._SQLiteRepository__parse_query_to_class  # type: ignore
+    with repo.pool.connection() as con:
+        for i in range(n):
+            rows = con.execute(
+                f"SELECT * FROM row WHERE category = {i % 1000}").fetchall()
+            [parse(row) for row in rows]
+
+
+def parameterized(repo: SQLiteRepository[Row], n: int) -> None:
+    """ Один текст запроса на все значения """
+    with repo.pool.connection():
+        for i in range(n):
+            repo.get_all(where={'category': i % 1000})
+
+
+def main() -> None:
+    """ Точка входа """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-n', type=int, default=20000, help='число выборок')
+    parser.add_argument('--rows', type=int, default=10000, help='число строк в таблице')
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        repo = SQLiteRepository(Row, os.path.join(tmp, 'bench.sqlite.db'))
+        repo.add_many(Row(category=i % 1000, comment='x') for i in range(args.rows))
+        with repo.pool.connection() as con:
+            con.execute('CREATE INDEX row_category ON row (category)')
+        for name, func in (('interpolated', interpolated),
+                           ('parameterized', parameterized)):
+            start = time.perf_counter()
+            func(repo, args.n)
+            elapsed = time.perf_counter() - start
+            print(f'{name:14} {elapsed / args.n * 1e6:8.1f} us/query')
+        repo.pool.close()
+
+
+if __name__ == '__main__':
+    main()
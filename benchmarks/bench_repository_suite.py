@@ -0,0 +1,205 @@
+"""
+Набор замеров репозиториев на синтетических данных (см. benchmarks.ledger)
+
+Для каждого хранилища (memory, sqlite) и каждого числа расходов:
+- загрузка категорий, расходов и бюджетов (create_from_tree, add_many);
+- add, get, get_all(where) по категории и по диапазону дат, update, delete -
+  --ops операций на заполненной таблице;
+- построение дерева категорий (CategoryTree из bookkeeper.utils);
+- пересчет бюджетов, как при запуске приложения: суммы по дням из
+  aggregate, SpendTotals и последние бюджеты на день, неделю и месяц.
+
+Результаты печатаются таблицей и, если задан --output, записываются в JSON.
+С --baseline результаты сравниваются с предыдущим JSON: операции,
+ставшие медленнее более чем на --threshold, отмечаются как регрессии.
+
+Запуск: python -m benchmarks.bench_repository_suite
+        [--sizes 1000 10000 100000] [--backends memory sqlite]
+        [--output results.json] [--baseline old.json]
+"""
+
+import argparse
+from datetime import timedelta
+import json
+import os
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from typing import Any, Callable
+
+from benchmarks.ledger import (
+    END, category_tree, create_categories, generate_budgets, generate_expenses
+)
+from bookkeeper.models.budget import Budget
+from bookkeeper.models.category import Category
+from bookkeeper.models.expense import Expense
+from bookkeeper.repository.abstract_repository import AbstractRepository
+from bookkeeper.repository.memory_repository import MemoryRepository
+from bookkeeper.repository.query import Range
+from bookkeeper.repository.sqlite_repository import SQLiteRepository
+from bookkeeper.spend_totals import SpendTotals, fill_budgets, latest_budgets
+from bookkeeper.utils import CategoryTree
+
+Repos = dict[type, AbstractRepository[Any]]
+
+
+def memory_repos(_: str) -> Repos:
+    """ Репозитории в памяти с теми же индексами, что у таблиц sqlite """
+    return {Category: MemoryRepository(),
+            Expense: MemoryRepository({'expense_date': 'sorted', 'category': 'hash'}),
+            Budget: MemoryRepository({'duration': 'hash', 'end': 'sorted'})}
+
+
+def sqlite_repos(tmp: str, profile: str | None = None) -> Repos:
+    """ Репозитории sqlite в новом файле в каталоге tmp """
+    return SQLiteRepository.repository_factory(
+        [Category, Expense, Budget], os.path.join(tmp, 'suite.sqlite.db'),
+        profile=profile)
+
+
+def recalculate_budgets(expense_repo: AbstractRepository[Expense],
+                        budget_repo: AbstractRepository[Budget]) -> list[Budget]:
+    """ Пересчет бюджетов при запуске программы (см. Bookkeeper.__init__) """
+    totals = SpendTotals.from_repository(expense_repo,
+                                         clock=lambda: END - timedelta(hours=1))
+    return fill_budgets(latest_budgets(budget_repo), totals)
+
+
+class Recorder:
+    """ Собирает результаты замеров """
+
+    def __init__(self) -> None:
+        self.results: list[dict[str, Any]] = []
+
+    def measure(self, backend: str, rows: int, operation: str,
+                ops: int, func: Callable[[], Any]) -> Any:
+        """ Выполнить func, записать время и вернуть результат func """
+        start = time.perf_counter()
+        result = func()
+        seconds = time.perf_counter() - start
+        self.results.append({'backend': backend, 'rows': rows, 'operation': operation,
+                             'ops': ops, 'seconds': seconds,
+                             'us_per_op': seconds / max(ops, 1) * 1e6})
+        print(f'{backend:7} {rows:>9} {operation:22} {ops:>8} '
+              f'{seconds / max(ops, 1) * 1e6:14.1f}', flush=True)
+        return result
+
+
+def run(recorder: Recorder, backend: str, repos: Repos, rows: int,
+        args: argparse.Namespace) -> None:
+    """ Замеры одного хранилища на rows расходах """
+    rng = random.Random(args.seed)
+    cat_repo, expense_repo, budget_repo = repos[Category], repos[Expense], repos[Budget]
+    categories = recorder.measure(
+        backend, rows, 'create_from_tree', len(category_tree(args.depth, args.fanout)),
+        lambda: create_categories(cat_repo, args.depth, args.fanout))
+    names = [cat.name for cat in categories]
+    expenses = generate_expenses(rows, names, args.seed)
+    recorder.measure(backend, rows, 'add_many', rows,
+                     lambda: expense_repo.add_many(expenses))
+    budgets = generate_budgets(args.budgets, args.seed)
+    budget_repo.add_many(budgets)
+
+    ops = min(args.ops, rows)
+    pks = rng.sample(range(1, rows + 1), ops)
+    new = generate_expenses(ops, names, args.seed + 1)
+    recorder.measure(backend, rows, 'add', ops,
+                     lambda: [expense_repo.add(expense) for expense in new])
+    found = recorder.measure(backend, rows, 'get', ops,
+                             lambda: [expense_repo.get(pk) for pk in pks])
+    probes = rng.sample(names, min(args.queries, len(names)))
+    recorder.measure(backend, rows, 'get_all(category)', len(probes),
+                     lambda: [expense_repo.get_all({'category': name})
+                              for name in probes])
+    starts = [END - timedelta(days=rng.randrange(30, 730)) for _ in range(args.queries)]
+    recorder.measure(backend, rows, 'get_all(30 days)', len(starts),
+                     lambda: [expense_repo.get_all(
+                         {'expense_date': Range(day, day + timedelta(days=30))})
+                         for day in starts])
+    for expense in found:
+        expense.amount += 1
+    recorder.measure(backend, rows, 'update', ops,
+                     lambda: [expense_repo.update(expense) for expense in found])
+    recorder.measure(backend, rows, 'delete', ops,
+                     lambda: [expense_repo.delete(pk) for pk in pks])
+    recorder.measure(backend, rows, 'category tree', 1,
+                     lambda: CategoryTree(cat_repo.get_all()))
+    recorder.measure(backend, rows, 'budget recalculation', 1,
+                     lambda: recalculate_budgets(expense_repo, budget_repo))
+
+
+def compare(results: list[dict[str, Any]], baseline_file: str, threshold: float) -> int:
+    """ Напечатать сравнение с предыдущим прогоном, вернуть число регрессий """
+    with open(baseline_file, encoding='utf-8') as file:
+        baseline = {(r['backend'], r['rows'], r['operation']): r['us_per_op']
+                    for r in json.load(file)['results']}
+    regressions = 0
+    print(f'\ncomparison with {baseline_file}:')
+    for result in results:
+        before = baseline.get((result['backend'], result['rows'], result['operation']))
+        if not before:
+            continue
+        ratio = result['us_per_op'] / before
+        mark = ''
+        if ratio > 1 + threshold:
+            mark = '  REGRESSION'
+            regressions += 1
+        print(f"{result['backend']:7} {result['rows']:>9} {result['operation']:22} "
+              f'{ratio:8.2f}x{mark}')
+    return regressions
+
+
+def main() -> None:
+    """ Точка входа """
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help='числа расходов (до 10**6)')
+    parser.add_argument('--backends', nargs='+', default=['memory', 'sqlite'],
+                        choices=['memory', 'sqlite'])
+    parser.add_argument('--profile', default=None,
+                        help='профиль хранения sqlite (см. storage_profile)')
+    parser.add_argument('--depth', type=int, default=3, help='глубина дерева категорий')
+    parser.add_argument('--fanout', type=int, default=5, help='подкатегорий у категории')
+    parser.add_argument('--budgets', type=int, default=300, help='число бюджетов')
+    parser.add_argument('--ops', type=int, default=1000,
+                        help='число операций add, get, update, delete')
+    parser.add_argument('--queries', type=int, default=20, help='число запросов get_all')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='файл для результатов в JSON')
+    parser.add_argument('--baseline', help='JSON предыдущего прогона для сравнения')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='допустимое замедление относительно baseline')
+    args = parser.parse_args()
+
+    recorder = Recorder()
+    print(f'{"backend":7} {"rows":>9} {"operation":22} {"ops":>8} {"us/op":>14}')
+    for rows in args.sizes:
+        for backend in args.backends:
+            with tempfile.TemporaryDirectory() as tmp:
+                if backend == 'memory':
+                    repos = memory_repos(tmp)
+                else:
+                    repos = sqlite_repos(tmp, args.profile)
+                run(recorder, backend, repos, rows, args)
+                if backend == 'sqlite':
+                    repos[Expense].pool.close()
+
+    report = {'meta': {'python': sys.version.split()[0],
+                       'sqlite': sqlite3.sqlite_version,
+                       'platform': platform.platform(),
+                       'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                       'args': vars(args)},
+              'results': recorder.results}
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+    if args.baseline and compare(recorder.results, args.baseline, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Загрузка всех расходов из SQLite в объекты: прежний способ (словарь
+на каждую строку и модель с __dict__) и текущий (модель со __slots__
+и позиционный конструктор cls(*row)). Время и пиковая память (tracemalloc)
+измеряются в отдельных прогонах.
+
+Запуск: python -m benchmarks.bench_row_loading [-n 1000000]
+"""
+
+import argparse
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable
+
+from bookkeeper.models.expense import Expense
+from bookkeeper.repository.sqlite_repository import SQLiteRepository
+
+
+@dataclass
+class LegacyExpense:  # pylint: disable=too-many-instance-attributes
+    """ Модель расхода без __slots__ """
+    amount: float
+    category: str
+    expense_date: datetime = field(default_factory=datetime.now)
+    added_date: datetime = field(default_factory=datetime.now)
+    comment: str = ''
+    pk: int = 0
+
+
+def legacy_load(repo: SQLiteRepository[Expense]) -> list[Any]:
+    """ Словарь {поле: значение} и вызов cls(**словарь) для каждой строки """
+    with repo.pool.connection() as con:
+        rows = con.execute('SELECT * FROM expense').fetchall()
+    return [LegacyExpense(**dict(zip({"pk": int} | repo.fields, row))) for row in rows]
+
+
+def measure(func: Callable[[], list[Any]]) -> tuple[float, int]:
+    """ Время выполнения и пиковая память в байтах """
+    gc.collect()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    del result
+    gc.collect()
+    tracemalloc.start()
+    result = func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return elapsed, peak
+
+
+def main() -> None:
+    """ Точка входа """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-n', type=int, default=1_000_000, help='число расходов')
+    args = parser.parse_args()
+    start_date = datetime(2023, 1, 1)
+    with tempfile.TemporaryDirectory() as tmp:
+        repo = SQLiteRepository(Expense, os.path.join(tmp, 'bench.sqlite.db'))
+        repo.add_many(Expense(amount=i % 1000, category=f'category {i % 50}',
+                              expense_date=start_date + timedelta(minutes=i),
+                              added_date=start_date, comment='')
+                      for i in range(args.n))
+        results = {'dict + __dict__': measure(lambda: legacy_load(repo)),
+                   'cls(*row) + __slots__': measure(repo.get_all)}
+        repo.pool.close()
+    print(f'{args.n} expenses')
+    for name, (elapsed, peak) in results.items():
+        print(f'{name:22} {elapsed:8.3f} s   peak {peak / 2 ** 20:9.1f} MiB')
+
+
+if __name__ == '__main__':
+    main()
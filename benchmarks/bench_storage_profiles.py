@@ -0,0 +1,137 @@
+"""
+Сравнение профилей хранения SQLite (см. bookkeeper.repository.storage_profile)
+с настройками sqlite по умолчанию на двух нагрузках:
+- запись: n добавлений по одному (транзакция на расход) и загрузка
+  bulk расходов пакетами add_many;
+- чтение: несколько потоков читают расходы за случайные 30 дней
+  и суммы по дням, пока один поток добавляет расходы по одному.
+
+Профиль 'read-only analytics' на нагрузке чтения используется читателями,
+а писатель работает с профилем 'interactive'.
+
+Запуск: python -m benchmarks.bench_storage_profiles [-n 2000] [--bulk 200000]
+"""
+
+import argparse
+from datetime import datetime, timedelta
+import os
+import random
+import tempfile
+import threading
+import time
+
+from bookkeeper.models.expense import Expense
+from bookkeeper.repository.query import Range
+from bookkeeper.repository.sqlite_repository import SQLiteRepository
+from bookkeeper.repository.storage_profile import PROFILES
+
+START = datetime(2020, 1, 1)
+DAYS = 3 * 365
+BATCH = 1000
+
+
+def expense(rng: random.Random) -> Expense:
+    """ Случайный расход за DAYS дней с START """
+    return Expense(amount=round(rng.uniform(1, 5000), 2),
+                   category=str(rng.randrange(50)),
+                   expense_date=START + timedelta(days=rng.randrange(DAYS),
+                                                  seconds=rng.randrange(86400)),
+                   comment='bench')
+
+
+def repository(db_file: str, profile: str | None) -> SQLiteRepository:
+    """ Репозиторий расходов с профилем profile (None - настройки по умолчанию) """
+    return SQLiteRepository.repository_factory([Expense], db_file,
+                                               profile=profile)[Expense]
+
+
+def insert_heavy(db_file: str,
+                 profile: str | None,
+                 n: int,
+                 bulk: int) -> tuple[float, float]:
+    """ Вернуть число добавлений в секунду по одному и пакетами """
+    rng = random.Random(1)
+    repo = repository(db_file, profile)
+    start = time.perf_counter()
+    for _ in range(n):
+        repo.add(expense(rng))
+    single = n / (time.perf_counter() - start)
+    start = time.perf_counter()
+    for offset in range(0, bulk, BATCH):
+        repo.add_many([expense(rng) for _ in range(min(BATCH, bulk - offset))])
+    batched = bulk / (time.perf_counter() - start)
+    repo.pool.close()
+    return single, batched
+
+
+def read_heavy(db_file: str,
+               reader_profile: str | None,
+               writer_profile: str | None,
+               readers: int,
+               seconds: float) -> tuple[float, float]:
+    """ Вернуть число чтений и записей в секунду при одновременной работе """
+    writer = repository(db_file, writer_profile)
+    reader = repository(db_file, reader_profile)
+    stop = threading.Event()
+    counts = [0] * (readers + 1)
+
+    def read(number: int) -> None:
+        rng = random.Random(number)
+        while not stop.is_set():
+            day = START + timedelta(days=rng.randrange(DAYS - 30))
+            where = {'expense_date': Range(day, day + timedelta(days=30))}
+            reader.get_all(where)
+            reader.aggregate('sum', 'amount', where, group_by='expense_date__day')
+            counts[number] += 1
+
+    def write() -> None:
+        rng = random.Random(readers)
+        while not stop.is_set():
+            writer.add(expense(rng))
+            counts[readers] += 1
+
+    threads = [threading.Thread(target=read, args=(number,)) for number in range(readers)]
+    threads.append(threading.Thread(target=write))
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    reader.pool.close()
+    writer.pool.close()
+    return sum(counts[:readers]) / seconds, counts[readers] / seconds
+
+
+def main() -> None:
+    """ Точка входа """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-n', type=int, default=2000, help='добавлений по одному')
+    parser.add_argument('--bulk', type=int, default=200_000,
+                        help='расходов в пакетной загрузке')
+    parser.add_argument('--readers', type=int, default=4, help='потоков чтения')
+    parser.add_argument('--seconds', type=float, default=5.0,
+                        help='длительность нагрузки чтения')
+    args = parser.parse_args()
+
+    print(f'{"profile":22} {"add/s":>10} {"add_many/s":>12} '
+          f'{"reads/s":>10} {"writes/s":>10}')
+    for profile in (None, *PROFILES):
+        with tempfile.TemporaryDirectory() as tmp:
+            db_file = os.path.join(tmp, 'bench.sqlite.db')
+            if PROFILES.get(profile, PROFILES['interactive']).query_only:
+                # в базу только для чтения данные загружает другой профиль
+                insert_heavy(db_file, 'bulk-import', 0, args.bulk)
+                single = batched = float('nan')
+                writer_profile = 'interactive'
+            else:
+                single, batched = insert_heavy(db_file, profile, args.n, args.bulk)
+                writer_profile = profile
+            reads, writes = read_heavy(db_file, profile, writer_profile,
+                                       args.readers, args.seconds)
+        print(f'{profile or "sqlite defaults":22} {single:10.0f} {batched:12.0f} '
+              f'{reads:10.1f} {writes:10.1f}')
+
+
+if __name__ == '__main__':
+    main()
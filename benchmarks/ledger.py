@@ -0,0 +1,104 @@
+"""
+Детерминированный генератор синтетических данных для замеров:
+дерево категорий заданной глубины и ширины, расходы и бюджеты.
+
+Одинаковые параметры и seed дают одинаковые данные, поэтому результаты
+замеров разных версий программы можно сравнивать между собой.
+
+Распределения приближены к реальным:
+- расходы за days дней до end, в выходные их вдвое больше, чем в будни,
+  время - с 8 до 23 часов;
+- категории выбираются по закону Ципфа (несколько популярных категорий
+  и длинный хвост редких);
+- суммы - логнормальные (медиана около 500, редкие крупные покупки);
+- бюджеты на день, неделю и месяц идут друг за другом без пропусков.
+"""
+
+from datetime import datetime, timedelta
+from itertools import accumulate
+import random
+
+from bookkeeper.models.budget import Budget
+from bookkeeper.models.category import Category
+from bookkeeper.models.expense import Expense
+from bookkeeper.repository.abstract_repository import AbstractRepository
+
+END = datetime(2024, 1, 1)
+DAYS = 730
+BUDGET_PERIODS = (("День", timedelta(days=1)),
+                  ("Неделя", timedelta(weeks=1)),
+                  ("Месяц", timedelta(days=30)))
+
+
+def category_tree(depth: int, fanout: int) -> list[tuple[str, str | None]]:
+    """
+    Полное дерево категорий глубины depth, у каждой категории fanout
+    подкатегорий, в виде пар "потомок-родитель" в порядке уровней
+    (формат Category.create_from_tree)
+    """
+    tree: list[tuple[str, str | None]] = []
+    level: list[str | None] = [None]
+    for _ in range(depth):
+        next_level: list[str | None] = []
+        for parent in level:
+            for i in range(1, fanout + 1):
+                name = f'{parent}.{i}' if parent is not None else f'c{i}'
+                tree.append((name, parent))
+                next_level.append(name)
+        level = next_level
+    return tree
+
+
+def create_categories(repo: AbstractRepository[Category],
+                      depth: int,
+                      fanout: int) -> list[Category]:
+    """ Сохранить дерево категорий в репозиторий """
+    return Category.create_from_tree(category_tree(depth, fanout), repo)
+
+
+def generate_expenses(n: int,
+                      categories: list[str],
+                      seed: int = 0,
+                      end: datetime = END,
+                      days: int = DAYS) -> list[Expense]:
+    """ n расходов по категориям с названиями categories """
+    rng = random.Random(seed)
+    weights = list(accumulate(1 / rank for rank in range(1, len(categories) + 1)))
+    # веса дней: выходные вдвое чаще будних
+    start = end - timedelta(days=days)
+    day_weights = list(accumulate(
+        2 if (start + timedelta(days=day)).weekday() >= 5 else 1
+        for day in range(days)))
+    categories = rng.sample(categories, len(categories))
+    expenses = []
+    for _ in range(n):
+        day = rng.choices(range(days), cum_weights=day_weights)[0]
+        moment = start + timedelta(days=day, seconds=rng.randrange(8 * 3600, 23 * 3600))
+        expenses.append(Expense(
+            amount=round(rng.lognormvariate(6.2, 1.0), 2),
+            category=rng.choices(categories, cum_weights=weights)[0],
+            expense_date=moment,
+            added_date=moment,
+            comment=f'expense {rng.randrange(1000)}'))
+    return expenses
+
+
+def generate_budgets(n: int,
+                     seed: int = 0,
+                     end: datetime = END) -> list[Budget]:
+    """
+    n бюджетов: по очереди на день, неделю и месяц, периоды каждой
+    длительности идут подряд и заканчиваются последним в end
+    """
+    rng = random.Random(seed)
+    budgets = []
+    for i in range(n):
+        duration, length = BUDGET_PERIODS[i % len(BUDGET_PERIODS)]
+        period_end = end - length * (i // len(BUDGET_PERIODS))
+        budgets.append(Budget(amount=0.0,
+                              limits=round(rng.uniform(0.5, 2.0) * 1000
+                                           * length.days, 2),
+                              duration=duration,
+                              start=period_end - length,
+                              end=period_end))
+    return budgets
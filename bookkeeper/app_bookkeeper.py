@@ -2,17 +2,27 @@
 Presenter
 """
 
+import atexit
 from datetime import datetime, timedelta
+import os
 from typing import Protocol, Callable
 from dateutil import relativedelta
 
+from bookkeeper.background import BackgroundExecutor
+from bookkeeper.events import ADDED, ADDED_MANY, DELETED, UPDATED, EventBus
+from bookkeeper.importer import ExpenseImporter, ImportReport
+from bookkeeper.instrumentation import Instrumentation, instrument_handlers
 from bookkeeper.view.app import View
+from bookkeeper.view.dispatcher import QtDispatcher
 from bookkeeper.repository.sqlite_repository import SQLiteRepository
 from bookkeeper.models.category import Category
 from bookkeeper.models.budget import Budget
 from bookkeeper.models.expense import Expense
 from bookkeeper.utils import build_dict_tree_from_list
 from bookkeeper.repository.abstract_repository import AbstractRepository
+from bookkeeper.repository.observable_repository import ObservableRepository
+from bookkeeper.repository.query import Range
+from bookkeeper.spend_totals import DURATIONS, SpendTotals, fill_budgets, latest_budgets
 
 
 class AbstractView(Protocol):
@@ -38,22 +48,70 @@ class AbstractView(Protocol):
     def delete_category(self):
         pass
 
+    def show_error(self, message: str) -> None:
+        pass
+
 
 class Bookkeeper:
+    """
+    Presenter. Изменения данных и чтение данных для отображения
+    выполняются в фоновом потоке executor, а отображение результатов -
+    в потоке интерфейса (см. bookkeeper.background). Поэтому обработчики
+    чтения не возвращают данные, а передают их функции on_done.
+    Изменения категорий и расходов публикуются в шину events,
+    и отображение меняет только затронутые элементы.
+    Если задан instrumentation, замеряется время обработчиков отображения
+    и обработчиков событий (репозитории оборачиваются отдельно, см.
+    SQLiteRepository.repository_factory).
+    """
 
     def __init__(self,
                  view: AbstractView,
-                 repository_factory: dict[type, AbstractRepository]):
+                 repository_factory: dict[type, AbstractRepository],
+                 executor: BackgroundExecutor | None = None,
+                 events: EventBus | None = None,
+                 instrumentation: Instrumentation | None = None):
         self.view = view
+        self.instrumentation = instrumentation
         self.view.register_handlers(self.get_handlers())
         self.repository_factory = repository_factory
 
-        self.cat_repo = repository_factory[Category]
+        # передача функций из фонового потока в поток интерфейса
+        self.dispatch = QtDispatcher()
+        self.events = events if events is not None else EventBus(self.dispatch)
+        self.cat_repo = ObservableRepository(repository_factory[Category],
+                                             self.events, Category)
         self.budget_repo = repository_factory[Budget]
-        self.expenses_repo = repository_factory[Expense]
+        self.expenses_repo = ObservableRepository(repository_factory[Expense],
+                                                  self.events, Expense)
+        self.subscribe()
+        if instrumentation is not None:
+            self._show_budgets = instrumentation.wrap(  # type: ignore[method-assign]
+                "view.show_budgets", self._show_budgets)
+
+        self._budgets: list[Budget] = []
+        self.spend_totals = SpendTotals.from_repository(self.expenses_repo)
+
+        if executor is None:
+            executor = BackgroundExecutor(self.dispatch, error_handler=self.show_error)
+        self.executor = executor
 
         self.view.start_app()
 
+    def subscribe(self) -> None:
+        """ Подписать отображение и итоги расходов на изменения данных """
+        for model, event, handler in (
+                (Category, ADDED, self._category_added),
+                (Category, UPDATED, self._category_updated),
+                (Category, DELETED, self._category_deleted),
+                (Expense, ADDED, self._expense_added),
+                (Expense, ADDED_MANY, self._expenses_added),
+                (Expense, UPDATED, self._expense_updated)):
+            if self.instrumentation is not None:
+                handler = self.instrumentation.wrap(
+                    f'event.{model.__name__.lower()}.{event}', handler)
+            self.events.subscribe(model, event, handler)
+
     def get_handlers(self) -> dict[str, list[Callable | None]]:
         handlers_dist = {
             "category": [
@@ -75,46 +133,86 @@ class Bookkeeper:
                 self.set_budget
             ]
         }
+        if self.instrumentation is not None:
+            return instrument_handlers(handlers_dist, self.instrumentation)
         return handlers_dist
 
-    def get_category_tree(self) -> dict:
-        categories_list = self.cat_repo.get_all()
-        categories_tree = build_dict_tree_from_list(categories_list)
-        return categories_tree
+    def get_category_tree(self, on_done: Callable[[dict], None]) -> None:
+        """ Загрузить в фоне дерево категорий и передать его в on_done """
+        self.executor.submit(self._load_category_tree, key="category_tree",
+                             on_done=on_done)
+
+    def _load_category_tree(self) -> dict:
+        return build_dict_tree_from_list(self.cat_repo.get_all())
 
     def add_new_category(self,
                          category_name: str,
                          parent_id: int | None = None) -> None:
-        self.cat_repo.add(Category(name=category_name, parent=parent_id))
-        self.view.window.categories_page.categories_list.set_tree(
-            category_tree_getter=self.get_category_tree)
-        self.view.window.expenses_page.add_expense.choose_category.category_box.update_categories(
-            category_list_getter=self.get_categories_list)
+        self.executor.submit(self.cat_repo.add,
+                             Category(name=category_name, parent=parent_id))
 
     def edit_existing_category(self,
                                category_id: int,
                                new_name: str | None = None,
                                new_parent_id: int | None = None) -> None:
-        if new_name is None:
-            new_name = self.cat_repo.get(category_id).name
-        self.cat_repo.update(Category(name=new_name,
-                                      parent=new_parent_id,
-                                      pk=category_id))
-        self.view.window.categories_page.categories_list.set_tree(
-            category_tree_getter=self.get_category_tree)
-        self.view.window.expenses_page.add_expense.choose_category.category_box.update_categories(
-            category_list_getter=self.get_categories_list)
+        self.executor.submit(self._update_category,
+                             category_id, new_name, new_parent_id)
+
+    def _update_category(self,
+                         category_id: int,
+                         new_name: str | None,
+                         new_parent_id: int | None) -> None:
+        with self.cat_repo.transaction():
+            if new_name is None:
+                new_name = self.cat_repo.get(category_id).name
+            self.cat_repo.update(Category(name=new_name,
+                                          parent=new_parent_id,
+                                          pk=category_id))
 
     def delete_category(self, category_id: int) -> None:
-        self.cat_repo.delete(category_id)
-        self.view.window.categories_page.categories_list.set_tree(
-            category_tree_getter=self.get_category_tree)
-        self.view.window.expenses_page.add_expense.choose_category.category_box.update_categories(
-            category_list_getter=self.get_categories_list)
-
-    def get_expenses(self) -> list[Expense]:
-        expenses = self.expenses_repo.get_all()
-        return expenses
+        self.executor.submit(self._delete_category, category_id)
+
+    def _delete_category(self, category_id: int) -> None:
+        """
+        Удалить категорию; ее подкатегории становятся категориями
+        верхнего уровня (как в отображении и CategoryHierarchy)
+        """
+        with self.cat_repo.transaction():
+            self.cat_repo.update_many(
+                [Category(name=child.name, parent=None, pk=child.pk)
+                 for child in self.cat_repo.get_all({"parent": category_id})])
+            self.cat_repo.delete(category_id)
+
+    def _category_added(self, category: Category) -> None:
+        window = self.view.window
+        window.categories_page.categories_list.add_category(category)
+        window.expenses_page.add_expense.choose_category.category_box.add_category(
+            category.pk, category.name)
+
+    def _category_updated(self,  # pylint: disable=unused-argument
+                          old: Category | None, category: Category) -> None:
+        window = self.view.window
+        window.categories_page.categories_list.update_category(category)
+        window.expenses_page.add_expense.choose_category.category_box.rename_category(
+            category.pk, category.name)
+
+    def _category_deleted(self, pk: int) -> None:
+        window = self.view.window
+        window.categories_page.categories_list.remove_category(pk)
+        window.expenses_page.add_expense.choose_category.category_box.remove_category(pk)
+
+    def get_expenses(self,
+                     after_pk: int,
+                     limit: int | None,
+                     on_done: Callable[[list[Expense]], None],
+                     on_error: Callable[[BaseException], None] | None = None) -> None:
+        """
+        Загрузить в фоне расходы с id больше after_pk в порядке возрастания id,
+        не более limit штук (страница для таблицы расходов), и передать их
+        в on_done. Новый запрос страницы отменяет еще не показанный прежний.
+        """
+        self.executor.submit(self.expenses_repo.page, after_pk, limit,
+                             key="expenses_page", on_done=on_done, on_error=on_error)
 
     def edit_expenses(self,
                       pk: int,
@@ -128,43 +226,74 @@ class Bookkeeper:
             category=category,
             expense_date=expense_date,
             comment=comment)
-        self.expenses_repo.update(edit_expense)
+        self.executor.submit(self.expenses_repo.update, edit_expense)
+
+    def _expense_updated(self, old_expense: Expense | None, expense: Expense) -> None:
+        if old_expense is not None:
+            self.spend_totals.replace(old_expense, expense)
 
     def add_expense(self,
                     amount: float,
                     date: datetime,
                     category: str,
                     comment: str) -> None:
-        self.expenses_repo.add(Expense(amount=amount,
-                                       category=category,
-                                       expense_date=date,
-                                       comment=comment))
-        self.view.window.expenses_page.expenses_list.set_expenses(
-            expenses_getter=self.get_expenses)
-
-    def get_categories_list(self) -> list[str]:
-        categories_list = self.cat_repo.get_all()
-        categories = []
-        for category in categories_list:
-            categories.append(category.name)
-        return categories
-
-    def get_budget(self) -> list[Budget]:
-        day_budgets = self.budget_repo.get_all(
-            subquery="WHERE end=(SELECT MAX(end) FROM budget WHERE duration='День')")
-        week_budgets = self.budget_repo.get_all(
-            subquery="WHERE end=(SELECT MAX(end) FROM budget WHERE duration='Неделя')")
-        month_budgets = self.budget_repo.get_all(
-            subquery="WHERE end=(SELECT MAX(end) FROM budget WHERE duration='Месяц')")
-        return day_budgets + week_budgets + month_budgets
+        expense = Expense(amount=amount,
+                          category=category,
+                          expense_date=date,
+                          comment=comment)
+        self.executor.submit(self.expenses_repo.add, expense)
+
+    def _expense_added(self, expense: Expense) -> None:
+        self.spend_totals.add(expense)
+        self.view.window.expenses_page.expenses_list.insert_expense(expense)
+
+    def _expenses_added(self, expenses: list[Expense]) -> None:
+        for expense in expenses:
+            self.spend_totals.add(expense)
+        self.view.window.expenses_page.expenses_list.insert_expenses(expenses)
+
+    def get_categories_list(self,
+                            on_done: Callable[[list[tuple[int, str]]], None]) -> None:
+        """ Загрузить в фоне пары (id, название) всех категорий для on_done """
+        self.executor.submit(self._load_categories_list, key="categories_list",
+                             on_done=on_done)
+
+    def _load_categories_list(self) -> list[tuple[int, str]]:
+        return [(category.pk, category.name) for category in self.cat_repo.get_all()]
+
+    def get_budget(self, on_done: Callable[[list[Budget]], None]) -> None:
+        """
+        Загрузить в фоне бюджеты и передать их в on_done с суммами
+        расходов из spend_totals
+        """
+        self.executor.submit(latest_budgets, self.budget_repo, key="budgets",
+                             on_done=lambda budgets: on_done(self._fill_budgets(budgets)))
+
+    def refresh_budgets(self) -> None:
+        """
+        Перечитать бюджеты в фоне и показать их. Суммы расходов берутся
+        из spend_totals в потоке интерфейса. Несколько обновлений подряд
+        объединяются в одно.
+        """
+        self.executor.submit(latest_budgets, self.budget_repo, key="budgets",
+                             on_done=self._show_budgets)
+
+    def _fill_budgets(self, budgets: list[Budget]) -> list[Budget]:
+        self._budgets = fill_budgets(budgets, self.spend_totals)
+        return self._budgets
+
+    def _show_budgets(self, budgets: list[Budget]) -> None:
+        budgets = self._fill_budgets(budgets)
+        self.view.window.budget_page.budget_window.show_budgets(budgets)
 
     def get_expenses_from_data_range(self,
                                      end: datetime,
-                                     start: datetime = datetime.now()) -> list[Expense]:
-        start_str = start.strftime("%Y-%m-%d %H:%M:%S")
-        end_str = end.strftime("%Y-%m-%d %H:%M:%S")
+                                     start: datetime | None = None) -> list[Expense]:
+        if start is None:
+            start = datetime.now()
         expenses = self.expenses_repo.get_all(
-            subquery=f"WHERE expense_date <= '{end_str}' AND expense_date > '{start_str}'"
+            where={"expense_date": Range(start, end,
+                                         include_start=False, include_end=True)}
         )
         return expenses
 
@@ -177,39 +306,78 @@ class Bookkeeper:
             end = datetime.now() + relativedelta.relativedelta(months=1)
         else:
             raise ValueError("Wrong duration, set День/Неделя/Месяц")
-        possible_expenses = self.get_expenses_from_data_range(end=end)
-        start_amount = 0.0
-        for expense in possible_expenses:
-            start_amount += expense.amount
+        start_amount = self.spend_totals.total(DURATIONS[duration])
         budget = Budget(amount=start_amount, limits=amount, duration=duration, end=end)
-        self.budget_repo.add(budget)
-        self.view.window.budget_page.budget_window.set_budgets(
-            budgets_getter=self.get_budget)
+        self.executor.submit(self.budget_repo.add, budget)
+        self.refresh_budgets()
 
     def get_budgets_with_appropriate_period(self, date: datetime) -> list[Budget]:
-        date_str = date.strftime("%Y-%m-%d %H:%M:%S")
         budgets = self.budget_repo.get_all(
-            subquery=f"WHERE start < '{date_str}' AND end >= '{date_str}'"
+            where={"start": Range(end=date), "end": Range(start=date)}
         )
         return budgets
 
-    def update_budgets(self, value: float, date: datetime) -> None:
-        budgets = self.get_budgets_with_appropriate_period(date=date)
-        for budget in budgets:
-            budget.amount += value
-            self.budget_repo.update(budget)
-
-        self.view.window.budget_page.budget_window.set_budgets(
-            budgets_getter=self.get_budget)
-
-    def get_expense_from_repo(self, pk: int) -> Expense:
-        return self.expenses_repo.get(pk)
+    def update_budgets(self,  # pylint: disable=unused-argument
+                       value: float, date: datetime) -> None:
+        """
+        Обновить отображение бюджетов после изменения расходов.
+        Суммы расходов за периоды уже учтены в spend_totals при добавлении
+        и редактировании расходов, поэтому записи бюджетов не переписываются.
+        """
+        self.refresh_budgets()
+
+    def import_expenses(self, path: str, fmt: str | None = None) -> None:
+        """
+        Импортировать в фоне выписку из файла path (см. bookkeeper.importer).
+        Каждый пакет расходов сохраняется в своей транзакции, и таблица
+        расходов и бюджеты обновляются после сохранения пакета, а не каждого
+        расхода и не только в конце импорта. Фоновый поток занят импортом,
+        поэтому бюджеты не перечитываются, а суммы в показанных бюджетах
+        берутся из spend_totals в потоке интерфейса.
+        Об отклоненных записях сообщается после импорта.
+        """
+        importer = ExpenseImporter(
+            self.cat_repo, self.expenses_repo, atomic=False,
+            on_batch=lambda batch: self.dispatch(self._update_budget_amounts))
+        self.executor.submit(importer.import_file, path, fmt, on_done=self._imported)
+
+    def _update_budget_amounts(self) -> None:
+        """ Показать бюджеты с суммами расходов из spend_totals """
+        self._show_budgets(self._budgets)
+
+    def _imported(self, report: ImportReport) -> None:
+        if report.rejected:
+            first = report.rejected[0]
+            self.view.show_error(
+                f"Импортировано расходов: {report.imported}, "
+                f"отклонено записей: {len(report.rejected)} "
+                f"(запись {first.line}: {first.reason})")
+
+    def get_expense_from_repo(self,
+                              pk: int,
+                              on_done: Callable[[Expense | None], None]) -> None:
+        """ Загрузить в фоне расход с id pk и передать его в on_done """
+        self.executor.submit(self.expenses_repo.get, pk, key=("expense", pk),
+                             on_done=on_done)
+
+    def show_error(self, error: BaseException) -> None:
+        """ Показать ошибку фоновой операции """
+        self.view.show_error(str(error))
 
 
 if __name__ == "__main__":
+    # BOOKKEEPER_METRICS=путь.json - включить замеры и записать их при выходе
+    metrics_file = os.environ.get("BOOKKEEPER_METRICS")
+    metrics = Instrumentation() if metrics_file else None
+    if metrics is not None:
+        atexit.register(metrics.dump, metrics_file)
     app = Bookkeeper(
         view=View(), repository_factory=SQLiteRepository.repository_factory(
             models=[Category, Expense, Budget],
-            db_file='bookkeeper/databases/client.sqlite.db'
-        )
+            db_file='bookkeeper/databases/client.sqlite.db',
+            cache_size=1024,
+            profile='interactive',
+            instrumentation=metrics
+        ),
+        instrumentation=metrics
     )
@@ -0,0 +1,122 @@
+"""
+Фоновое выполнение операций с репозиториями
+
+Обработчики интерфейса не должны ждать диск: запросы к репозиториям
+выполняются в фоновом потоке, а результат передается функции on_done
+(или исключение - функции on_error) в потоке интерфейса через dispatch.
+
+Задачи с одинаковым ключом объединяются: новая задача отменяет еще не
+начатую предыдущую, а результат уже выполняющейся предыдущей отбрасывается.
+Так серия быстрых изменений приводит к одному обновлению отображения,
+и устаревшее обновление не затирает более новое.
+"""
+
+from concurrent.futures import Future, ThreadPoolExecutor
+import threading
+from typing import Any, Callable, Hashable
+
+Dispatch = Callable[[Callable[[], None]], None]
+
+
+def call_now(callback: Callable[[], None]) -> None:
+    """ dispatch по умолчанию: вызвать функцию сразу (в фоновом потоке) """
+    callback()
+
+
+class Task:  # pylint: disable=too-few-public-methods
+    """
+    Задача фонового исполнителя.
+    cancelled - задача отменена: она не будет выполнена,
+    если еще не начата, а ее результат не будет передан
+    """
+
+    def __init__(self,
+                 func: Callable[..., Any],
+                 args: tuple[Any, ...],
+                 kwargs: dict[str, Any],
+                 on_done: Callable[[Any], None] | None,
+                 on_error: Callable[[BaseException], None] | None,
+                 key: Hashable | None) -> None:
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.on_done = on_done
+        self.on_error = on_error
+        self.key = key
+        self.cancelled = False
+        self.future: Future[None] | None = None
+
+    def cancel(self) -> None:
+        """ Отменить задачу """
+        self.cancelled = True
+        if self.future is not None:
+            self.future.cancel()
+
+
+class BackgroundExecutor:
+    """
+    Исполнитель задач в фоновом потоке.
+
+    dispatch - функция, которая выполняет переданную ей функцию в нужном
+    потоке (для Qt - см. bookkeeper.view.dispatcher.QtDispatcher);
+    по умолчанию функции on_done и on_error вызываются в фоновом потоке
+    error_handler - обработчик исключений задач, для которых не задан on_error
+    max_workers - число фоновых потоков; при одном потоке задачи
+    выполняются и их результаты передаются в порядке постановки
+    """
+
+    def __init__(self,
+                 dispatch: Dispatch = call_now,
+                 error_handler: Callable[[BaseException], None] | None = None,
+                 max_workers: int = 1) -> None:
+        self._dispatch = dispatch
+        self._error_handler = error_handler
+        self._executor = ThreadPoolExecutor(max_workers,
+                                            thread_name_prefix='bookkeeper')
+        self._latest: dict[Hashable, Task] = {}
+        self._lock = threading.Lock()
+
+    def submit(self,
+               func: Callable[..., Any],
+               *args: Any,
+               on_done: Callable[[Any], None] | None = None,
+               on_error: Callable[[BaseException], None] | None = None,
+               key: Hashable | None = None,
+               **kwargs: Any) -> Task:
+        """
+        Выполнить func(*args, **kwargs) в фоновом потоке и передать результат
+        в on_done. key - ключ объединения задач (см. описание модуля).
+        """
+        task = Task(func, args, kwargs, on_done, on_error or self._error_handler, key)
+        with self._lock:
+            if key is not None:
+                previous = self._latest.get(key)
+                if previous is not None:
+                    previous.cancel()
+                self._latest[key] = task
+            task.future = self._executor.submit(self._run, task)
+        return task
+
+    def _run(self, task: Task) -> None:
+        if task.cancelled:
+            return
+        try:
+            result = task.func(*task.args, **task.kwargs)
+        except Exception as exc:  # pylint: disable=broad-except
+            self._dispatch(lambda: self._deliver(task, task.on_error, exc))
+        else:
+            self._dispatch(lambda: self._deliver(task, task.on_done, result))
+
+    def _deliver(self,
+                 task: Task,
+                 callback: Callable[[Any], None] | None,
+                 value: Any) -> None:
+        with self._lock:
+            if task.key is not None and self._latest.get(task.key) is task:
+                del self._latest[task.key]
+        if not task.cancelled and callback is not None:
+            callback(value)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """ Остановить исполнитель; при wait=True дождаться поставленных задач """
+        self._executor.shutdown(wait=wait, cancel_futures=not wait)
@@ -0,0 +1,372 @@
+"""
+Автоматическое определение категории расхода по правилам
+
+Правило Rule связывает категорию с подстрокой или регулярным выражением
+для текста расхода (комментария или названия магазина из выписки)
+и, по желанию, с диапазоном сумм. Categorizer компилирует правила один раз:
+- все подстроки ищутся за один проход по тексту автоматом Ахо-Корасик;
+- из регулярного выражения извлекается подстрока, без которой оно не может
+  совпасть; выражение проверяется, только если автомат нашел эту подстроку;
+- выражения, из которых подстроку извлечь нельзя, объединяются в одно
+  выражение, которое проверяется одним поиском: отдельные выражения
+  проверяются, только если объединенное совпало.
+Поэтому время классификации зависит от длины текста и числа подошедших
+правил, а не от общего числа правил. Большие наборы расходов можно
+классифицировать параллельно в нескольких процессах (classify_many).
+"""
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+import re
+from typing import Iterable
+import unicodedata
+
+from bookkeeper.models.category import Category
+from bookkeeper.repository.category_hierarchy import CategoryHierarchy
+
+RULE_KINDS = ('substring', 'regex')
+DEFAULT_CHUNK_SIZE = 10_000
+# число шестнадцатеричных цифр в \x, \u и \U
+_HEX_ESCAPES = {'x': 2, 'u': 4, 'U': 8}
+_CHAR_ESCAPES = {'a': '\a', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t', 'v': '\v'}
+# выражения с такими конструкциями нельзя объединять с другими
+_NOT_COMBINABLE = re.compile(r'\\[1-9]|\(\?P=|\(\?P<|\(\?[aiLmsux-]+[:)]')
+
+
+@dataclass(frozen=True)
+class Rule:
+    """
+    Правило категоризации.
+    category - название категории
+    pattern - подстрока или регулярное выражение (без учета регистра);
+    пустая строка подходит к любому тексту
+    kind - 'substring' или 'regex'
+    min_amount, max_amount - границы суммы расхода включительно (None - без границы)
+    priority - приоритет: из подошедших правил выбираются правила
+    с наибольшим приоритетом
+    """
+    category: str
+    pattern: str = ''
+    kind: str = 'substring'
+    min_amount: float | None = None
+    max_amount: float | None = None
+    priority: int = 0
+
+    def __post_init__(self) -> None:
+        if self.kind not in RULE_KINDS:
+            raise ValueError(f'unknown rule kind {self.kind!r}, expected one of '
+                             f'{list(RULE_KINDS)}')
+        if self.min_amount is not None and self.max_amount is not None \
+                and self.min_amount > self.max_amount:
+            raise ValueError(f'empty amount range {self.min_amount}..{self.max_amount}')
+        if self.kind == 'regex':
+            re.compile(self.pattern)
+
+    def amount_matches(self, amount: float | None) -> bool:
+        """ Подходит ли сумма к диапазону правила """
+        if self.min_amount is None and self.max_amount is None:
+            return True
+        if amount is None:
+            return False
+        return (self.min_amount is None or amount >= self.min_amount) \
+            and (self.max_amount is None or amount <= self.max_amount)
+
+
+class AhoCorasick:
+    """
+    Автомат Ахо-Корасик: поиск всех строк words в тексте за один проход
+    по тексту. find возвращает номера найденных строк в списке words.
+    """
+
+    def __init__(self, words: Iterable[str]) -> None:
+        goto: list[dict[str, int]] = [{}]
+        outputs: list[list[int]] = [[]]
+        for number, word in enumerate(words):
+            if not word:
+                raise ValueError('cannot search for an empty string')
+            state = 0
+            for char in word:
+                next_state = goto[state].get(char)
+                if next_state is None:
+                    next_state = goto[state][char] = len(goto)
+                    goto.append({})
+                    outputs.append([])
+                state = next_state
+            outputs[state].append(number)
+        # ссылки неудач строятся обходом в ширину, поэтому у состояния,
+        # на которое ведет ссылка, выходы к этому моменту уже дополнены
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in goto[state].items():
+                queue.append(next_state)
+                fallback = fail[state]
+                while fallback and char not in goto[fallback]:
+                    fallback = fail[fallback]
+                fail[next_state] = goto[fallback].get(char, 0)
+                outputs[next_state] += outputs[fail[next_state]]
+        self._goto = goto
+        self._fail = fail
+        self._outputs = [tuple(output) for output in outputs]
+
+    def __len__(self) -> int:
+        """ Число состояний автомата """
+        return len(self._goto)
+
+    def find(self, text: str) -> set[int]:
+        """ Номера строк, входящих в text """
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        found: set[int] = set()
+        state = 0
+        for char in text:
+            while True:
+                next_state = goto[state].get(char)
+                if next_state is not None:
+                    state = next_state
+                    break
+                if not state:
+                    break
+                state = fail[state]
+            if outputs[state]:
+                found.update(outputs[state])
+        return found
+
+
+def _escape(pattern: str, position: int) -> tuple[str | None, int]:
+    """
+    Разобрать экранированную последовательность, начинающуюся после '\\'
+    в позиции position: вернуть обозначаемый ею символ (None, если это
+    не символ, а класс, граница или обратная ссылка) и позицию после нее
+    """
+    escaped = pattern[position:position + 1]
+    position += 1
+    if escaped in _HEX_ESCAPES:
+        size = _HEX_ESCAPES[escaped]
+        code = pattern[position:position + size]
+        return chr(int(code, 16)), position + size
+    if escaped == 'N':
+        end = pattern.find('}', position)
+        return unicodedata.lookup(pattern[position + 1:end]), end + 1
+    if escaped.isdigit():
+        octal = re.match(r'0[0-7]{0,2}|[0-7]{3}', pattern[position - 1:])
+        if octal:
+            return chr(int(octal[0], 8)), position - 1 + len(octal[0])
+        # обратная ссылка
+        digits = re.match(r'\d{1,2}', pattern[position - 1:])
+        return None, position - 1 + len(digits[0]) if digits else position
+    if escaped in _CHAR_ESCAPES:
+        return _CHAR_ESCAPES[escaped], position
+    if not escaped or escaped.isalnum():
+        return None, position
+    return escaped, position
+
+
+def required_literal(pattern: str) -> str | None:
+    """
+    Самая длинная подстрока, которая входит в любой текст, подходящий
+    к регулярному выражению pattern, или None, если такую подстроку найти
+    не удалось. Разбор консервативный: содержимое групп, классов символов
+    и символы под квантификаторами пропускаются.
+    """
+    if re.compile(pattern).flags & re.VERBOSE:
+        return None
+    runs: list[str] = []
+    run: list[str] = []
+    depth = 0
+    position = 0
+
+    def close_run() -> None:
+        if run:
+            runs.append(''.join(run))
+            run.clear()
+
+    while position < len(pattern):
+        char = pattern[position]
+        position += 1
+        if char == '\\':
+            literal_char, position = _escape(pattern, position)
+            if depth or literal_char is None:
+                close_run()
+            else:
+                run.append(literal_char)
+            continue
+        if char == '[':
+            # класс символов - до закрывающей скобки (']' сразу после '[' или '[^'
+            # входит в класс)
+            if pattern[position:position + 1] == '^':
+                position += 1
+            if pattern[position:position + 1] == ']':
+                position += 1
+            while position < len(pattern) and pattern[position] != ']':
+                position += 2 if pattern[position] == '\\' else 1
+            position += 1
+            close_run()
+            continue
+        if char == '(':
+            depth += 1
+            close_run()
+            continue
+        if char == ')':
+            depth -= 1
+            continue
+        if depth:
+            continue
+        if char == '|':
+            # у альтернативы верхнего уровня нет общей обязательной подстроки
+            return None
+        if char in '?*{':
+            # предыдущий символ необязателен
+            if run:
+                run.pop()
+            close_run()
+            if char == '{':
+                end = pattern.find('}', position)
+                position = len(pattern) if end < 0 else end + 1
+            continue
+        if char == '+':
+            close_run()
+            continue
+        if char in '.^$':
+            close_run()
+            continue
+        run.append(char)
+    close_run()
+    literal = max(runs, key=len, default='')
+    return literal.lower() or None
+
+
+class Categorizer:
+    """
+    Скомпилированный набор правил rules (см. описание модуля).
+
+    categories - категории, на которые ссылаются правила; если они заданы,
+    названия категорий в правилах проверяются, а при совпадении правил
+    одного приоритета с разными категориями выбирается их ближайшая общая
+    родительская категория (например, 'мясо' и 'сладости' -> 'продукты').
+    Если общей родительской категории нет (или categories не заданы),
+    выбирается категория правила, стоящего в rules раньше.
+    """
+
+    def __init__(self,
+                 rules: Iterable[Rule],
+                 categories: Iterable[Category] | None = None) -> None:
+        self.rules = list(rules)
+        self._paths: dict[str, tuple[str, ...]] = {}
+        if categories is not None:
+            categories = list(categories)
+            names = {cat.pk: cat.name for cat in categories}
+            hierarchy = CategoryHierarchy(categories)
+            self._paths = {cat.name: tuple(names[pk] for pk in hierarchy.path(cat.pk))
+                           for cat in categories}
+            unknown = [rule.category for rule in self.rules
+                       if rule.category not in self._paths]
+            if unknown:
+                raise ValueError(f'unknown category {unknown[0]!r} in rules')
+
+        words: dict[str, int] = {}
+        self._word_rules: list[list[int]] = []
+        # регулярные выражения, которые нужно проверить, если найдена их подстрока
+        self._filtered: dict[int, re.Pattern[str]] = {}
+        combinable: list[int] = []
+        self._unfiltered: list[tuple[int, re.Pattern[str]]] = []
+        self._always: list[int] = []
+        for number, rule in enumerate(self.rules):
+            if not rule.pattern:
+                self._always.append(number)
+                continue
+            if rule.kind == 'substring':
+                literal: str | None = rule.pattern.lower()
+            else:
+                literal = required_literal(rule.pattern)
+                compiled = re.compile(rule.pattern, re.IGNORECASE)
+                if literal is None:
+                    self._unfiltered.append((number, compiled))
+                    if not _NOT_COMBINABLE.search(rule.pattern):
+                        combinable.append(number)
+                    continue
+                self._filtered[number] = compiled
+            if literal not in words:
+                words[literal] = len(words)
+                self._word_rules.append([])
+            self._word_rules[words[literal]].append(number)
+        self._automaton = AhoCorasick(words)
+        # объединенное выражение заменяет проверку выражений без подстроки,
+        # если все они допускают объединение
+        self._combined: re.Pattern[str] | None = None
+        if self._unfiltered and len(combinable) == len(self._unfiltered):
+            try:
+                self._combined = re.compile(
+                    '|'.join(f'(?:{self.rules[number].pattern})'
+                             for number in combinable), re.IGNORECASE)
+            except re.error:
+                self._combined = None
+
+    def matching_rules(self, text: str, amount: float | None = None) -> list[int]:
+        """ Номера правил (в порядке rules), подходящих к тексту и сумме """
+        matched = list(self._always)
+        for word in self._automaton.find(text.lower()):
+            for number in self._word_rules[word]:
+                pattern = self._filtered.get(number)
+                if pattern is None or pattern.search(text):
+                    matched.append(number)
+        if self._unfiltered and (self._combined is None or self._combined.search(text)):
+            matched += [number for number, pattern in self._unfiltered
+                        if pattern.search(text)]
+        return sorted(number for number in matched
+                      if self.rules[number].amount_matches(amount))
+
+    def classify(self, text: str, amount: float | None = None) -> str | None:
+        """ Название категории расхода с текстом text и суммой amount или None """
+        matched = self.matching_rules(text, amount)
+        if not matched:
+            return None
+        best = max(self.rules[number].priority for number in matched)
+        names = [self.rules[number].category for number in matched
+                 if self.rules[number].priority == best]
+        if len(set(names)) == 1 or not self._paths:
+            return names[0]
+        common: tuple[str, ...] = self._paths[names[0]]
+        for name in names[1:]:
+            path = self._paths[name]
+            size = 0
+            while size < min(len(common), len(path)) and common[size] == path[size]:
+                size += 1
+            common = common[:size]
+        return common[-1] if common else names[0]
+
+    def classify_many(self,
+                      rows: Iterable[tuple[str, float | None]],
+                      processes: int | None = None,
+                      chunk_size: int = DEFAULT_CHUNK_SIZE) -> list[str | None]:
+        """
+        Категории для списка пар (текст, сумма). Списки длиннее chunk_size
+        делятся на части, которые классифицируются в processes процессах
+        (None - по числу процессоров; 1 - в текущем процессе).
+        """
+        rows = list(rows)
+        if processes == 1 or len(rows) <= chunk_size:
+            return [self.classify(text, amount) for text, amount in rows]
+        chunks = [rows[start:start + chunk_size]
+                  for start in range(0, len(rows), chunk_size)]
+        result: list[str | None] = []
+        with ProcessPoolExecutor(processes, initializer=_init_worker,
+                                 initargs=(self,)) as pool:
+            for part in pool.map(_classify_chunk, chunks):
+                result += part
+        return result
+
+
+# правила, скомпилированные в процессе-исполнителе classify_many
+_worker_categorizer: Categorizer | None = None
+
+
+def _init_worker(categorizer: Categorizer) -> None:
+    global _worker_categorizer  # pylint: disable=global-statement
+    _worker_categorizer = categorizer
+
+
+def _classify_chunk(rows: list[tuple[str, float | None]]) -> list[str | None]:
+    assert _worker_categorizer is not None
+    return [_worker_categorizer.classify(text, amount) for text, amount in rows]
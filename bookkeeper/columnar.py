@@ -0,0 +1,271 @@
+"""
+Колоночный снимок таблицы расходов для аналитики
+
+Расходы хранятся не списком объектов Expense, а массивами NumPy по полям:
+сумма, код категории, день (число дней от 1970-01-01) и код комментария.
+Категории и комментарии хранятся в пулах строк, массивы - кодами в пуле.
+Суммы по периодам, по категориям и скользящее среднее считаются
+векторными операциями над массивами.
+
+Модуль требует numpy (необязательная зависимость, extra "analytics").
+"""
+
+from datetime import date, datetime
+from typing import Any, Iterable
+
+try:
+    import numpy as np
+except ImportError as exc:  # pragma: no cover
+    raise ImportError('bookkeeper.columnar requires numpy: '
+                      'pip install "pybookkeeper[analytics]"') from exc
+
+from bookkeeper.models.expense import Expense
+from bookkeeper.repository.abstract_repository import (
+    DEFAULT_BATCH_SIZE, AbstractRepository
+)
+from bookkeeper.utils import to_datetime
+
+EPOCH = date(1970, 1, 1)
+INITIAL_CAPACITY = 1024
+PERIODS = ('day', 'week', 'month')
+
+
+def epoch_day(value: datetime | date | str) -> int:
+    """ Номер дня от 1970-01-01 для даты расхода """
+    return to_datetime(value).date().toordinal() - EPOCH.toordinal()
+
+
+def _day_key(day: int) -> str:
+    return date.fromordinal(EPOCH.toordinal() + int(day)).isoformat()
+
+
+class StringPool:
+    """ Пул строк: строка <-> код (номер в пуле) """
+
+    def __init__(self) -> None:
+        self.values: list[Any] = []
+        self._codes: dict[Any, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def code(self, value: Any) -> int:
+        """ Код строки; новая строка добавляется в пул """
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def find(self, value: Any) -> int | None:
+        """ Код строки или None, если ее нет в пуле """
+        return self._codes.get(value)
+
+
+class ExpenseColumns:
+    """
+    Колоночный снимок расходов.
+
+    Строки хранятся плотно в начале массивов (первые len(self) элементов);
+    при удалении на место удаленной строки переносится последняя.
+    Снимок строится из репозитория потоковым чтением (from_repository)
+    и обновляется методами add, update и remove при изменении расходов.
+    """
+
+    def __init__(self, capacity: int = INITIAL_CAPACITY) -> None:
+        self.categories = StringPool()
+        self.comments = StringPool()
+        self._size = 0
+        self._rows: dict[int, int] = {}
+        self._pk = np.zeros(capacity, dtype=np.int64)
+        self._amount = np.zeros(capacity, dtype=np.float64)
+        self._category = np.zeros(capacity, dtype=np.int32)
+        self._day = np.zeros(capacity, dtype=np.int32)
+        self._comment = np.zeros(capacity, dtype=np.int32)
+
+    @classmethod
+    def from_repository(cls,
+                        repo: AbstractRepository[Expense],
+                        where: dict[str, Any] | None = None,
+                        batch_size: int = DEFAULT_BATCH_SIZE) -> 'ExpenseColumns':
+        """
+        Построить снимок по расходам из репозитория. Расходы читаются
+        через iter_all и добавляются порциями по batch_size, поэтому
+        в памяти одновременно находится не больше batch_size объектов.
+        """
+        columns = cls()
+        batch: list[Expense] = []
+        for expense in repo.iter_all(where, batch_size=batch_size):
+            batch.append(expense)
+            if len(batch) == batch_size:
+                columns.extend(batch)
+                batch.clear()
+        columns.extend(batch)
+        return columns
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, pk: int) -> bool:
+        return pk in self._rows
+
+    @property
+    def amount(self) -> np.ndarray:
+        """ Суммы расходов """
+        return self._amount[:self._size]
+
+    @property
+    def category(self) -> np.ndarray:
+        """ Коды категорий (номера в пуле categories) """
+        return self._category[:self._size]
+
+    @property
+    def day(self) -> np.ndarray:
+        """ Дни расходов (число дней от 1970-01-01) """
+        return self._day[:self._size]
+
+    @property
+    def comment(self) -> np.ndarray:
+        """ Коды комментариев (номера в пуле comments) """
+        return self._comment[:self._size]
+
+    @property
+    def pk(self) -> np.ndarray:
+        """ id расходов """
+        return self._pk[:self._size]
+
+    def _reserve(self, size: int) -> None:
+        capacity = len(self._pk)
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        for name in ('_pk', '_amount', '_category', '_day', '_comment'):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:self._size] = old[:self._size]
+            setattr(self, name, new)
+
+    def _write(self, row: int, expense: Expense) -> None:
+        self._pk[row] = expense.pk
+        self._amount[row] = expense.amount
+        self._category[row] = self.categories.code(expense.category)
+        self._day[row] = epoch_day(expense.expense_date)
+        self._comment[row] = self.comments.code(expense.comment)
+
+    def extend(self, expenses: Iterable[Expense]) -> None:
+        """ Добавить несколько расходов """
+        expenses = [expense for expense in expenses if expense.pk not in self._rows]
+        self._reserve(self._size + len(expenses))
+        for expense in expenses:
+            self._rows[expense.pk] = self._size
+            self._write(self._size, expense)
+            self._size += 1
+
+    def add(self, expense: Expense) -> None:
+        """ Добавить расход (уже сохраненный в репозитории, с pk) """
+        self.extend([expense])
+
+    def update(self, expense: Expense) -> None:
+        """ Изменить расход; неизвестный расход добавляется """
+        row = self._rows.get(expense.pk)
+        if row is None:
+            self.add(expense)
+        else:
+            self._write(row, expense)
+
+    def remove(self, pk: int) -> None:
+        """ Удалить расход """
+        row = self._rows.pop(pk)
+        last = self._size - 1
+        if row != last:
+            for column in (self._pk, self._amount, self._category,
+                           self._day, self._comment):
+                column[row] = column[last]
+            self._rows[int(self._pk[row])] = row
+        self._size = last
+
+    def _mask(self,
+              start: datetime | date | str | None,
+              end: datetime | date | str | None) -> np.ndarray | slice:
+        """ Строки с днем в [start, end) """
+        if start is None and end is None:
+            return slice(None)
+        day = self.day
+        mask = np.ones(len(day), dtype=bool)
+        if start is not None:
+            mask &= day >= epoch_day(start)
+        if end is not None:
+            mask &= day < epoch_day(end)
+        return mask
+
+    def total(self,
+              start: datetime | date | str | None = None,
+              end: datetime | date | str | None = None) -> float:
+        """ Сумма расходов с дня start по день end (не включая его) """
+        return float(self.amount[self._mask(start, end)].sum())
+
+    def period_totals(self,
+                      period: str = 'day',
+                      start: datetime | date | str | None = None,
+                      end: datetime | date | str | None = None) -> dict[str, float]:
+        """
+        Суммы расходов по дням, неделям (с понедельника) или месяцам.
+        Ключи в том же виде, что у AbstractRepository.aggregate с группировкой
+        '__day', '__week', '__month': '2023-03-15', '2023-03-13', '2023-03'.
+        """
+        if period not in PERIODS:
+            raise ValueError(f'unknown period {period!r}, expected one of {PERIODS}')
+        mask = self._mask(start, end)
+        day, amount = self.day[mask].astype(np.int64), self.amount[mask]
+        if not len(day):
+            return {}
+        if period == 'week':
+            # 1970-01-01 - четверг
+            day = day - (day + 3) % 7
+        elif period == 'month':
+            day = day.astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+        first = day.min()
+        sums = np.bincount(day - first, weights=amount)
+        keys = np.nonzero(np.bincount(day - first))[0]
+        if period == 'month':
+            return {str(np.datetime64(int(first + key), 'M')): float(sums[key])
+                    for key in keys}
+        return {_day_key(first + key): float(sums[key]) for key in keys}
+
+    def category_totals(self,
+                        start: datetime | date | str | None = None,
+                        end: datetime | date | str | None = None) -> dict[Any, float]:
+        """ Суммы расходов по категориям (гистограмма по категориям) """
+        mask = self._mask(start, end)
+        sums = np.bincount(self.category[mask], weights=self.amount[mask],
+                           minlength=len(self.categories))
+        counts = np.bincount(self.category[mask], minlength=len(self.categories))
+        return {self.categories.values[code]: float(sums[code])
+                for code in np.nonzero(counts)[0]}
+
+    def moving_average(self,
+                       window: int,
+                       start: datetime | date | str | None = None,
+                       end: datetime | date | str | None = None
+                       ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Скользящее среднее дневных расходов за window дней.
+        Вернуть массив дней (datetime64[D]) без пропусков между первым
+        и последним днем с расходами и массив средних: для каждого дня -
+        сумма за этот день и window - 1 предыдущих, деленная на window.
+        """
+        if window < 1:
+            raise ValueError('window must be positive')
+        mask = self._mask(start, end)
+        day, amount = self.day[mask].astype(np.int64), self.amount[mask]
+        if not len(day):
+            return np.array([], dtype='datetime64[D]'), np.array([])
+        first = day.min()
+        daily = np.bincount(day - first, weights=amount)
+        cumulative = np.concatenate(([0.0], np.cumsum(daily)))
+        lagged = np.concatenate((np.zeros(min(window - 1, len(daily))),
+                                 cumulative[:max(len(daily) - window + 1, 0)]))
+        averages = (cumulative[1:] - lagged) / window
+        days = np.arange(first, first + len(daily)).astype('datetime64[D]')
+        return days, averages
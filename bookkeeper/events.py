@@ -0,0 +1,76 @@
+"""
+Шина событий изменения данных
+
+Репозитории, обернутые в ObservableRepository, публикуют события
+об изменении объектов модели, а отображения подписываются на них
+и изменяют только затронутые элементы, не перестраиваясь целиком.
+
+События и аргументы обработчиков:
+- 'added' - added(obj), объект добавлен;
+- 'added_many' - added_many(objs), список объектов, добавленных одним
+  add_many (если на это событие нет подписчиков, для каждого объекта
+  публикуется 'added');
+- 'updated' - updated(old, new), объект изменен (old - объект до изменения
+  или None, если он неизвестен);
+- 'deleted' - deleted(pk), объект удален.
+"""
+
+from collections import defaultdict
+import threading
+from typing import Any, Callable
+
+from bookkeeper.background import Dispatch, call_now
+
+ADDED = 'added'
+ADDED_MANY = 'added_many'
+UPDATED = 'updated'
+DELETED = 'deleted'
+EVENTS = (ADDED, ADDED_MANY, UPDATED, DELETED)
+
+Handler = Callable[..., None]
+
+
+class EventBus:
+    """
+    Шина событий. Обработчики подписываются на событие event для модели model.
+    dispatch - функция, выполняющая вызов обработчиков в нужном потоке
+    (для Qt - bookkeeper.view.dispatcher.QtDispatcher); по умолчанию
+    обработчики вызываются сразу в потоке, опубликовавшем событие.
+    """
+
+    def __init__(self, dispatch: Dispatch = call_now) -> None:
+        self._dispatch = dispatch
+        self._handlers: defaultdict[tuple[type, str], list[Handler]] = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def subscribe(self, model: type, event: str, handler: Handler) -> Callable[[], None]:
+        """ Подписать handler на событие; вернуть функцию отмены подписки """
+        if event not in EVENTS:
+            raise ValueError(f'unknown event {event!r}, expected one of {EVENTS}')
+        with self._lock:
+            self._handlers[(model, event)].append(handler)
+        return lambda: self.unsubscribe(model, event, handler)
+
+    def unsubscribe(self, model: type, event: str, handler: Handler) -> None:
+        """ Отменить подписку handler на событие """
+        with self._lock:
+            handlers = self._handlers.get((model, event), [])
+            if handler in handlers:
+                handlers.remove(handler)
+
+    def has_subscribers(self, model: type, event: str) -> bool:
+        """ Есть ли подписчики на событие """
+        with self._lock:
+            return bool(self._handlers.get((model, event)))
+
+    def publish(self, model: type, event: str, *args: Any) -> None:
+        """ Опубликовать событие: вызвать обработчики с аргументами args """
+        with self._lock:
+            handlers = list(self._handlers.get((model, event), ()))
+        if handlers:
+            self._dispatch(lambda: self._notify(handlers, args))
+
+    @staticmethod
+    def _notify(handlers: list[Handler], args: tuple[Any, ...]) -> None:
+        for handler in handlers:
+            handler(*args)
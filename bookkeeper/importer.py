@@ -0,0 +1,336 @@
+"""
+Импорт расходов из банковских выписок (CSV, OFX, QIF)
+
+Выписка читается потоком: читатели read_csv, read_ofx и read_qif выдают
+записи по одной в виде пар (номер строки или записи, словарь полей), не
+загружая файл целиком. ExpenseImporter превращает поля записи в Expense
+по описанию столбцов ColumnMapping, находит категорию по названию в словаре,
+построенном одним запросом к репозиторию категорий, и сохраняет расходы
+пакетами add_many. Записи, которые не удалось разобрать, не прерывают импорт,
+а попадают в отчет ImportReport вместе с причиной.
+"""
+
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from datetime import datetime
+import csv
+import html
+import os
+import re
+import time
+from typing import Callable, Iterable, Iterator, TextIO
+
+from bookkeeper.categorizer import Categorizer
+from bookkeeper.models.category import Category
+from bookkeeper.models.expense import Expense
+from bookkeeper.repository.abstract_repository import AbstractRepository
+
+Row = tuple[int, dict[str, str]]
+
+DEFAULT_BATCH_SIZE = 1000
+DATE_FORMATS = ('%d.%m.%Y', '%d.%m.%Y %H:%M', '%d.%m.%Y %H:%M:%S', '%d.%m.%y',
+                '%d/%m/%Y', '%Y%m%d%H%M%S', '%Y%m%d')
+QIF_DATE_FORMATS = ('%m/%d/%Y', '%m/%d/%y', '%d.%m.%Y', '%d.%m.%y')
+CSV_DELIMITERS = ';,\t|'
+# чтение OFX порциями по столько символов
+OFX_CHUNK_SIZE = 1 << 16
+OFX_TAG = re.compile(r'<(/?)([A-Za-z0-9.]+)>([^<]*)')
+
+
+@dataclass(frozen=True)
+class ColumnMapping:
+    """
+    Соответствие полей записи выписки полям Expense.
+    amount, date, category - названия полей с суммой, датой и категорией
+    comment - поля, значения которых через пробел составляют комментарий
+    date_formats - форматы даты (strptime), проверяемые после ISO 8601
+    sign - множитель суммы: -1, если расходы в выписке записаны
+    отрицательными суммами (как в OFX и QIF); записи с суммой не больше
+    нуля после умножения (поступления) отклоняются
+    """
+    amount: str = 'amount'
+    date: str = 'date'
+    category: str = 'category'
+    comment: tuple[str, ...] = ('comment',)
+    date_formats: tuple[str, ...] = DATE_FORMATS
+    sign: int = 1
+
+
+OFX_MAPPING = ColumnMapping(date_formats=('%Y%m%d%H%M%S', '%Y%m%d'), sign=-1)
+QIF_MAPPING = ColumnMapping(date_formats=QIF_DATE_FORMATS, sign=-1)
+
+
+@dataclass
+class RejectedRow:
+    """
+    Отклоненная запись выписки: line - номер строки CSV или номер
+    записи OFX и QIF, reason - причина, row - поля записи
+    """
+    line: int
+    reason: str
+    row: dict[str, str]
+
+
+@dataclass
+class ImportReport:
+    """ Итоги импорта: число сохраненных расходов, отклоненные записи и время """
+    imported: int = 0
+    rejected: list[RejectedRow] = field(default_factory=list)
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        """ Скорость импорта: обработанных записей в секунду """
+        rows = self.imported + len(self.rejected)
+        return rows / self.seconds if self.seconds else 0.0
+
+
+def parse_amount(text: str) -> float:
+    """
+    Разобрать сумму: допускаются пробелы между разрядами и запятая
+    как десятичный разделитель ('1 234,50', '1,234.50', '-99.9')
+    """
+    text = text.replace(' ', '').replace('\xa0', '')
+    if ',' in text:
+        if '.' in text:
+            # разделитель разрядов - тот, что встречается раньше
+            text = text.replace(',', '') if text.index(',') < text.index('.') \
+                else text.replace('.', '').replace(',', '.')
+        else:
+            text = text.replace(',', '.')
+    return float(text)
+
+
+def parse_date(text: str, formats: Iterable[str] = DATE_FORMATS) -> datetime:
+    """
+    Разобрать дату в формате ISO 8601 или одном из форматов formats.
+    Если formats - список, подошедший формат переставляется в его начало:
+    даты выписки обычно в одном формате, и следующие разбираются
+    с первой попытки.
+    """
+    text = text.strip()
+    try:
+        return datetime.fromisoformat(text)
+    except ValueError:
+        pass
+    for position, date_format in enumerate(formats):
+        try:
+            result = datetime.strptime(text, date_format)
+        except ValueError:
+            continue
+        if position and isinstance(formats, list):
+            formats.insert(0, formats.pop(position))
+        return result
+    raise ValueError(f'unknown date format {text!r}')
+
+
+def read_csv(file: TextIO, delimiter: str | None = None) -> Iterator[Row]:
+    """
+    Записи CSV с заголовком. Названия полей берутся из заголовка.
+    Если delimiter не задан, разделитель определяется по началу файла.
+    """
+    if delimiter is None:
+        sample = file.read(4096)
+        file.seek(0)
+        try:
+            delimiter = csv.Sniffer().sniff(sample, CSV_DELIMITERS).delimiter
+        except csv.Error:
+            delimiter = ','
+    reader = csv.DictReader(file, delimiter=delimiter)
+    for row in reader:
+        yield reader.line_num, {key: value for key, value in row.items()
+                                if key is not None and value is not None}
+
+
+def _ofx_tokens(file: TextIO) -> Iterator[tuple[bool, str, str]]:
+    """ Теги OFX (SGML и XML): (закрывающий ли тег, имя, текст после тега) """
+    buffer = ''
+    for chunk in iter(lambda: file.read(OFX_CHUNK_SIZE), ''):
+        buffer += chunk
+        # последний тег может быть неполным - он остается в буфере
+        last = buffer.rfind('<')
+        if last < 0:
+            continue
+        for match in OFX_TAG.finditer(buffer, 0, last):
+            yield bool(match[1]), match[2].upper(), match[3]
+        buffer = buffer[last:]
+    for match in OFX_TAG.finditer(buffer):
+        yield bool(match[1]), match[2].upper(), match[3]
+
+
+def read_ofx(file: TextIO) -> Iterator[Row]:
+    """
+    Операции (STMTTRN) выписки OFX: поля date (DTPOSTED), amount (TRNAMT)
+    и comment (NAME и MEMO); номер записи - номер операции в файле
+    """
+    number = 0
+    fields: dict[str, str] | None = None
+    for closing, tag, text in _ofx_tokens(file):
+        if tag == 'STMTTRN':
+            if closing and fields is not None:
+                number += 1
+                date = re.match(r'\d*', fields.get('DTPOSTED', ''))
+                yield number, {
+                    'date': date[0] if date else '',
+                    'amount': fields.get('TRNAMT', ''),
+                    'comment': ' '.join(fields[name] for name in ('NAME', 'MEMO')
+                                        if fields.get(name))}
+            fields = None if closing else {}
+        elif fields is not None and not closing:
+            fields[tag] = html.unescape(text.strip())
+
+
+def read_qif(file: TextIO) -> Iterator[Row]:
+    """
+    Записи QIF: поля date (D), amount (T), category (L) и comment (P и M);
+    номер записи - номер строки, с которой она начинается
+    """
+    fields: dict[str, str] = {}
+    start = 0
+    for line_number, line in enumerate(file, 1):
+        line = line.rstrip('\r\n')
+        if not line or line.startswith('!'):
+            continue
+        if not fields:
+            start = line_number
+        code, value = line[0], line[1:].strip()
+        if code != '^':
+            # из повторяющихся кодов (разбиение операции S, E, $) важен первый
+            fields.setdefault(code, value)
+            continue
+        yield start, {
+            'date': fields.get('D', '').replace("'", '/').replace(' ', ''),
+            'amount': fields.get('T', fields.get('U', '')),
+            'category': fields.get('L', ''),
+            'comment': ' '.join(fields[code] for code in 'PM' if fields.get(code))}
+        fields = {}
+
+
+READERS: dict[str, tuple[Callable[[TextIO], Iterator[Row]], ColumnMapping]] = {
+    'csv': (read_csv, ColumnMapping()),
+    'ofx': (read_ofx, OFX_MAPPING),
+    'qif': (read_qif, QIF_MAPPING),
+}
+
+
+class ExpenseImporter:
+    """
+    Импорт расходов в репозиторий expense_repo.
+
+    cat_repo - репозиторий категорий; категория записи ищется по названию
+    без учета регистра
+    by - атрибут категории, значение которого записывается в поле category
+    расхода ('name', как в окне программы, или 'pk')
+    categorizer - правила (см. bookkeeper.categorizer), по которым категория
+    записи без категории или с неизвестной категорией определяется
+    по комментарию и сумме
+    default_category - название категории для записей, категорию которых
+    определить не удалось (None - такие записи отклоняются)
+    batch_size - число расходов в одном вызове add_many
+    atomic - сохранить весь импорт в одной транзакции (см.
+    AbstractRepository.transaction): при ошибке записи не сохраняется
+    ни один пакет; иначе каждый пакет - отдельная транзакция
+    on_batch - функция, вызываемая со списком расходов после сохранения
+    каждого пакета (например, для пересчета бюджетов раз на пакет)
+    """
+
+    def __init__(self,
+                 cat_repo: AbstractRepository[Category],
+                 expense_repo: AbstractRepository[Expense],
+                 by: str = 'name',
+                 default_category: str | None = None,
+                 categorizer: Categorizer | None = None,
+                 batch_size: int = DEFAULT_BATCH_SIZE,
+                 atomic: bool = True,
+                 on_batch: Callable[[list[Expense]], None] | None = None) -> None:
+        if batch_size < 1:
+            raise ValueError(f'batch size must be positive, got {batch_size}')
+        self.cat_repo = cat_repo
+        self.expense_repo = expense_repo
+        self.by = by
+        self.default_category = default_category
+        self.categorizer = categorizer
+        self.batch_size = batch_size
+        self.atomic = atomic
+        self.on_batch = on_batch
+
+    def _categories(self) -> dict[str, str]:
+        """ Словарь {название категории без учета регистра: значение поля category} """
+        return {cat.name.casefold(): str(getattr(cat, self.by))
+                for cat in self.cat_repo.get_all()}
+
+    def _flush(self, batch: list[Expense]) -> None:
+        with self.expense_repo.transaction():
+            self.expense_repo.add_many(batch)
+        if self.on_batch is not None:
+            self.on_batch(batch)
+
+    def import_rows(self,
+                    rows: Iterable[Row],
+                    mapping: ColumnMapping = ColumnMapping()) -> ImportReport:
+        """ Импортировать записи rows (см. read_csv) с полями, описанными mapping """
+        start = time.perf_counter()
+        report = ImportReport()
+        categories = self._categories()
+        default = None if self.default_category is None \
+            else categories.get(self.default_category.casefold())
+        if self.default_category is not None and default is None:
+            raise ValueError(f'unknown default category {self.default_category!r}')
+        formats = list(mapping.date_formats)
+        batch: list[Expense] = []
+        context = self.expense_repo.transaction() if self.atomic else nullcontext()
+        with context:
+            for line, row in rows:
+                try:
+                    amount = parse_amount(row.get(mapping.amount) or '') * mapping.sign
+                    date = parse_date(row.get(mapping.date) or '', formats)
+                except ValueError as exc:
+                    report.rejected.append(RejectedRow(line, str(exc), row))
+                    continue
+                if amount <= 0:
+                    report.rejected.append(RejectedRow(line, 'not an expense', row))
+                    continue
+                name = (row.get(mapping.category) or '').strip()
+                category = categories.get(name.casefold())
+                comment = ' '.join(row[column] for column in mapping.comment
+                                   if row.get(column))
+                if category is None and self.categorizer is not None:
+                    guess = self.categorizer.classify(comment, amount)
+                    if guess is not None:
+                        category = categories.get(guess.casefold())
+                if category is None:
+                    category = default
+                if category is None:
+                    report.rejected.append(RejectedRow(
+                        line, f'unknown category {name!r}', row))
+                    continue
+                batch.append(Expense(amount=amount, category=category,
+                                     expense_date=date, comment=comment))
+                if len(batch) >= self.batch_size:
+                    self._flush(batch)
+                    report.imported += len(batch)
+                    batch = []
+            if batch:
+                self._flush(batch)
+                report.imported += len(batch)
+        report.seconds = time.perf_counter() - start
+        return report
+
+    def import_file(self,
+                    path: str,
+                    fmt: str | None = None,
+                    mapping: ColumnMapping | None = None,
+                    encoding: str = 'utf-8-sig') -> ImportReport:
+        """
+        Импортировать выписку из файла path.
+        fmt - 'csv', 'ofx' или 'qif' (по умолчанию - по расширению файла)
+        mapping - описание полей (по умолчанию - стандартное для формата)
+        """
+        if fmt is None:
+            fmt = os.path.splitext(path)[1].lstrip('.').lower()
+        if fmt not in READERS:
+            raise ValueError(f'unknown statement format {fmt!r}, expected one of '
+                             f'{list(READERS)}')
+        reader, default_mapping = READERS[fmt]
+        with open(path, encoding=encoding, newline='') as file:
+            return self.import_rows(reader(file), mapping or default_mapping)
@@ -0,0 +1,160 @@
+"""
+Замеры времени выполнения горячих участков программы
+
+Instrumentation собирает по именам операций число вызовов, суммарное
+и максимальное время, гистограмму задержек (p50, p95, p99) и число
+возвращенных строк, а также те же данные по тексту SQL-запросов.
+Данные доступны через metrics() и sql() и записываются в JSON методом dump.
+
+Замеры включаются явно: репозитории оборачиваются в InstrumentedRepository
+(см. SQLiteRepository.repository_factory), обработчики презентера - функцией
+instrument_handlers. Без этого код выполняется без каких-либо проверок,
+а выключенный объект (enabled = False) добавляет к вызову одну проверку флага.
+"""
+
+from contextlib import contextmanager
+from functools import wraps
+import json
+import math
+import threading
+import time
+from typing import Any, Callable, Iterator, TypeVar
+
+F = TypeVar('F', bound=Callable[..., Any])
+
+# ширина корзины гистограммы - 1/16 октавы (погрешность перцентиля ~4%)
+BUCKETS_PER_OCTAVE = 16
+PERCENTILES = (50, 95, 99)
+
+
+class Metric:
+    """ Статистика одной операции; время - в секундах """
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self._buckets: dict[int, int] = {}
+
+    def add(self, seconds: float, rows: int | None = None) -> None:
+        """ Учесть один вызов """
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        if rows is not None:
+            self.rows += rows
+        bucket = math.floor(math.log2(max(seconds * 1e9, 1.0)) * BUCKETS_PER_OCTAVE)
+        self._buckets[bucket] = self._buckets.get(bucket, 0) + 1
+
+    def percentile(self, percent: float) -> float:
+        """ Оценка перцентиля задержки (верхняя граница корзины, не больше max) """
+        if not self.count:
+            return 0.0
+        rank = percent / 100 * self.count
+        seen = 0
+        for bucket in sorted(self._buckets):
+            seen += self._buckets[bucket]
+            if seen >= rank:
+                return min(2 ** ((bucket + 1) / BUCKETS_PER_OCTAVE) / 1e9, self.max)
+        return self.max
+
+    def summary(self) -> dict[str, float | int]:
+        """ Статистика в виде словаря """
+        result: dict[str, float | int] = {
+            'count': self.count, 'total': self.total,
+            'mean': self.total / self.count if self.count else 0.0,
+            'max': self.max, 'rows': self.rows}
+        for percent in PERCENTILES:
+            result[f'p{percent}'] = self.percentile(percent)
+        return result
+
+
+class Instrumentation:
+    """
+    Сборщик замеров. Методы можно вызывать из нескольких потоков.
+    enabled - собирать ли замеры (можно переключать во время работы)
+    """
+
+    def __init__(self, enabled: bool = True) -> None:
+        self.enabled = enabled
+        self._metrics: dict[str, Metric] = {}
+        self._sql: dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float, rows: int | None = None) -> None:
+        """ Учесть вызов операции name """
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = Metric()
+            metric.add(seconds, rows)
+
+    def record_sql(self, query: str, seconds: float, rows: int | None = None) -> None:
+        """ Учесть выполнение SQL-запроса query """
+        with self._lock:
+            metric = self._sql.get(query)
+            if metric is None:
+                metric = self._sql[query] = Metric()
+            metric.add(seconds, rows)
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        """ Замерить время выполнения блока with как вызов операции name """
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def wrap(self, name: str, func: F) -> F:
+        """ Обертка функции func, замеряющая ее вызовы как операцию name """
+        @wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not self.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.record(name, time.perf_counter() - start)
+        return wrapper  # type: ignore[return-value]
+
+    def metrics(self) -> dict[str, dict[str, float | int]]:
+        """ Статистика операций по именам """
+        with self._lock:
+            return {name: metric.summary() for name, metric in self._metrics.items()}
+
+    def sql(self) -> dict[str, dict[str, float | int]]:
+        """ Статистика SQL-запросов по тексту запроса """
+        with self._lock:
+            return {query: metric.summary() for query, metric in self._sql.items()}
+
+    def reset(self) -> None:
+        """ Забыть все замеры """
+        with self._lock:
+            self._metrics.clear()
+            self._sql.clear()
+
+    def dump(self, path: str) -> None:
+        """ Записать статистику в файл JSON """
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump({'metrics': self.metrics(), 'sql': self.sql()}, file,
+                      ensure_ascii=False, indent=2)
+
+
+def instrument_handlers(handlers: dict[str, list[Callable | None]],
+                        instrumentation: Instrumentation
+                        ) -> dict[str, list[Callable | None]]:
+    """
+    Обернуть обработчики презентера (см. Bookkeeper.get_handlers);
+    имя операции - 'handler.<имя функции>'
+    """
+    return {group: [None if handler is None else instrumentation.wrap(
+                        f'handler.{handler.__name__}', handler)
+                    for handler in group_handlers]
+            for group, group_handlers in handlers.items()}
@@ -1,22 +1,26 @@
 """
 Модель бюджета по категории расходов
 """
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
+from typing import ClassVar
 
 
-@dataclass
+@dataclass(slots=True)
 class Budget:
     """
     Бюджет по категории товаров, хранит срок (duration), на который установлен бюджет,
     id категории, к которой относится бюджет (category),
     и сумма бюджета на данный срок (amount)
     pk - id записи в базе данных
+    indexes - поля, по которым хранилище строит вторичные индексы
     """
 
     amount: float
     limits: float
     duration: str
     end: datetime
-    start: datetime = datetime.now()
+    start: datetime = field(default_factory=datetime.now)
     pk: int = 0
+
+    indexes: ClassVar[tuple[tuple[str, ...], ...]] = (('duration', 'end'),)
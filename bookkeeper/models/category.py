@@ -3,22 +3,28 @@
 """
 from collections import defaultdict
 from dataclasses import dataclass
-from typing import Iterator
+from typing import TYPE_CHECKING, ClassVar, Iterator
 
 from ..repository.abstract_repository import AbstractRepository
 
+if TYPE_CHECKING:
+    from ..repository.category_hierarchy import CategoryHierarchyRepository
 
-@dataclass
+
+@dataclass(slots=True)
 class Category:
     """
     Категория расходов, хранит название в атрибуте name и ссылку (id) на
     родителя (категория, подкатегорией которой является данная) в атрибуте parent.
     У категорий верхнего уровня parent = None
+    indexes - поля, по которым хранилище строит вторичные индексы
     """
     name: str
     parent: int | None = None
     pk: int = 0
 
+    indexes: ClassVar[tuple[tuple[str, ...], ...]] = (('parent',),)
+
     def get_parent(self,
                    repo: AbstractRepository['Category']) -> 'Category | None':
         """
@@ -85,6 +91,55 @@ class Category:
             subcats[cat.parent].append(cat)
         return get_children(subcats, self.pk)
 
+    def get_ancestors(self,
+                      repo: 'CategoryHierarchyRepository') -> list['Category']:
+        """
+        Получить всех предков категории одним запросом по индексу иерархии.
+
+        Parameters
+        ----------
+        repo - репозиторий категорий с индексом иерархии
+
+        Returns
+        -------
+        Объекты Category от родителя и выше до категории верхнего уровня
+        """
+        return self._get_ordered(repo, repo.hierarchy.ancestors(self.pk))
+
+    def get_descendants(self,
+                        repo: 'CategoryHierarchyRepository') -> list['Category']:
+        """
+        Получить все подкатегории из иерархии одним запросом по индексу иерархии.
+
+        Parameters
+        ----------
+        repo - репозиторий категорий с индексом иерархии
+
+        Returns
+        -------
+        Объекты Category, являющиеся подкатегориями разного уровня ниже данной,
+        в порядке обхода дерева в глубину
+        """
+        return self._get_ordered(repo, repo.hierarchy.descendants(self.pk))
+
+    def get_depth(self, repo: 'CategoryHierarchyRepository') -> int:
+        """
+        Получить глубину категории в иерархии (у категорий верхнего уровня - 0)
+
+        Parameters
+        ----------
+        repo - репозиторий категорий с индексом иерархии
+        """
+        return repo.hierarchy.depth(self.pk)
+
+    @staticmethod
+    def _get_ordered(repo: AbstractRepository['Category'],
+                     pks: list[int]) -> list['Category']:
+        if not pks:
+            return []
+        found = {cat.pk: cat for cat in repo.get_all({'pk': pks})}
+        return [found[pk] for pk in pks]
+
     @classmethod
     def create_from_tree(
             cls,
@@ -100,6 +155,8 @@ class Category:
         со стороны СУБД, результат, возможно, будет корректным, если исходные
         данные корректны за исключением сортировки. Если нет, то нет.
         "Мусор на входе, мусор на выходе".
+        Категории сохраняются пакетно (add_many), по одному пакету
+        на каждый уровень дерева.
 
         Parameters
         ----------
@@ -110,9 +167,26 @@ class Category:
         -------
         Список созданных объектов Category
         """
-        created: dict[str, Category] = {}
-        for child, parent in tree:
-            cat = cls(child, created[parent].pk if parent is not None else None)
-            repo.add(cat)
-            created[child] = cat
+        index: dict[str, int] = {}
+        parents: list[int | None] = []
+        depths: list[int] = []
+        levels: list[list[int]] = []
+        for i, (child, parent) in enumerate(tree):
+            parent_index = index[parent] if parent is not None else None
+            depth = 0 if parent_index is None else depths[parent_index] + 1
+            if depth == len(levels):
+                levels.append([])
+            levels[depth].append(i)
+            parents.append(parent_index)
+            depths.append(depth)
+            index[child] = i
+
+        cats = [cls(child) for child, _ in tree]
+        for level_indices in levels:
+            for i in level_indices:
+                parent_index = parents[i]
+                if parent_index is not None:
+                    cats[i].parent = cats[parent_index].pk
+            repo.add_many(cats[i] for i in level_indices)
+        created = {cat.name: cat for cat in cats}
         return list(created.values())
@@ -2,11 +2,12 @@
 Описан класс, представляющий расходную операцию
 """
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
+from typing import ClassVar
 
 
-@dataclass
+@dataclass(slots=True)
 class Expense:
     """
     Расходная операция.
@@ -16,10 +17,13 @@ class Expense:
     added_date - дата добавления в бд
     comment - комментарий
     pk - id записи в базе данных
+    indexes - поля, по которым хранилище строит вторичные индексы
     """
     amount: float
     category: str
-    expense_date: datetime = datetime.now().strftime('%d-%m-%Y')
-    added_date: datetime = datetime.now().strftime('%d-%m-%Y')
+    expense_date: datetime = field(default_factory=datetime.now)
+    added_date: datetime = field(default_factory=datetime.now)
     comment: str = ''
     pk: int = 0
+
+    indexes: ClassVar[tuple[tuple[str, ...], ...]] = (('expense_date',), ('category',))
@@ -0,0 +1,48 @@
+"""
+Отчеты по расходам
+
+Сводка по категориям: суммы расходов по категориям считаются одним
+агрегирующим запросом к репозиторию расходов, затем суммы поддеревьев
+получаются за один проход по дереву категорий от листьев к корням.
+"""
+
+from typing import Any
+
+from bookkeeper.models.category import Category
+from bookkeeper.models.expense import Expense
+from bookkeeper.repository.abstract_repository import AbstractRepository
+from bookkeeper.utils import CategoryTree
+
+
+def category_rollup(cat_repo: AbstractRepository[Category],
+                    expense_repo: AbstractRepository[Expense],
+                    where: dict[str, Any] | None = None,
+                    by: str = 'pk') -> dict[Any, Any]:
+    """
+    Дерево категорий с суммами расходов в json-подобном виде
+    {id: {"name": имя, "own": сумма, "total": сумма, id_потомка: {...}}, ...}
+    own - расходы непосредственно в категории,
+    total - расходы в категории вместе со всеми подкатегориями.
+    Дерево можно передать в CategoriesList (строковые ключи он пропускает).
+
+    where - условие на расходы, например
+    {'expense_date': Range(начало, конец)}
+    by - атрибут категории, значение которого записано в поле category
+    расхода ('pk' или 'name'). Расходы в неизвестных категориях и в категориях,
+    не попавших в дерево, не учитываются.
+    """
+    categories = cat_repo.get_all()
+    tree = CategoryTree(categories)
+    # поле category расхода - строка, поэтому ключи сравниваются как строки
+    spent = {str(key): amount for key, amount in expense_repo.aggregate(
+        'sum', 'amount', where=where, group_by='category').items()}
+    key_of = {cat.pk: str(getattr(cat, by)) for cat in categories}
+    order = tree.preorder()
+    for pk in order:
+        node = tree.get(pk)
+        node['own'] = node['total'] = spent.get(key_of[pk], 0)
+    for pk in reversed(order):
+        parent = tree.parent(pk)
+        if parent is not None:
+            tree.get(parent)['total'] += tree.get(pk)['total']
+    return tree.tree
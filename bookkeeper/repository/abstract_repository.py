@@ -8,7 +8,12 @@
 """
 
 from abc import ABC, abstractmethod
-from typing import Generic, TypeVar, Protocol, Any
+from contextlib import contextmanager
+from typing import Generic, TypeVar, Protocol, Any, Iterable, Iterator
+
+from bookkeeper.repository.query import GroupBy, OrderBy, aggregate_objects, keyset_where
+
+DEFAULT_BATCH_SIZE = 1000
 
 
 class Model(Protocol):  # pylint: disable=too-few-public-methods
@@ -30,6 +35,14 @@ class AbstractRepository(ABC, Generic[T]):
     get_all
     update
     delete
+
+    Пакетные методы add_many, update_many, delete_many по умолчанию
+    вызывают одиночные методы для каждого объекта; реализации могут
+    переопределять их более эффективными версиями.
+    Методы page и iter_all по умолчанию выражены через get_all,
+    aggregate - через iter_all.
+    Метод transaction по умолчанию не дает гарантий атомарности
+    (см. описание метода).
     """
 
     @abstractmethod
@@ -44,11 +57,18 @@ class AbstractRepository(ABC, Generic[T]):
         """ Получить объект по id """
 
     @abstractmethod
-    def get_all(self, where: dict[str, Any] | None = None) -> list[T]:
+    def get_all(self,
+                where: dict[str, Any] | None = None,
+                order_by: OrderBy = None,
+                limit: int | None = None) -> list[T]:
         """
         Получить все записи по некоторому условию
         where - условие в виде словаря {'название_поля': значение}
-        если условие не задано (по умолчанию), вернуть все записи
+        если условие не задано (по умолчанию), вернуть все записи;
+        значением может быть также None, набор значений или Range
+        (см. bookkeeper.repository.query)
+        order_by - поле или список полей для сортировки ('-поле' - по убыванию)
+        limit - максимальное число записей
         """
 
     @abstractmethod
@@ -59,6 +79,90 @@ class AbstractRepository(ABC, Generic[T]):
     def delete(self, pk: int) -> None:
         """ Удалить запись """
 
+    def page(self,
+             after_pk: int = 0,
+             limit: int | None = DEFAULT_BATCH_SIZE,
+             where: dict[str, Any] | None = None) -> list[T]:
+        """
+        Получить страницу записей (keyset-пагинация): не более limit записей
+        с id больше after_pk, удовлетворяющих условию where, в порядке
+        возрастания id. Следующая страница запрашивается с after_pk,
+        равным id последней записи предыдущей. Условие на id в where
+        объединяется с условием id > after_pk (см. query.keyset_where).
+        """
+        where = keyset_where(where, after_pk)
+        if where is None:
+            return []
+        return self.get_all(where=where, order_by='pk', limit=limit)
+
+    def iter_all(self,
+                 where: dict[str, Any] | None = None,
+                 order_by: OrderBy = None,
+                 batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[T]:
+        """
+        Перебрать записи по условию where (см. get_all), не собирая их
+        в один список. Без сортировки записи выдаются в порядке id
+        и читаются страницами page по batch_size записей; с сортировкой
+        реализация по умолчанию берет их из get_all.
+        """
+        if order_by is not None:
+            yield from self.get_all(where, order_by)
+            return
+        after_pk = 0
+        while True:
+            batch = self.page(after_pk, batch_size, where)
+            yield from batch
+            if len(batch) < batch_size:
+                return
+            after_pk = batch[-1].pk
+
+    def aggregate(self,
+                  func: str,
+                  field: str | None = None,
+                  where: dict[str, Any] | None = None,
+                  group_by: GroupBy = None) -> Any:
+        """
+        Посчитать агрегат по записям, удовлетворяющим условию where
+        func - 'sum', 'count', 'min', 'max' или 'avg'
+        field - поле (для 'count' можно не указывать - число записей)
+        group_by - поле или список полей для группировки; к полю с датой можно
+        добавить '__day', '__week' или '__month' (см. bookkeeper.repository.query)
+        Без группировки вернуть значение, с группировкой - словарь
+        {группа: значение}, где группа - значение поля или кортеж значений.
+        Незаполненные значения не учитываются; сумма без значений равна 0,
+        минимум, максимум и среднее - None.
+        """
+        return aggregate_objects(self.iter_all(where), func, field, group_by)
+
+    def add_many(self, objs: Iterable[T]) -> list[int]:
+        """
+        Добавить в репозиторий несколько объектов, вернуть список их id,
+        также записать id в атрибут pk каждого объекта.
+        """
+        return [self.add(obj) for obj in objs]
+
+    def update_many(self, objs: Iterable[T]) -> None:
+        """ Обновить данные о нескольких объектах. Объекты должны содержать поле pk. """
+        for obj in objs:
+            self.update(obj)
+
+    def delete_many(self, pks: Iterable[int]) -> None:
+        """ Удалить несколько записей """
+        for pk in pks:
+            self.delete(pk)
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """
+        Блок with, изменения внутри которого выполняются как одно целое:
+        при исключении они отменяются, иначе сохраняются вместе.
+        Блоки можно вкладывать: исключение во вложенном блоке отменяет
+        только его изменения. Реализация по умолчанию ничего не отменяет.
+        Транзакцию над несколькими репозиториями дает
+        bookkeeper.repository.unit_of_work.transaction.
+        """
+        yield
+
     @classmethod
     def repository_factory(cls,
                            models: list[type],
@@ -0,0 +1,94 @@
+"""
+Модуль содержит описание абстрактного асинхронного репозитория
+
+Асинхронный репозиторий - аналог AbstractRepository для программ на asyncio:
+те же методы и те же условия выборки (см. bookkeeper.repository.query),
+но методы - корутины, а iter_all - асинхронный итератор, поэтому обращения
+к хранилищу не блокируют цикл событий. Модели используются те же.
+"""
+
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Generic, Iterable
+
+from bookkeeper.repository.abstract_repository import DEFAULT_BATCH_SIZE, T
+from bookkeeper.repository.query import OrderBy, keyset_where
+
+
+class AsyncAbstractRepository(ABC, Generic[T]):
+    """
+    Абстрактный асинхронный репозиторий.
+    Абстрактные методы:
+    add
+    get
+    get_all
+    update
+    delete
+
+    Методы add_many, page и iter_all по умолчанию выражены
+    через add и get_all, как в AbstractRepository.
+    """
+
+    @abstractmethod
+    async def add(self, obj: T) -> int:
+        """
+        Добавить объект в репозиторий, вернуть id объекта,
+        также записать id в атрибут pk.
+        """
+
+    @abstractmethod
+    async def get(self, pk: int) -> T | None:
+        """ Получить объект по id """
+
+    @abstractmethod
+    async def get_all(self,
+                      where: dict[str, Any] | None = None,
+                      order_by: OrderBy = None,
+                      limit: int | None = None) -> list[T]:
+        """ Получить все записи по некоторому условию (см. AbstractRepository.get_all) """
+
+    @abstractmethod
+    async def update(self, obj: T) -> None:
+        """ Обновить данные об объекте. Объект должен содержать поле pk. """
+
+    @abstractmethod
+    async def delete(self, pk: int) -> None:
+        """ Удалить запись """
+
+    async def add_many(self, objs: Iterable[T]) -> list[int]:
+        """
+        Добавить в репозиторий несколько объектов, вернуть список их id,
+        также записать id в атрибут pk каждого объекта.
+        """
+        return [await self.add(obj) for obj in objs]
+
+    async def page(self,
+                   after_pk: int = 0,
+                   limit: int | None = DEFAULT_BATCH_SIZE,
+                   where: dict[str, Any] | None = None) -> list[T]:
+        """ Страница записей с id больше after_pk (см. AbstractRepository.page) """
+        where = keyset_where(where, after_pk)
+        if where is None:
+            return []
+        return await self.get_all(where=where, order_by='pk', limit=limit)
+
+    async def iter_all(self,
+                       where: dict[str, Any] | None = None,
+                       order_by: OrderBy = None,
+                       batch_size: int = DEFAULT_BATCH_SIZE) -> AsyncIterator[T]:
+        """
+        Перебрать записи по условию where (см. AbstractRepository.iter_all).
+        Без сортировки записи читаются страницами page по batch_size записей,
+        и между страницами цикл событий выполняет другие задачи.
+        """
+        if order_by is not None:
+            for obj in await self.get_all(where, order_by):
+                yield obj
+            return
+        after_pk = 0
+        while True:
+            batch = await self.page(after_pk, batch_size, where)
+            for obj in batch:
+                yield obj
+            if len(batch) < batch_size:
+                return
+            after_pk = batch[-1].pk
@@ -0,0 +1,65 @@
+"""
+Модуль описывает асинхронный репозиторий, работающий в оперативной памяти
+"""
+
+import asyncio
+from typing import Any, AsyncIterator, Iterable
+
+from bookkeeper.repository.abstract_repository import DEFAULT_BATCH_SIZE, T
+from bookkeeper.repository.async_abstract_repository import AsyncAbstractRepository
+from bookkeeper.repository.memory_repository import MemoryRepository
+from bookkeeper.repository.query import OrderBy
+
+
+class AsyncMemoryRepository(AsyncAbstractRepository[T]):
+    """
+    Асинхронный репозиторий в оперативной памяти.
+    Данные хранит MemoryRepository repo (если не передан, создается новый);
+    операции выполняются сразу, без ожидания, в потоке цикла событий.
+    """
+
+    repo: MemoryRepository[T]
+
+    def __init__(self, repo: MemoryRepository[T] | None = None) -> None:
+        self.repo = repo if repo is not None else MemoryRepository()
+
+    async def add(self, obj: T) -> int:
+        return self.repo.add(obj)
+
+    async def add_many(self, objs: Iterable[T]) -> list[int]:
+        return self.repo.add_many(objs)
+
+    async def get(self, pk: int) -> T | None:
+        return self.repo.get(pk)
+
+    async def get_all(self,
+                      where: dict[str, Any] | None = None,
+                      order_by: OrderBy = None,
+                      limit: int | None = None) -> list[T]:
+        return self.repo.get_all(where, order_by, limit)
+
+    async def iter_all(self,
+                       where: dict[str, Any] | None = None,
+                       order_by: OrderBy = None,
+                       batch_size: int = DEFAULT_BATCH_SIZE) -> AsyncIterator[T]:
+        """
+        Перебор идет по списку объектов, выбранных при первом обращении,
+        поэтому другие задачи могут менять репозиторий во время перебора;
+        после каждых batch_size объектов цикл событий выполняет другие задачи.
+        """
+        objs = list(self.repo.iter_all(where, order_by))
+        for start in range(0, len(objs), batch_size):
+            for obj in objs[start:start + batch_size]:
+                yield obj
+            await asyncio.sleep(0)
+
+    async def update(self, obj: T) -> None:
+        self.repo.update(obj)
+
+    async def delete(self, pk: int) -> None:
+        self.repo.delete(pk)
+
+    @classmethod
+    def repository_factory(cls, models: list[type]) -> dict[type, Any]:
+        """ Создает словарь репозиториев для каждой из моделей """
+        return {model: cls() for model in models}
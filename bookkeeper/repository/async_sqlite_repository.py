@@ -0,0 +1,120 @@
+"""
+Модуль описывает асинхронный репозиторий, работающий с SQLite
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Iterable
+
+from bookkeeper.repository.abstract_repository import T
+from bookkeeper.repository.async_abstract_repository import AsyncAbstractRepository
+from bookkeeper.repository.connection_pool import DEFAULT_POOL_SIZE
+from bookkeeper.repository.query import OrderBy
+from bookkeeper.repository.sqlite_repository import SQLiteRepository
+from bookkeeper.repository.storage_profile import StorageProfile
+
+
+def database_thread() -> ThreadPoolExecutor:
+    """ Отдельный поток для обращений к базе данных """
+    return ThreadPoolExecutor(1, thread_name_prefix='bookkeeper-sqlite')
+
+
+class AsyncSQLiteRepository(AsyncAbstractRepository[T]):
+    """
+    Асинхронный репозиторий SQLite - обертка над SQLiteRepository repo.
+
+    Все обращения к базе выполняются по очереди в отдельном потоке executor
+    (если он не передан, создается новый; repository_factory создает один
+    поток на все репозитории базы), цикл событий только ждет результата.
+    Запись в sqlite и так выполняется по одной транзакции за раз, а общий поток
+    избавляет от ожидания блокировки базы.
+
+    Добавления, поступившие от разных задач, пока поток занят предыдущей
+    записью, сохраняются одним add_many в одной транзакции (групповая
+    фиксация). Если запись пакета не удалась, исключение получают все
+    добавления пакета.
+    """
+
+    repo: SQLiteRepository[T]
+    executor: ThreadPoolExecutor
+
+    def __init__(self,
+                 repo: SQLiteRepository[T],
+                 executor: ThreadPoolExecutor | None = None) -> None:
+        self.repo = repo
+        self.executor = executor if executor is not None else database_thread()
+        self._pending: list[tuple[T, asyncio.Future[int]]] = []
+        self._flusher: asyncio.Task[None] | None = None
+
+    async def _run(self, func: Callable[..., Any], *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, partial(func, *args))
+
+    async def add(self, obj: T) -> int:
+        if getattr(obj, 'pk', None) != 0:
+            raise ValueError(f'trying to add object {obj} with filled `pk` attribute')
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[int] = loop.create_future()
+        self._pending.append((obj, future))
+        if self._flusher is None:
+            self._flusher = loop.create_task(self._flush())
+        return await future
+
+    async def _flush(self) -> None:
+        """ Записывать накопленные добавления пакетами, пока они есть """
+        try:
+            while self._pending:
+                batch, self._pending = self._pending, []
+                try:
+                    pks = await self._run(self.repo.add_many, [obj for obj, _ in batch])
+                except Exception as exc:  # pylint: disable=broad-except
+                    for _, future in batch:
+                        if not future.done():
+                            future.set_exception(exc)
+                else:
+                    for (_, future), pk in zip(batch, pks):
+                        if not future.done():
+                            future.set_result(pk)
+        finally:
+            self._flusher = None
+
+    async def add_many(self, objs: Iterable[T]) -> list[int]:
+        return await self._run(self.repo.add_many, list(objs))
+
+    async def get(self, pk: int) -> T | None:
+        return await self._run(self.repo.get, pk)
+
+    async def get_all(self,
+                      where: dict[str, Any] | None = None,
+                      order_by: OrderBy = None,
+                      limit: int | None = None) -> list[T]:
+        return await self._run(self.repo.get_all, where, order_by, limit)
+
+    async def update(self, obj: T) -> None:
+        await self._run(self.repo.update, obj)
+
+    async def delete(self, pk: int) -> None:
+        await self._run(self.repo.delete, pk)
+
+    def close(self) -> None:
+        """ Дождаться поставленных запросов, остановить поток и закрыть соединения """
+        self.executor.shutdown(wait=True)
+        self.repo.pool.close()
+
+    @classmethod
+    def repository_factory(cls,
+                           models: list[type],
+                           db_file: str | None = None,
+                           pool_size: int = DEFAULT_POOL_SIZE,
+                           profile: StorageProfile | str | None = None
+                           ) -> dict[type, Any]:
+        """
+        Создает словарь репозиториев для каждой из моделей
+        (см. SQLiteRepository.repository_factory). Все репозитории
+        используют общий пул соединений и общий поток базы данных.
+        """
+        executor = database_thread()
+        return {model: cls(repo, executor) for model, repo in
+                SQLiteRepository.repository_factory(models, db_file, pool_size,
+                                                    profile=profile).items()}
@@ -0,0 +1,224 @@
+"""
+Модуль описывает кэширующий репозиторий-декоратор
+
+Результаты get и get_all хранятся в LRU-кэше (с необязательным временем
+жизни записей). Запись идет сразу в обернутый репозиторий (write-through),
+а из кэша удаляются только затронутые записи: объект с изменившимся id
+и выборки, в которые объект входил или мог бы войти после изменения.
+"""
+
+from collections import OrderedDict
+from contextlib import contextmanager
+from copy import copy
+import threading
+import time
+from typing import Any, Callable, Hashable, Iterable, Iterator
+
+from bookkeeper.repository.abstract_repository import AbstractRepository, T
+from bookkeeper.repository.delegating_repository import DelegatingRepository
+from bookkeeper.repository.query import COLLECTION_TYPES, OrderBy, matches
+
+DEFAULT_CACHE_SIZE = 1024
+
+
+def _freeze(value: Any) -> Hashable:
+    if isinstance(value, COLLECTION_TYPES):
+        return type(value).__name__, tuple(value)
+    return value
+
+
+def query_key(where: dict[str, Any] | None,
+              order_by: OrderBy,
+              limit: int | None) -> Hashable:
+    """ Ключ кэша для выборки get_all """
+    frozen_where = None if where is None else tuple(
+        (attr, _freeze(value)) for attr, value in where.items())
+    frozen_order = order_by if order_by is None or isinstance(order_by, str) \
+        else tuple(order_by)
+    return frozen_where, frozen_order, limit
+
+
+class CachingRepository(DelegatingRepository[T]):
+    """
+    Кэширующий репозиторий.
+
+    repo - обернутый репозиторий
+    max_size - максимальное число объектов и, отдельно, выборок в кэше
+    ttl - время жизни записи кэша в секундах (None - без ограничения)
+    clock - источник времени для ttl
+
+    Кэш возвращает копии объектов, поэтому изменение полученного объекта
+    без вызова update не портит кэш. Счетчики hits и misses считают
+    попадания и промахи get и get_all.
+    Обращения к кэшу из разных потоков (интерфейса и фонового, см.
+    bookkeeper.background) выполняются по очереди под блокировкой.
+    Если транзакция repo (см. transaction) отменена, кэш очищается целиком.
+    Пока транзакция открыта, другой поток читает из repo прежние данные
+    и может снова положить их в кэш, поэтому затронутые в транзакции
+    записи удаляются из кэша еще раз после фиксации внешней транзакции.
+    Внутри своей транзакции поток не заполняет кэш незафиксированными
+    данными.
+    """
+
+    max_size: int
+    ttl: float | None
+    hits: int
+    misses: int
+
+    def __init__(self,
+                 repo: AbstractRepository[T],
+                 max_size: int = DEFAULT_CACHE_SIZE,
+                 ttl: float | None = None,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        super().__init__(repo)
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.RLock()
+        self._objects: OrderedDict[int, tuple[float, T | None]] = OrderedDict()
+        self._queries: OrderedDict[
+            Hashable, tuple[float, dict[str, Any] | None, list[T], set[int]]
+        ] = OrderedDict()
+        # изменения открытых транзакций (id, объект или None), у каждого потока свои
+        self._pending = threading.local()
+
+    def _in_transaction(self) -> bool:
+        return bool(getattr(self._pending, 'stack', None))
+
+    def _fresh(self, stored_at: float) -> bool:
+        return self.ttl is None or self.clock() - stored_at < self.ttl
+
+    def _put(self, cache: OrderedDict[Any, Any], key: Hashable, value: Any) -> None:
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > self.max_size:
+            cache.popitem(last=False)
+
+    def get(self, pk: int) -> T | None:
+        with self._lock:
+            cached = self._objects.get(pk)
+            if cached is not None and self._fresh(cached[0]):
+                self.hits += 1
+                self._objects.move_to_end(pk)
+                return copy(cached[1])
+            self.misses += 1
+            obj = self.repo.get(pk)
+            if not self._in_transaction():
+                self._put(self._objects, pk, (self.clock(), copy(obj)))
+            return obj
+
+    def get_all(self,
+                where: dict[str, Any] | None = None,
+                order_by: OrderBy = None,
+                limit: int | None = None) -> list[T]:
+        with self._lock:
+            key = query_key(where, order_by, limit)
+            cached = self._queries.get(key)
+            if cached is not None and self._fresh(cached[0]):
+                self.hits += 1
+                self._queries.move_to_end(key)
+                return [copy(obj) for obj in cached[2]]
+            self.misses += 1
+            result = self.repo.get_all(where, order_by, limit)
+            if self._in_transaction():
+                return result
+            self._put(self._queries, key, (
+                self.clock(), None if where is None else dict(where),
+                [copy(obj) for obj in result], {obj.pk for obj in result}))
+            return result
+
+    def _invalidate(self, pk: int, obj: T | None = None) -> None:
+        """
+        Удалить из кэша объект pk и выборки, которые он может изменить:
+        содержащие объект pk и те, условию которых удовлетворяет obj
+        """
+        stack = getattr(self._pending, 'stack', None)
+        if stack:
+            stack[-1].append((pk, obj))
+        with self._lock:
+            self._objects.pop(pk, None)
+            stale = []
+            for key, (_, where, _, pks) in self._queries.items():
+                if pk in pks:
+                    stale.append(key)
+                elif obj is not None:
+                    try:
+                        if matches(obj, where):
+                            stale.append(key)
+                    except AttributeError:
+                        stale.append(key)
+            for key in stale:
+                del self._queries[key]
+
+    def add(self, obj: T) -> int:
+        with self._lock:
+            pk = self.repo.add(obj)
+            self._invalidate(pk, obj)
+            return pk
+
+    def add_many(self, objs: Iterable[T]) -> list[int]:
+        with self._lock:
+            objs = list(objs)
+            pks = self.repo.add_many(objs)
+            for obj in objs:
+                self._invalidate(obj.pk, obj)
+            return pks
+
+    def update(self, obj: T) -> None:
+        with self._lock:
+            self.repo.update(obj)
+            self._invalidate(obj.pk, obj)
+
+    def update_many(self, objs: Iterable[T]) -> None:
+        with self._lock:
+            objs = list(objs)
+            self.repo.update_many(objs)
+            for obj in objs:
+                self._invalidate(obj.pk, obj)
+
+    def delete(self, pk: int) -> None:
+        with self._lock:
+            self.repo.delete(pk)
+            self._invalidate(pk)
+
+    def delete_many(self, pks: Iterable[int]) -> None:
+        with self._lock:
+            pks = list(pks)
+            self.repo.delete_many(pks)
+            for pk in pks:
+                self._invalidate(pk)
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        if not hasattr(self._pending, 'stack'):
+            self._pending.stack = []
+        stack: list[list[tuple[int, T | None]]] = self._pending.stack
+        stack.append([])
+        try:
+            with self.repo.transaction():
+                yield
+        except BaseException:
+            stack.pop()
+            self.clear()
+            raise
+        changed = stack.pop()
+        if stack:
+            stack[-1].extend(changed)
+            return
+        with self._lock:
+            for pk, obj in changed:
+                self._invalidate(pk, obj)
+
+    def clear(self) -> None:
+        """ Очистить кэш (например, после изменения данных в обход репозитория) """
+        with self._lock:
+            self._objects.clear()
+            self._queries.clear()
+
+    def stats(self) -> dict[str, int]:
+        """ Счетчики попаданий и промахов и текущий размер кэша """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'objects': len(self._objects), 'queries': len(self._queries)}
@@ -0,0 +1,199 @@
+"""
+Модуль описывает индекс иерархии категорий и репозиторий, поддерживающий его
+
+Для каждой категории хранится материализованный путь - кортеж id категорий
+от категории верхнего уровня до данной включительно. Пути хранятся также
+в отсортированном списке, в котором все потомки категории идут подряд сразу
+за ней, поэтому предки, потомки и глубина категории находятся одним
+обращением к индексу, без повторных запросов к репозиторию.
+"""
+
+from bisect import bisect_left, insort
+from contextlib import contextmanager
+from math import inf
+from typing import TYPE_CHECKING, Iterable, Iterator
+
+from bookkeeper.repository.abstract_repository import AbstractRepository
+from bookkeeper.repository.delegating_repository import DelegatingRepository
+
+if TYPE_CHECKING:
+    from bookkeeper.models.category import Category
+
+
+class CategoryHierarchy:
+    """
+    Индекс иерархии категорий (материализованные пути в памяти).
+    Категории, родитель которых отсутствует в индексе, считаются
+    категориями верхнего уровня.
+    """
+
+    def __init__(self, categories: Iterable['Category'] = ()) -> None:
+        self._parents: dict[int, int | None] = {}
+        self._paths: dict[int, tuple[int, ...]] = {}
+        self._sorted: list[tuple[int, ...]] = []
+        self.build(categories)
+
+    def build(self, categories: Iterable['Category']) -> None:
+        """
+        Построить индекс заново по списку категорий за один проход.
+        Порядок категорий в списке не важен.
+        """
+        self._parents = {cat.pk: cat.parent for cat in categories}
+        self._paths = {}
+        for pk in self._parents:
+            self._path_of(pk)
+        self._sorted = sorted(self._paths.values())
+
+    def _path_of(self, pk: int) -> tuple[int, ...]:
+        chain = []
+        node: int | None = pk
+        while node is not None and node in self._parents and node not in self._paths:
+            chain.append(node)
+            node = self._parents[node]
+            if node in chain:
+                raise ValueError(f'category {pk} is its own ancestor')
+        path = self._paths.get(node, ()) if node is not None else ()
+        for item in reversed(chain):
+            path = path + (item,)
+            self._paths[item] = path
+        return self._paths[pk]
+
+    def _subtree_slice(self, pk: int) -> slice:
+        path = self._paths[pk]
+        start = bisect_left(self._sorted, path)
+        end = bisect_left(self._sorted, path + (inf,), lo=start)
+        return slice(start, end)
+
+    def __contains__(self, pk: int) -> bool:
+        return pk in self._paths
+
+    def __len__(self) -> int:
+        return len(self._paths)
+
+    def parent(self, pk: int) -> int | None:
+        """ id родительской категории """
+        return self._parents[pk]
+
+    def path(self, pk: int) -> tuple[int, ...]:
+        """ Путь от категории верхнего уровня до категории pk включительно """
+        return self._paths[pk]
+
+    def depth(self, pk: int) -> int:
+        """ Глубина категории (у категорий верхнего уровня - 0) """
+        return len(self._paths[pk]) - 1
+
+    def ancestors(self, pk: int) -> list[int]:
+        """ id предков категории от родителя до категории верхнего уровня """
+        return list(reversed(self._paths[pk][:-1]))
+
+    def descendants(self, pk: int) -> list[int]:
+        """ id всех потомков категории (в порядке обхода в глубину) """
+        subtree = self._sorted[self._subtree_slice(pk)]
+        return [path[-1] for path in subtree[1:]]
+
+    def add(self, pk: int, parent: int | None) -> None:
+        """ Добавить в индекс категорию pk с родителем parent """
+        if pk in self._paths:
+            raise ValueError(f'category {pk} is already indexed')
+        self._parents[pk] = parent
+        path = self._paths.get(parent, ()) + (pk,) if parent is not None else (pk,)
+        self._paths[pk] = path
+        insort(self._sorted, path)
+
+    def is_ancestor(self, ancestor: int, pk: int) -> bool:
+        """ Является ли ancestor предком категории pk (или ею самой) """
+        return pk in self._paths and ancestor in self._paths[pk]
+
+    def move(self, pk: int, parent: int | None) -> None:
+        """ Перенести категорию pk (вместе с потомками) к родителю parent """
+        if parent is not None and self.is_ancestor(pk, parent):
+            raise ValueError(f'cannot move category {pk} under its descendant {parent}')
+        old_path = self._paths[pk]
+        new_path = self._paths.get(parent, ()) + (pk,) if parent is not None else (pk,)
+        self._parents[pk] = parent
+        if new_path == old_path:
+            return
+        subtree = self._subtree_slice(pk)
+        moved = [new_path + path[len(old_path):] for path in self._sorted[subtree]]
+        del self._sorted[subtree]
+        for path in moved:
+            self._paths[path[-1]] = path
+            insort(self._sorted, path)
+
+    def remove(self, pk: int) -> None:
+        """
+        Удалить категорию pk из индекса. Ее потомки остаются в индексе,
+        а непосредственные подкатегории становятся категориями верхнего уровня.
+        """
+        old_path = self._paths[pk]
+        subtree = self._subtree_slice(pk)
+        moved = [path[len(old_path):] for path in self._sorted[subtree][1:]]
+        del self._sorted[subtree]
+        del self._paths[pk]
+        del self._parents[pk]
+        for path in moved:
+            self._paths[path[-1]] = path
+            insort(self._sorted, path)
+            if len(path) == 1:
+                self._parents[path[0]] = None
+
+
+class CategoryHierarchyRepository(DelegatingRepository['Category']):
+    """
+    Репозиторий категорий, поддерживающий индекс иерархии hierarchy
+    при добавлении, изменении и удалении категорий.
+    Хранение объектов делегируется репозиторию repo.
+    Если транзакция repo отменена, индекс строится заново по repo.
+    """
+
+    hierarchy: CategoryHierarchy
+
+    def __init__(self, repo: AbstractRepository['Category']) -> None:
+        super().__init__(repo)
+        self.hierarchy = CategoryHierarchy(repo.get_all())
+
+    def add(self, obj: 'Category') -> int:
+        pk = self.repo.add(obj)
+        self.hierarchy.add(pk, obj.parent)
+        return pk
+
+    def add_many(self, objs: Iterable['Category']) -> list[int]:
+        objs = list(objs)
+        pks = self.repo.add_many(objs)
+        for obj in objs:
+            self.hierarchy.add(obj.pk, obj.parent)
+        return pks
+
+    def update(self, obj: 'Category') -> None:
+        moved = obj.pk in self.hierarchy and obj.parent != self.hierarchy.parent(obj.pk)
+        if moved and obj.parent is not None \
+                and self.hierarchy.is_ancestor(obj.pk, obj.parent):
+            raise ValueError(f'cannot move category {obj.pk} under its descendant')
+        self.repo.update(obj)
+        if moved:
+            self.hierarchy.move(obj.pk, obj.parent)
+
+    def update_many(self, objs: Iterable['Category']) -> None:
+        for obj in objs:
+            self.update(obj)
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        try:
+            with self.repo.transaction():
+                yield
+        except BaseException:
+            self.hierarchy.build(self.repo.get_all())
+            raise
+
+    def delete(self, pk: int) -> None:
+        self.repo.delete(pk)
+        if pk in self.hierarchy:
+            self.hierarchy.remove(pk)
+
+    def delete_many(self, pks: Iterable[int]) -> None:
+        pks = list(pks)
+        self.repo.delete_many(pks)
+        for pk in pks:
+            if pk in self.hierarchy:
+                self.hierarchy.remove(pk)
@@ -0,0 +1,147 @@
+"""
+Модуль описывает пул долгоживущих соединений с базой данных SQLite
+
+Пул создается один раз на файл базы данных и разделяется всеми репозиториями,
+которые строит SQLiteRepository.repository_factory. Соединения создаются лениво,
+PRAGMA применяются к каждому соединению один раз при его создании.
+Соединения преобразуют даты по объявленным типам столбцов (см. sqlite_types).
+"""
+
+from contextlib import contextmanager
+from queue import Empty, LifoQueue
+import sqlite3
+import threading
+from typing import Iterator
+
+# регистрирует адаптеры и конвертеры дат
+from bookkeeper.repository import sqlite_types  # noqa: F401  # pylint: disable=unused-import
+
+DEFAULT_POOL_SIZE = 5
+DEFAULT_PRAGMAS: dict[str, str] = {'foreign_keys': 'ON'}
+
+
+class ConnectionPool:
+    """
+    Пул соединений с SQLite.
+
+    Каждый поток получает из пула собственное соединение и удерживает его
+    до выхода из самого внешнего блока connection(): вложенные вызовы в том же
+    потоке возвращают то же соединение, не занимая новое. Изменения фиксируются
+    (commit) при выходе из внешнего блока и откатываются при исключении.
+
+    db_file - путь к файлу базы данных
+    pool_size - максимальное число одновременно открытых соединений
+    pragmas - словарь PRAGMA, применяемых к каждому новому соединению
+    timeout - сколько секунд ждать свободное соединение, если пул исчерпан
+    """
+
+    db_file: str
+    pool_size: int
+    pragmas: dict[str, str]
+    timeout: float
+
+    def __init__(self,
+                 db_file: str,
+                 pool_size: int = DEFAULT_POOL_SIZE,
+                 pragmas: dict[str, str] | None = None,
+                 timeout: float = 5.0) -> None:
+        if pool_size < 1:
+            raise ValueError(f'pool size must be positive, got {pool_size}')
+        self.db_file = db_file
+        # каждое соединение с ':memory:' - отдельная база, поэтому оно одно
+        self.pool_size = 1 if db_file == ':memory:' else pool_size
+        self.pragmas = dict(DEFAULT_PRAGMAS if pragmas is None else pragmas)
+        self.timeout = timeout
+        self._idle: LifoQueue[sqlite3.Connection] = LifoQueue()
+        self._connections: list[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        con = sqlite3.connect(self.db_file, check_same_thread=False,
+                              detect_types=sqlite3.PARSE_DECLTYPES)
+        for name, value in self.pragmas.items():
+            con.execute(f'PRAGMA {name} = {value}')
+        return con
+
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except Empty:
+            pass
+        with self._lock:
+            if len(self._connections) < self.pool_size:
+                con = self._connect()
+                self._connections.append(con)
+                return con
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except Empty as exc:
+            raise TimeoutError(
+                f'no free connection to {self.db_file} '
+                f'in {self.timeout} seconds') from exc
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """
+        Получить соединение текущего потока.
+        При выходе из внешнего блока транзакция фиксируется
+        (или откатывается при исключении), а соединение возвращается в пул.
+        """
+        con: sqlite3.Connection | None = getattr(self._local, 'connection', None)
+        if con is not None:
+            yield con
+            return
+        con = self._acquire()
+        self._local.connection = con
+        try:
+            with con:
+                yield con
+        finally:
+            self._local.connection = None
+            self._idle.put(con)
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """
+        Транзакция текущего потока: все изменения внутри блока (через любые
+        репозитории с этим пулом) фиксируются вместе одним commit при выходе
+        из внешнего блока connection() или transaction().
+        Каждый блок transaction() - точка сохранения (SAVEPOINT), поэтому
+        блоки можно вкладывать: исключение откатывает изменения только
+        своего блока и передается дальше.
+        """
+        with self.connection() as con:
+            depth = getattr(self._local, 'savepoints', 0)
+            if not con.in_transaction:
+                # без открытой транзакции RELEASE внешней точки сохранения
+                # сразу фиксировал бы изменения - транзакцию открывает и
+                # фиксирует блок connection()
+                con.execute('BEGIN')
+            name = f'bookkeeper_{depth}'
+            con.execute(f'SAVEPOINT {name}')
+            self._local.savepoints = depth + 1
+            try:
+                yield con
+            except BaseException:
+                con.execute(f'ROLLBACK TO {name}')
+                con.execute(f'RELEASE {name}')
+                raise
+            else:
+                con.execute(f'RELEASE {name}')
+            finally:
+                self._local.savepoints = depth
+
+    @property
+    def size(self) -> int:
+        """ Число открытых соединений """
+        return len(self._connections)
+
+    def close(self) -> None:
+        """ Закрыть все соединения пула """
+        with self._lock:
+            for con in self._connections:
+                con.close()
+            self._connections.clear()
+            while not self._idle.empty():
+                self._idle.get_nowait()
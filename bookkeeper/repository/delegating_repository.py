@@ -0,0 +1,81 @@
+"""
+Модуль описывает базовый класс репозиториев-декораторов
+
+Декоратор оборачивает другой репозиторий и по умолчанию передает ему все
+вызовы, переопределяя только те методы, поведение которых он меняет.
+Декораторы можно вкладывать друг в друга.
+"""
+
+from typing import Any, ContextManager, Iterable, Iterator
+
+from bookkeeper.repository.abstract_repository import (
+    DEFAULT_BATCH_SIZE, AbstractRepository, T
+)
+from bookkeeper.repository.query import GroupBy, OrderBy
+
+
+class DelegatingRepository(AbstractRepository[T]):
+    """
+    Репозиторий, передающий все вызовы репозиторию repo.
+    Атрибуты, которых нет у декоратора (например, pool или drop_table
+    у SQLiteRepository), берутся у обернутого репозитория.
+    """
+
+    repo: AbstractRepository[T]
+
+    def __init__(self, repo: AbstractRepository[T]) -> None:
+        self.repo = repo
+
+    def __getattr__(self, name: str) -> Any:
+        if name == 'repo':
+            raise AttributeError(name)
+        return getattr(self.repo, name)
+
+    def add(self, obj: T) -> int:
+        return self.repo.add(obj)
+
+    def add_many(self, objs: Iterable[T]) -> list[int]:
+        return self.repo.add_many(objs)
+
+    def get(self, pk: int) -> T | None:
+        return self.repo.get(pk)
+
+    def get_all(self,
+                where: dict[str, Any] | None = None,
+                order_by: OrderBy = None,
+                limit: int | None = None) -> list[T]:
+        return self.repo.get_all(where, order_by, limit)
+
+    def page(self,
+             after_pk: int = 0,
+             limit: int | None = DEFAULT_BATCH_SIZE,
+             where: dict[str, Any] | None = None) -> list[T]:
+        return self.repo.page(after_pk, limit, where)
+
+    def iter_all(self,
+                 where: dict[str, Any] | None = None,
+                 order_by: OrderBy = None,
+                 batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[T]:
+        return self.repo.iter_all(where, order_by, batch_size)
+
+    def aggregate(self,
+                  func: str,
+                  field: str | None = None,
+                  where: dict[str, Any] | None = None,
+                  group_by: GroupBy = None) -> Any:
+        return self.repo.aggregate(func, field, where, group_by)
+
+    def update(self, obj: T) -> None:
+        self.repo.update(obj)
+
+    def update_many(self, objs: Iterable[T]) -> None:
+        self.repo.update_many(objs)
+
+    def delete(self, pk: int) -> None:
+        self.repo.delete(pk)
+
+    def delete_many(self, pks: Iterable[int]) -> None:
+        self.repo.delete_many(pks)
+
+    def transaction(self) -> ContextManager[None]:
+        return self.repo.transaction()
@@ -0,0 +1,115 @@
+"""
+Модуль описывает репозиторий, замеряющий время своих операций
+"""
+
+import time
+from typing import Any, Iterable, Iterator
+
+from bookkeeper.instrumentation import Instrumentation
+from bookkeeper.repository.abstract_repository import (
+    DEFAULT_BATCH_SIZE, AbstractRepository, T
+)
+from bookkeeper.repository.delegating_repository import DelegatingRepository
+from bookkeeper.repository.query import GroupBy, OrderBy
+
+
+class InstrumentedRepository(DelegatingRepository[T]):
+    """
+    Репозиторий, записывающий в instrumentation время и число строк каждого
+    вызова методов AbstractRepository под именем '<name>.<метод>'.
+    Для iter_all замеряется время получения объектов от repo,
+    без времени их обработки вызывающим кодом.
+    """
+
+    instrumentation: Instrumentation
+    name: str
+
+    def __init__(self,
+                 repo: AbstractRepository[T],
+                 instrumentation: Instrumentation,
+                 name: str) -> None:
+        super().__init__(repo)
+        self.instrumentation = instrumentation
+        self.name = name
+
+    def _call(self, method: str, rows: Any, *args: Any) -> Any:
+        """
+        Вызвать метод repo; rows - функция, возвращающая по результату
+        число строк, или None, если строки не считаются
+        """
+        func = getattr(self.repo, method)
+        if not self.instrumentation.enabled:
+            return func(*args)
+        start = time.perf_counter()
+        try:
+            result = func(*args)
+        finally:
+            seconds = time.perf_counter() - start
+        self.instrumentation.record(f'{self.name}.{method}', seconds,
+                                    None if rows is None else rows(result))
+        return result
+
+    def add(self, obj: T) -> int:
+        return self._call('add', None, obj)
+
+    def add_many(self, objs: Iterable[T]) -> list[int]:
+        return self._call('add_many', len, objs)
+
+    def get(self, pk: int) -> T | None:
+        return self._call('get', lambda obj: int(obj is not None), pk)
+
+    def get_all(self,
+                where: dict[str, Any] | None = None,
+                order_by: OrderBy = None,
+                limit: int | None = None) -> list[T]:
+        return self._call('get_all', len, where, order_by, limit)
+
+    def page(self,
+             after_pk: int = 0,
+             limit: int | None = DEFAULT_BATCH_SIZE,
+             where: dict[str, Any] | None = None) -> list[T]:
+        return self._call('page', len, after_pk, limit, where)
+
+    def iter_all(self,
+                 where: dict[str, Any] | None = None,
+                 order_by: OrderBy = None,
+                 batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[T]:
+        if not self.instrumentation.enabled:
+            yield from self.repo.iter_all(where, order_by, batch_size)
+            return
+        seconds, rows = 0.0, 0
+        iterator = self.repo.iter_all(where, order_by, batch_size)
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    obj = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    seconds += time.perf_counter() - start
+                rows += 1
+                yield obj
+        finally:
+            self.instrumentation.record(f'{self.name}.iter_all', seconds, rows)
+
+    def aggregate(self,
+                  func: str,
+                  field: str | None = None,
+                  where: dict[str, Any] | None = None,
+                  group_by: GroupBy = None) -> Any:
+        return self._call('aggregate', None, func, field, where, group_by)
+
+    def update(self, obj: T) -> None:
+        self._call('update', None, obj)
+
+    def update_many(self, objs: Iterable[T]) -> None:
+        objs = list(objs)
+        self._call('update_many', lambda _: len(objs), objs)
+
+    def delete(self, pk: int) -> None:
+        self._call('delete', None, pk)
+
+    def delete_many(self, pks: Iterable[int]) -> None:
+        pks = list(pks)
+        self._call('delete_many', lambda _: len(pks), pks)
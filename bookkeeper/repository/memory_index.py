@@ -0,0 +1,137 @@
+"""
+Модуль описывает вторичные индексы для MemoryRepository
+
+Хеш-индекс обслуживает проверки на равенство, None и вхождение в набор,
+сортированный индекс - также диапазоны (Range). Индекс возвращает
+множество id объектов-кандидатов или None, если условие он не обслуживает.
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from math import inf
+from typing import Any, Iterable
+
+from bookkeeper.repository.query import COLLECTION_TYPES, Range
+
+
+class HashIndex:
+    """ Хеш-индекс: значение поля -> множество id объектов """
+
+    def __init__(self) -> None:
+        self._buckets: dict[Any, set[int]] = {}
+
+    def add(self, value: Any, pk: int) -> None:
+        """ Добавить в индекс объект pk со значением поля value """
+        self._buckets.setdefault(value, set()).add(pk)
+
+    def add_many(self, items: Iterable[tuple[Any, int]]) -> None:
+        """ Добавить в индекс пары (значение поля, id объекта) """
+        for value, pk in items:
+            self.add(value, pk)
+
+    def remove(self, value: Any, pk: int) -> None:
+        """ Удалить из индекса объект pk со значением поля value """
+        bucket = self._buckets[value]
+        bucket.discard(pk)
+        if not bucket:
+            del self._buckets[value]
+
+    def lookup(self, condition: Any) -> set[int] | None:
+        """ id объектов, удовлетворяющих условию, или None """
+        if isinstance(condition, Range):
+            return None
+        if isinstance(condition, COLLECTION_TYPES):
+            result: set[int] = set()
+            for value in condition:
+                result |= self._buckets.get(value, set())
+            return result
+        return set(self._buckets.get(condition, ()))
+
+
+class SortedIndex:
+    """
+    Сортированный индекс: список пар (значение, id), поиск - бинарный.
+    Значения None хранятся отдельно. Одиночное добавление вставляет пару
+    на ее место бинарным поиском; массовая загрузка (add_many) добавляет
+    пары в конец и откладывает сортировку до ближайшего обращения,
+    поэтому список сортируется один раз.
+    """
+
+    def __init__(self) -> None:
+        self._entries: list[tuple[Any, int]] = []
+        self._nulls: set[int] = set()
+        self._dirty = False
+
+    def _sorted(self) -> list[tuple[Any, int]]:
+        if self._dirty:
+            self._entries.sort()
+            self._dirty = False
+        return self._entries
+
+    def add(self, value: Any, pk: int) -> None:
+        """ Добавить в индекс объект pk со значением поля value """
+        if value is None:
+            self._nulls.add(pk)
+            return
+        entry = (value, pk)
+        if self._dirty or not self._entries or entry >= self._entries[-1]:
+            self._entries.append(entry)
+        else:
+            insort(self._entries, entry)
+
+    def add_many(self, items: Iterable[tuple[Any, int]]) -> None:
+        """ Добавить в индекс пары (значение поля, id объекта) """
+        size = len(self._entries)
+        for value, pk in items:
+            if value is None:
+                self._nulls.add(pk)
+            else:
+                self._entries.append((value, pk))
+        if len(self._entries) > size:
+            self._dirty = True
+
+    def remove(self, value: Any, pk: int) -> None:
+        """ Удалить из индекса объект pk со значением поля value """
+        if value is None:
+            self._nulls.discard(pk)
+            return
+        entries = self._sorted()
+        i = bisect_left(entries, (value, pk))
+        if i < len(entries) and entries[i] == (value, pk):
+            del entries[i]
+
+    def _range(self, start: Any, end: Any,
+               include_start: bool, include_end: bool) -> set[int]:
+        entries = self._sorted()
+        if start is None:
+            lo = 0
+        elif include_start:
+            lo = bisect_left(entries, (start,))
+        else:
+            lo = bisect_right(entries, (start, inf))
+        if end is None:
+            hi = len(entries)
+        elif include_end:
+            hi = bisect_right(entries, (end, inf), lo=lo)
+        else:
+            hi = bisect_left(entries, (end,), lo=lo)
+        return {pk for _, pk in entries[lo:hi]}
+
+    def lookup(self, condition: Any) -> set[int] | None:
+        """ id объектов, удовлетворяющих условию, или None """
+        if condition is None:
+            return set(self._nulls)
+        if isinstance(condition, Range):
+            return self._range(condition.start, condition.end,
+                               condition.include_start, condition.include_end)
+        if isinstance(condition, COLLECTION_TYPES):
+            result: set[int] = set()
+            for value in condition:
+                result |= self.lookup(value) or set()
+            return result
+        return self._range(condition, condition, True, True)
+
+
+INDEX_TYPES: dict[str, type[HashIndex] | type[SortedIndex]] = {
+    'hash': HashIndex,
+    'sorted': SortedIndex,
+}
@@ -2,42 +2,280 @@
 Модуль описывает репозиторий, работающий в оперативной памяти
 """
 
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager
 from itertools import count
-from typing import Any
+from typing import Any, Iterable, Iterator
 
-from bookkeeper.repository.abstract_repository import AbstractRepository, T
+from bookkeeper.repository.abstract_repository import (
+    DEFAULT_BATCH_SIZE, AbstractRepository, T
+)
+from bookkeeper.repository.memory_index import INDEX_TYPES, HashIndex, SortedIndex
+from bookkeeper.repository.query import (
+    COLLECTION_TYPES, OrderBy, Range, keyset_where, matches, sort_objects
+)
 
 
 class MemoryRepository(AbstractRepository[T]):
     """
     Репозиторий, работающий в оперативной памяти. Хранит данные в словаре.
+
+    По желанию можно построить вторичные индексы по полям объектов:
+    indexes - словарь {'название_поля': 'hash' | 'sorted'}, см. create_index.
+    get_all использует индекс, если он есть хотя бы для одного поля условия.
+
+    Внутри transaction() репозиторий запоминает прежние версии изменяемых
+    объектов (журнал отмены) и при исключении возвращает их; сами объекты
+    не копируются, поэтому поля объекта, измененные до вызова update,
+    не восстанавливаются. id, выданные в отмененной транзакции, повторно
+    не используются.
     """
 
-    def __init__(self) -> None:
+    def __init__(self, indexes: dict[str, str] | None = None) -> None:
         self._container: dict[int, T] = {}
         self._counter = count(1)
+        # id объектов по возрастанию для page (None - нужно построить заново)
+        self._pks: list[int] | None = []
+        self._indexes: dict[str, HashIndex | SortedIndex] = {}
+        # значения индексируемых полей на момент индексации объекта
+        self._indexed: dict[int, dict[str, Any]] = {}
+        # журналы отмены открытых транзакций: (id, объект до изменения или None)
+        self._undo: list[list[tuple[int, T | None]]] = []
+        for attr, kind in (indexes or {}).items():
+            self.create_index(attr, kind)
+
+    def create_index(self, attr: str, kind: str = 'hash') -> None:
+        """
+        Построить индекс по полю attr.
+        kind - 'hash' (равенство и наборы значений) или
+        'sorted' (также диапазоны Range)
+        """
+        if kind not in INDEX_TYPES:
+            raise ValueError(f'unknown index kind {kind!r}, expected one of '
+                             f'{list(INDEX_TYPES)}')
+        index = INDEX_TYPES[kind]()
+        values = [(getattr(obj, attr, None), pk) for pk, obj in self._container.items()]
+        index.add_many(values)
+        for value, pk in values:
+            self._indexed.setdefault(pk, {})[attr] = value
+        self._indexes[attr] = index
+
+    def _index(self, pk: int, obj: T) -> None:
+        if not self._indexes:
+            return
+        values = {attr: getattr(obj, attr, None) for attr in self._indexes}
+        for attr, value in values.items():
+            self._indexes[attr].add(value, pk)
+        self._indexed[pk] = values
+
+    def _index_many(self, pks: list[int], objs: list[T]) -> None:
+        """ Массовое добавление в индексы (см. SortedIndex.add_many) """
+        if not self._indexes:
+            return
+        for attr, index in self._indexes.items():
+            index.add_many((getattr(obj, attr, None), pk) for pk, obj in zip(pks, objs))
+        for pk, obj in zip(pks, objs):
+            self._indexed[pk] = {attr: getattr(obj, attr, None) for attr in self._indexes}
+
+    def _unindex(self, pk: int) -> None:
+        for attr, value in self._indexed.pop(pk, {}).items():
+            self._indexes[attr].remove(value, pk)
+
+    def _remember(self, pks: Iterable[int]) -> None:
+        """ Записать в журнал отмены текущее состояние объектов pks """
+        if self._undo:
+            self._undo[-1].extend((pk, self._container.get(pk)) for pk in pks)
+
+    def _rollback(self, log: list[tuple[int, T | None]]) -> None:
+        restored = False
+        for pk, obj in reversed(log):
+            if self._container.pop(pk, None) is not None:
+                self._unindex(pk)
+            if obj is not None:
+                self._container[pk] = obj
+                self._index(pk, obj)
+                restored = True
+        if restored:
+            # восстановленные объекты вернулись в конец словаря
+            self._container = dict(sorted(self._container.items()))
+        self._pks = None
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        self._undo.append([])
+        try:
+            yield
+        except BaseException:
+            self._rollback(self._undo.pop())
+            raise
+        log = self._undo.pop()
+        if self._undo:
+            self._undo[-1].extend(log)
+
+    def _candidates(self, where: dict[str, Any]) -> list[int] | None:
+        """ id объектов, отобранных по индексу (или None, если индекса нет) """
+        pk_condition = where.get('pk')
+        if pk_condition is not None and not isinstance(pk_condition, Range):
+            pks = pk_condition if isinstance(pk_condition, COLLECTION_TYPES) \
+                else [pk_condition]
+            return sorted({pk for pk in pks if pk in self._container})
+        best: set[int] | None = None
+        for attr, condition in where.items():
+            index = self._indexes.get(attr)
+            if index is None:
+                continue
+            found = index.lookup(condition)
+            if found is not None and (best is None or len(found) < len(best)):
+                best = found
+        return None if best is None else sorted(best)
 
     def add(self, obj: T) -> int:
         if getattr(obj, 'pk', None) != 0:
             raise ValueError(f'trying to add object {obj} with filled `pk` attribute')
         pk = next(self._counter)
+        self._remember([pk])
         self._container[pk] = obj
+        if self._pks is not None:
+            self._pks.append(pk)
         obj.pk = pk
+        self._index(pk, obj)
         return pk
 
     def get(self, pk: int) -> T | None:
         return self._container.get(pk)
 
-    def get_all(self, where: dict[str, Any] | None = None) -> list[T]:
+    def get_all(self,
+                where: dict[str, Any] | None = None,
+                order_by: OrderBy = None,
+                limit: int | None = None) -> list[T]:
+        if where is None:
+            result = list(self._container.values())
+        else:
+            candidates = self._candidates(where)
+            if candidates is None:
+                objs = self._container.values()
+            else:
+                objs = (self._container[pk] for pk in candidates)
+            result = [obj for obj in objs if matches(obj, where)]
+        if order_by is not None:
+            result = sort_objects(result, order_by)
+        if limit is not None:
+            result = result[:limit]
+        return result
+
+    def page(self,
+             after_pk: int = 0,
+             limit: int | None = DEFAULT_BATCH_SIZE,
+             where: dict[str, Any] | None = None) -> list[T]:
+        """
+        Начало страницы ищется двоичным поиском в списке id по возрастанию,
+        дальше объекты проверяются по порядку, пока не наберется limit
+        подходящих. Если для поля условия есть индекс или условие на id -
+        значение или набор, страница выбирается через get_all.
+        """
+        where = keyset_where(where, after_pk)
+        if where is None:
+            return []
+        condition = where.pop('pk')
+        if not isinstance(condition, Range) or any(attr in self._indexes
+                                                   for attr in where):
+            return self.get_all(where | {'pk': condition}, order_by='pk', limit=limit)
+        if self._pks is None:
+            self._pks = sorted(self._container)
+        pks = self._pks
+        if condition.include_start:
+            start = bisect_left(pks, condition.start)
+        else:
+            start = bisect_right(pks, condition.start)
+        if condition.end is None:
+            end = len(pks)
+        elif condition.include_end:
+            end = bisect_right(pks, condition.end, lo=start)
+        else:
+            end = bisect_left(pks, condition.end, lo=start)
+        result: list[T] = []
+        for position in range(start, end):
+            if limit is not None and len(result) >= limit:
+                break
+            obj = self._container[pks[position]]
+            if matches(obj, where):
+                result.append(obj)
+        return result
+
+    def iter_all(self,
+                 where: dict[str, Any] | None = None,
+                 order_by: OrderBy = None,
+                 batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[T]:
+        """
+        Без сортировки объекты выдаются по одному в порядке id (порядке
+        добавления в словарь), без промежуточного списка; batch_size
+        не используется. Изменять репозиторий во время перебора нельзя.
+        """
+        if order_by is not None:
+            yield from self.get_all(where, order_by)
+            return
         if where is None:
-            return list(self._container.values())
-        return [obj for obj in self._container.values()
-                if all(getattr(obj, attr) == value for attr, value in where.items())]
+            yield from self._container.values()
+            return
+        candidates = self._candidates(where)
+        if candidates is None:
+            objs: Iterable[T] = self._container.values()
+        else:
+            objs = (self._container[pk] for pk in candidates)
+        for obj in objs:
+            if matches(obj, where):
+                yield obj
+
+    def add_many(self, objs: Iterable[T]) -> list[int]:
+        objs = list(objs)
+        for obj in objs:
+            if getattr(obj, 'pk', None) != 0:
+                raise ValueError(f'trying to add object {obj} with filled `pk` attribute')
+        pks = [next(self._counter) for _ in objs]
+        for pk, obj in zip(pks, objs):
+            obj.pk = pk
+        self._remember(pks)
+        self._container.update(zip(pks, objs))
+        if self._pks is not None:
+            self._pks.extend(pks)
+        self._index_many(pks, objs)
+        return pks
 
     def update(self, obj: T) -> None:
         if obj.pk == 0:
             raise ValueError('attempt to update object with unknown primary key')
+        self._remember([obj.pk])
+        if obj.pk not in self._container:
+            self._pks = None
         self._container[obj.pk] = obj
+        self._unindex(obj.pk)
+        self._index(obj.pk, obj)
+
+    def update_many(self, objs: Iterable[T]) -> None:
+        objs = list(objs)
+        if any(obj.pk == 0 for obj in objs):
+            raise ValueError('attempt to update object with unknown primary key')
+        self._remember(obj.pk for obj in objs)
+        if any(obj.pk not in self._container for obj in objs):
+            self._pks = None
+        self._container.update((obj.pk, obj) for obj in objs)
+        for obj in objs:
+            self._unindex(obj.pk)
+            self._index(obj.pk, obj)
 
     def delete(self, pk: int) -> None:
+        self._remember([pk])
         self._container.pop(pk)
+        self._pks = None
+        self._unindex(pk)
+
+    def delete_many(self, pks: Iterable[int]) -> None:
+        pks = list(pks)
+        missing = [pk for pk in pks if pk not in self._container]
+        if missing:
+            raise KeyError(missing[0])
+        self._remember(pks)
+        self._pks = None
+        for pk in pks:
+            if self._container.pop(pk, None) is not None:
+                self._unindex(pk)
@@ -0,0 +1,102 @@
+"""
+Модуль описывает репозиторий, публикующий события об изменениях
+"""
+
+from contextlib import contextmanager
+import threading
+from typing import Any, Iterable, Iterator
+
+from bookkeeper.events import ADDED, ADDED_MANY, DELETED, UPDATED, EventBus
+from bookkeeper.repository.abstract_repository import AbstractRepository, T
+from bookkeeper.repository.delegating_repository import DelegatingRepository
+
+
+class ObservableRepository(DelegatingRepository[T]):
+    """
+    Репозиторий, публикующий в шину bus события об изменении объектов
+    модели model (см. bookkeeper.events) после успешной записи в repo.
+    Объект до изменения для события 'updated' читается из repo,
+    только если на это событие есть подписчики. add_many публикует
+    одно событие 'added_many', если на него есть подписчики, иначе -
+    'added' для каждого объекта.
+    События изменений внутри transaction() откладываются до выхода
+    из внешнего блока и не публикуются, если изменения отменены.
+    """
+
+    bus: EventBus
+    model: type
+
+    def __init__(self, repo: AbstractRepository[T], bus: EventBus, model: type) -> None:
+        super().__init__(repo)
+        self.bus = bus
+        self.model = model
+        # отложенные события открытых транзакций, у каждого потока свои
+        self._pending = threading.local()
+
+    def _publish(self, event: str, *args: Any) -> None:
+        stack = getattr(self._pending, 'stack', None)
+        if stack:
+            stack[-1].append((event, args))
+        else:
+            self.bus.publish(self.model, event, *args)
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        if not hasattr(self._pending, 'stack'):
+            self._pending.stack = []
+        stack: list[list[tuple[str, tuple[Any, ...]]]] = self._pending.stack
+        stack.append([])
+        try:
+            with self.repo.transaction():
+                yield
+        except BaseException:
+            stack.pop()
+            raise
+        events = stack.pop()
+        if stack:
+            stack[-1].extend(events)
+            return
+        for event, args in events:
+            self.bus.publish(self.model, event, *args)
+
+    def add(self, obj: T) -> int:
+        pk = self.repo.add(obj)
+        self._publish(ADDED, obj)
+        return pk
+
+    def add_many(self, objs: Iterable[T]) -> list[int]:
+        objs = list(objs)
+        pks = self.repo.add_many(objs)
+        if self.bus.has_subscribers(self.model, ADDED_MANY):
+            self._publish(ADDED_MANY, objs)
+            return pks
+        for obj in objs:
+            self._publish(ADDED, obj)
+        return pks
+
+    def _old(self, objs: list[T]) -> list[T | None]:
+        if not self.bus.has_subscribers(self.model, UPDATED):
+            return [None] * len(objs)
+        return [self.repo.get(obj.pk) for obj in objs]
+
+    def update(self, obj: T) -> None:
+        old = self._old([obj])[0]
+        self.repo.update(obj)
+        self._publish(UPDATED, old, obj)
+
+    def update_many(self, objs: Iterable[T]) -> None:
+        objs = list(objs)
+        old = self._old(objs)
+        self.repo.update_many(objs)
+        for old_obj, obj in zip(old, objs):
+            self._publish(UPDATED, old_obj, obj)
+
+    def delete(self, pk: int) -> None:
+        self.repo.delete(pk)
+        self._publish(DELETED, pk)
+
+    def delete_many(self, pks: Iterable[int]) -> None:
+        pks = list(pks)
+        self.repo.delete_many(pks)
+        for pk in pks:
+            self._publish(DELETED, pk)
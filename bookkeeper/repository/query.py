@@ -0,0 +1,233 @@
+"""
+Модуль описывает условия выборки, общие для всех репозиториев
+
+Условие where - словарь {'название_поля': значение}, где значение может быть:
+- обычным значением - проверка на равенство;
+- None - поле не заполнено;
+- списком, кортежем или множеством - значение поля входит в набор (IN);
+- объектом Range - значение поля лежит в диапазоне.
+
+Порядок сортировки order_by - название поля или список названий,
+минус перед названием означает сортировку по убыванию ('-end').
+
+Группировка group_by для агрегатов - название поля или список названий;
+к полю с датой можно добавить суффикс '__day', '__week' или '__month',
+тогда группы - дни ('2023-03-15'), недели (понедельник недели,
+'2023-03-13') или месяцы ('2023-03').
+"""
+
+from dataclasses import dataclass, replace
+from datetime import timedelta
+from typing import Any, Hashable, Iterable, Sequence
+
+from bookkeeper.utils import to_datetime
+
+OrderBy = str | Sequence[str] | None
+GroupBy = str | Sequence[str] | None
+COLLECTION_TYPES = (list, tuple, set, frozenset)
+AGGREGATE_FUNCTIONS = ('sum', 'count', 'min', 'max', 'avg')
+DATE_TRANSFORMS = ('day', 'week', 'month')
+
+
+@dataclass(frozen=True)
+class Range:
+    """
+    Диапазон значений поля.
+    start - нижняя граница, end - верхняя граница (None - без ограничения);
+    include_start, include_end - включать ли границы в диапазон.
+    По умолчанию диапазон полуоткрытый: start <= значение < end.
+    """
+    start: Any = None
+    end: Any = None
+    include_start: bool = True
+    include_end: bool = False
+
+    def __contains__(self, value: Any) -> bool:
+        if value is None:
+            return False
+        if self.start is not None and (
+                value < self.start or value == self.start and not self.include_start):
+            return False
+        if self.end is not None and (
+                value > self.end or value == self.end and not self.include_end):
+            return False
+        return True
+
+
+def condition_shape(value: Any) -> Hashable:
+    """
+    Форма условия - все, что влияет на текст SQL-запроса,
+    но не сами значения (они передаются параметрами).
+    """
+    if value is None:
+        return 'null'
+    if isinstance(value, Range):
+        return ('range', value.start is not None, value.end is not None,
+                value.include_start, value.include_end)
+    if isinstance(value, COLLECTION_TYPES):
+        return ('in', len(value))
+    return 'eq'
+
+
+def keyset_where(where: dict[str, Any] | None,
+                 after_pk: int) -> dict[str, Any] | None:
+    """
+    Условие where, дополненное условием id > after_pk (для keyset-пагинации,
+    см. AbstractRepository.page). Условие на id из where сохраняется:
+    диапазон сужается, из набора остаются id больше after_pk.
+    Возвращает None, если условию не удовлетворяет ни одна запись.
+    """
+    where = dict(where or {})
+    if 'pk' not in where:
+        where['pk'] = Range(start=after_pk, include_start=False)
+        return where
+    condition = where['pk']
+    if isinstance(condition, Range):
+        if condition.start is None or condition.start < after_pk or (
+                condition.start == after_pk and condition.include_start):
+            where['pk'] = replace(condition, start=after_pk, include_start=False)
+    elif isinstance(condition, COLLECTION_TYPES):
+        where['pk'] = tuple(sorted(pk for pk in condition
+                                   if pk is not None and pk > after_pk))
+        if not where['pk']:
+            return None
+    elif condition is None or condition <= after_pk:
+        return None
+    return where
+
+
+def parse_order_by(order_by: OrderBy) -> list[tuple[str, bool]]:
+    """
+    Разобрать порядок сортировки в список пар (название поля, по убыванию)
+    """
+    if order_by is None:
+        return []
+    if isinstance(order_by, str):
+        order_by = [order_by]
+    return [(name[1:], True) if name.startswith('-') else (name, False)
+            for name in order_by]
+
+
+def matches(obj: Any, where: dict[str, Any] | None) -> bool:
+    """ Проверить, удовлетворяет ли объект условию where """
+    if where is None:
+        return True
+    for attr, value in where.items():
+        field = getattr(obj, attr)
+        if value is None:
+            if field is not None:
+                return False
+        elif isinstance(value, Range):
+            if field not in value:
+                return False
+        elif isinstance(value, COLLECTION_TYPES):
+            if field not in value:
+                return False
+        elif field != value:
+            return False
+    return True
+
+
+def sort_objects(objs: Iterable[Any], order_by: OrderBy) -> list[Any]:
+    """
+    Отсортировать объекты в соответствии с order_by.
+    Сортировка устойчивая, поэтому выполняется начиная с последнего ключа.
+    Как и в sqlite, незаполненные значения (None) считаются наименьшими.
+    """
+    result = list(objs)
+    for name, descending in reversed(parse_order_by(order_by)):
+        result.sort(key=lambda obj, attr=name: _sort_key(getattr(obj, attr)),
+                    reverse=descending)
+    return result
+
+
+def _sort_key(value: Any) -> tuple[bool, Any]:
+    return value is not None, value
+
+
+def check_aggregate(func: str, field: str | None) -> None:
+    """ Проверить агрегатную функцию func и поле field """
+    if func not in AGGREGATE_FUNCTIONS:
+        raise ValueError(f'unknown aggregate function {func!r}, '
+                         f'expected one of {AGGREGATE_FUNCTIONS}')
+    if field is None and func != 'count':
+        raise ValueError(f'aggregate function {func!r} requires a field')
+
+
+def parse_group_by(group_by: GroupBy) -> list[tuple[str, str | None]]:
+    """
+    Разобрать группировку в список пар (название поля, преобразование даты)
+    """
+    if group_by is None:
+        return []
+    if isinstance(group_by, str):
+        group_by = [group_by]
+    result = []
+    for name in group_by:
+        field, _, transform = name.partition('__')
+        if transform and transform not in DATE_TRANSFORMS:
+            raise ValueError(f'unknown date transform {transform!r}, '
+                             f'expected one of {DATE_TRANSFORMS}')
+        result.append((field, transform or None))
+    return result
+
+
+def group_key(value: Any, transform: str | None) -> Any:
+    """ Значение группы для значения поля value """
+    if value is None or transform is None:
+        return value
+    day = to_datetime(value).date()
+    if transform == 'week':
+        day -= timedelta(days=day.weekday())
+    elif transform == 'month':
+        return day.strftime('%Y-%m')
+    return day.isoformat()
+
+
+def aggregate_objects(objs: Iterable[Any],
+                      func: str,
+                      field: str | None = None,
+                      group_by: GroupBy = None) -> Any:
+    """
+    Посчитать агрегат func по полю field за один проход по объектам
+    (см. AbstractRepository.aggregate). Незаполненные значения (None)
+    не учитываются, как в sqlite.
+    """
+    check_aggregate(func, field)
+    groups = parse_group_by(group_by)
+    # группа -> [число значений, сумма, минимум, максимум]
+    states: dict[tuple[Any, ...], list[Any]] = {}
+    for obj in objs:
+        key = tuple(group_key(getattr(obj, name), transform)
+                    for name, transform in groups)
+        state = states.get(key)
+        if state is None:
+            state = states[key] = [0, 0, None, None]
+        if field is None:
+            state[0] += 1
+            continue
+        value = getattr(obj, field)
+        if value is None:
+            continue
+        state[0] += 1
+        if func in ('sum', 'avg'):
+            state[1] += value
+        if state[2] is None or value < state[2]:
+            state[2] = value
+        if state[3] is None or value > state[3]:
+            state[3] = value
+    if not groups:
+        return _aggregate_result(func, states.get((), [0, 0, None, None]))
+    return {key if len(key) > 1 else key[0]: _aggregate_result(func, states[key])
+            for key in sorted(states, key=lambda k: tuple(map(_sort_key, k)))}
+
+
+def _aggregate_result(func: str, state: list[Any]) -> Any:
+    count, total, minimum, maximum = state
+    if func == 'count':
+        return count
+    if func == 'sum':
+        return total
+    if func == 'avg':
+        return total / count if count else None
+    return minimum if func == 'min' else maximum
@@ -0,0 +1,231 @@
+"""
+Модуль описывает построитель параметризованных SQL-запросов для SQLiteRepository
+
+Все значения передаются в запрос параметрами (?), поэтому текст запроса
+зависит только от формы условия (какие поля и какие виды сравнений),
+а не от значений. Тексты запросов кэшируются по форме условия, так что
+повторные выборки с разными значениями используют один и тот же SQL
+и попадают в кэш подготовленных выражений sqlite.
+"""
+
+from datetime import date, datetime
+from types import NoneType, UnionType
+from typing import Any, Hashable, Iterable, Union, get_args, get_origin
+
+from bookkeeper.repository.query import (
+    COLLECTION_TYPES, GroupBy, OrderBy, Range, check_aggregate, condition_shape,
+    parse_group_by, parse_order_by
+)
+from bookkeeper.repository.sqlite_types import epoch_sql
+
+
+COLUMN_TYPES: dict[type, str] = {
+    bool: 'INTEGER',
+    int: 'INTEGER',
+    float: 'REAL',
+    str: 'TEXT',
+    datetime: 'TIMESTAMP',
+    date: 'DATE',
+}
+
+# выражения группировки по дате (хранится числом, см. sqlite_types);
+# ключи совпадают с query.group_key
+DATE_GROUPS: dict[str, str] = {
+    'day': "date({}, 'unixepoch')",
+    'week': "date({}, 'unixepoch', 'weekday 0', '-6 days')",
+    'month': "strftime('%Y-%m', {}, 'unixepoch')",
+}
+
+AGGREGATES: dict[str, str] = {
+    'sum': 'COALESCE(SUM({}), 0)',
+    'count': 'COUNT({})',
+    'min': 'MIN({})',
+    'max': 'MAX({})',
+    'avg': 'AVG({})',
+}
+
+
+def quote(name: str) -> str:
+    """ Экранировать имя таблицы или столбца """
+    return '"' + name.replace('"', '""') + '"'
+
+
+def column_type(annotation: Any) -> str:
+    """
+    Тип столбца sqlite для аннотации поля модели.
+    Необязательные поля (X | None) получают тип X, для остальных аннотаций
+    тип не указывается (столбец без affinity).
+    """
+    if get_origin(annotation) in (Union, UnionType):
+        args = [arg for arg in get_args(annotation) if arg is not NoneType]
+        if len(args) != 1:
+            return ''
+        annotation = args[0]
+    return COLUMN_TYPES.get(annotation, '')
+
+
+def index_name(table_name: str, columns: Iterable[str]) -> str:
+    """ Имя индекса по таблице и списку столбцов """
+    return '_'.join([table_name, *columns, 'idx'])
+
+
+class QueryBuilder:
+    """
+    Построитель запросов к одной таблице.
+    table_name - имя таблицы
+    columns - имена столбцов без первичного ключа pk; если передан словарь
+    {имя: аннотация}, в CREATE TABLE столбцам назначаются типы
+    row_columns - порядок столбцов (вместе с pk) в строках, которые
+    возвращают выборки; по умолчанию выбираются все столбцы таблицы (*)
+    """
+
+    table_name: str
+    columns: list[str]
+
+    def __init__(self,
+                 table_name: str,
+                 columns: Iterable[str] | dict[str, Any],
+                 row_columns: Iterable[str] | None = None) -> None:
+        self.table_name = table_name
+        self.columns = list(columns)
+        self._known = {'pk', *self.columns}
+        self._table = quote(table_name)
+        self._select_cache: dict[Hashable, str] = {}
+        self._aggregate_cache: dict[Hashable, str] = {}
+
+        names = ', '.join(quote(name) for name in self.columns)
+        placeholders = ', '.join('?' * len(self.columns))
+        assignments = ', '.join(f'{quote(name)} = ?' for name in self.columns)
+        self.insert = f'INSERT INTO {self._table} ({names}) VALUES ({placeholders})'
+        self.update = f'UPDATE {self._table} SET {assignments} WHERE pk = ?'
+        self.delete = f'DELETE FROM {self._table} WHERE pk = ?'
+        self._row = '*' if row_columns is None else \
+            ', '.join(quote(name) for name in row_columns)
+        self.get = f'SELECT {self._row} FROM {self._table} WHERE pk = ?'
+
+        types = columns if isinstance(columns, dict) else {}
+        definitions = ', '.join(['pk INTEGER PRIMARY KEY'] + [
+            f'{quote(name)} {column_type(types.get(name))}'.rstrip()
+            for name in self.columns])
+        self.create_table = f'CREATE TABLE IF NOT EXISTS {self._table} ({definitions})'
+
+    def create_index(self, columns: Iterable[str]) -> tuple[str, str]:
+        """ Вернуть имя индекса по столбцам columns и запрос на его создание """
+        columns = list(columns)
+        for name in columns:
+            self._check(name)
+        name = index_name(self.table_name, columns)
+        return name, (f'CREATE INDEX IF NOT EXISTS {quote(name)} ON {self._table} '
+                      f'({", ".join(quote(column) for column in columns)})')
+
+    def _check(self, name: str) -> None:
+        if name not in self._known:
+            raise ValueError(f'unknown field {name!r} in table {self.table_name}')
+
+    def _condition(self, name: str, value: Any) -> str:
+        column = quote(name)
+        if value is None:
+            return f'{column} IS NULL'
+        if isinstance(value, Range):
+            parts = []
+            if value.start is not None:
+                parts.append(f'{column} {">=" if value.include_start else ">"} ?')
+            if value.end is not None:
+                parts.append(f'{column} {"<=" if value.include_end else "<"} ?')
+            return ' AND '.join(parts)
+        if isinstance(value, COLLECTION_TYPES):
+            return f'{column} IN ({", ".join("?" * len(value))})'
+        return f'{column} = ?'
+
+    def where_clause(self, where: dict[str, Any] | None) -> str:
+        """ Текст условия WHERE (вместе с ключевым словом) или пустая строка """
+        if not where:
+            return ''
+        conditions = []
+        for name, value in where.items():
+            self._check(name)
+            condition = self._condition(name, value)
+            if condition:
+                conditions.append(condition)
+        if not conditions:
+            return ''
+        return ' WHERE ' + ' AND '.join(conditions)
+
+    @staticmethod
+    def parameters(where: dict[str, Any] | None) -> list[Any]:
+        """ Значения параметров условия where в порядке их следования в запросе """
+        params: list[Any] = []
+        if not where:
+            return params
+        for value in where.values():
+            if value is None:
+                continue
+            if isinstance(value, Range):
+                params.extend(bound for bound in (value.start, value.end)
+                              if bound is not None)
+            elif isinstance(value, COLLECTION_TYPES):
+                params.extend(value)
+            else:
+                params.append(value)
+        return params
+
+    def select(self,
+               where: dict[str, Any] | None = None,
+               order_by: OrderBy = None,
+               limit: int | None = None) -> tuple[str, list[Any]]:
+        """ Вернуть текст запроса SELECT и его параметры """
+        order = parse_order_by(order_by)
+        key = (tuple((name, condition_shape(value))
+                     for name, value in (where or {}).items()),
+               tuple(order), limit is not None)
+        query = self._select_cache.get(key)
+        if query is None:
+            query = f'SELECT {self._row} FROM {self._table}' + self.where_clause(where)
+            if order:
+                for name, _ in order:
+                    self._check(name)
+                query += ' ORDER BY ' + ', '.join(
+                    f'{quote(name)} DESC' if descending else quote(name)
+                    for name, descending in order)
+            if limit is not None:
+                query += ' LIMIT ?'
+            self._select_cache[key] = query
+        params = self.parameters(where)
+        if limit is not None:
+            params.append(limit)
+        return query, params
+
+    def aggregate(self,
+                  func: str,
+                  field: str | None = None,
+                  where: dict[str, Any] | None = None,
+                  group_by: GroupBy = None) -> tuple[str, list[Any]]:
+        """
+        Вернуть текст запроса агрегата и его параметры.
+        Запрос возвращает строки (группа..., значение), упорядоченные по группам.
+        """
+        check_aggregate(func, field)
+        groups = parse_group_by(group_by)
+        key = (func, field,
+               tuple((name, condition_shape(value))
+                     for name, value in (where or {}).items()),
+               tuple(groups))
+        query = self._aggregate_cache.get(key)
+        if query is None:
+            if field is not None:
+                self._check(field)
+            expressions = []
+            for name, transform in groups:
+                self._check(name)
+                expression = quote(name)
+                if transform is not None:
+                    expression = DATE_GROUPS[transform].format(epoch_sql(expression))
+                expressions.append(expression)
+            value = AGGREGATES[func].format('*' if field is None else quote(field))
+            query = (f'SELECT {", ".join(expressions + [value])} FROM {self._table}'
+                     + self.where_clause(where))
+            if expressions:
+                query += (f' GROUP BY {", ".join(expressions)}'
+                          f' ORDER BY {", ".join(expressions)}')
+            self._aggregate_cache[key] = query
+        return query, self.parameters(where)
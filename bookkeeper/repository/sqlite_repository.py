@@ -2,11 +2,27 @@
 Модуль описывает репозиторий, работающий с SQLite
 """
 
+from contextlib import contextmanager
+from dataclasses import fields as dataclass_fields, is_dataclass
+from datetime import date, datetime
 from inspect import get_annotations
+from itertools import starmap
 import sqlite3
-from typing import Any
+import time
+from typing import Any, Callable, ClassVar, Iterable, Iterator, get_origin
 
-from bookkeeper.repository.abstract_repository import AbstractRepository, T
+from bookkeeper.instrumentation import Instrumentation
+
+from bookkeeper.repository.abstract_repository import (
+    DEFAULT_BATCH_SIZE, AbstractRepository, T
+)
+from bookkeeper.repository.caching_repository import CachingRepository
+from bookkeeper.repository.connection_pool import ConnectionPool, DEFAULT_POOL_SIZE
+from bookkeeper.repository.instrumented_repository import InstrumentedRepository
+from bookkeeper.repository.query import GroupBy, OrderBy
+from bookkeeper.repository.sqlite_query import QueryBuilder, column_type, quote
+from bookkeeper.repository.sqlite_types import DATE_TYPES
+from bookkeeper.repository.storage_profile import StorageProfile, get_profile
 
 DB_FILE = 'databases/client.sqlite.db'
 
@@ -14,129 +30,322 @@ DB_FILE = 'databases/client.sqlite.db'
 class SQLiteRepository(AbstractRepository[T]):
     """
     Репозиторий, работающий с SQLite.
+    Соединения берутся из пула pool; если пул не передан,
+    репозиторий создает собственный.
+    Модель может объявить вторичные индексы в атрибуте класса indexes -
+    кортеже кортежей имен полей, например (('expense_date',), ('category',)).
+    Если задан instrumentation, время выполнения каждого SQL-запроса
+    записывается по его тексту, а время превращения строк в объекты - под
+    именем '<таблица>.parse_rows' (строки выборки при этом сначала читаются
+    целиком, чтобы разделить эти два времени).
     """
 
     db_file: str
     table_name: str
     cls: type
     fields: dict[str, type]
+    row_columns: list[str]
+    pool: ConnectionPool
+    query: QueryBuilder
+    instrumentation: Instrumentation | None
 
-    def __init__(self, cls: type, db_file: str = DB_FILE) -> None:
+    def __init__(self,
+                 cls: type,
+                 db_file: str = DB_FILE,
+                 pool: ConnectionPool | None = None,
+                 instrumentation: Instrumentation | None = None) -> None:
         self.db_file = db_file
+        self.instrumentation = instrumentation
+        self.pool = pool if pool is not None else ConnectionPool(db_file)
         self.table_name = cls.__name__.lower()
-        self.fields = get_annotations(cls, eval_str=True)
+        annotations = {name: annotation
+                       for name, annotation in get_annotations(cls, eval_str=True).items()
+                       if get_origin(annotation) is not ClassVar}
+        self.row_columns = list(annotations)
+        self.fields = annotations
         self.fields.pop('pk')
         self.cls = cls
+        # строки выбираются в порядке аргументов конструктора модели,
+        # поэтому объект создается вызовом cls(*row) без промежуточного словаря
+        self._positional = is_dataclass(cls) and [
+            field.name for field in dataclass_fields(cls) if field.init
+        ] == self.row_columns
+        self.query = QueryBuilder(self.table_name, self.fields,
+                                  row_columns=self.row_columns)
         self.create_table()
+        self.migrate()
 
     def add(self, obj: T) -> int:
         if getattr(obj, 'pk', None) != 0:
             raise ValueError(f'trying to add object {obj} with filled `pk` attribute')
-        names = ', '.join(self.fields.keys())
-        p = ', '.join("?" * len(self.fields))
-        values = [getattr(obj, x) for x in self.fields]
-        with sqlite3.connect(self.db_file) as con:
-            cur = con.cursor()
-            cur.execute('PRAGMA foreign_keys = ON')
-            cur.execute(
-                f'INSERT INTO {self.table_name} ({names}) VALUES ({p})',
-                values
-            )
+        with self.pool.connection() as con:
+            cur = self.__execute(con, self.query.insert, self.__values(obj))
             obj.pk = cur.lastrowid
-        con.close()
         return obj.pk
 
+    def add_many(self, objs: Iterable[T]) -> list[int]:
+        """
+        Добавить объекты в одной транзакции (точке сохранения, если
+        транзакция уже открыта, см. ConnectionPool.transaction) одним
+        подготовленным запросом. Если строку добавить не удалось, не
+        сохраняется ни одна строка пакета, а pk объектов остаются равны 0.
+        id каждого объекта берется из lastrowid его строки: sqlite не
+        обещает последовательных rowid (например, после строки
+        с наибольшим возможным id они выбираются случайно), а executemany
+        не возвращает ни rowid, ни строки RETURNING.
+        """
+        objs = list(objs)
+        for obj in objs:
+            if getattr(obj, 'pk', None) != 0:
+                raise ValueError(f'trying to add object {obj} with filled `pk` attribute')
+        if not objs:
+            return []
+        try:
+            with self.pool.transaction() as con:
+                cur = con.cursor()
+                start = time.perf_counter()
+                for obj in objs:
+                    cur.execute(self.query.insert, self.__values(obj))
+                    obj.pk = cur.lastrowid
+                if self.instrumentation is not None and self.instrumentation.enabled:
+                    self.instrumentation.record_sql(self.query.insert,
+                                                    time.perf_counter() - start)
+        except BaseException:
+            # строки пакета не сохранены: объекты снова можно добавить
+            for obj in objs:
+                obj.pk = 0
+            raise
+        return [obj.pk for obj in objs]
+
     def get(self, pk: int) -> T | None:
-        with sqlite3.connect(self.db_file) as con:
-            cur = con.cursor()
-            raw_res = cur.execute(
-                f"SELECT * FROM {self.table_name} WHERE pk={pk}"
-            )
-            res = self.__parse_query_to_class(raw_res.fetchone())
-        con.close()
-        return res
+        with self.pool.connection() as con:
+            if self.instrumentation is None or not self.instrumentation.enabled:
+                return self.__parse_query_to_class(
+                    con.execute(self.query.get, (pk,)).fetchone())
+            objs = self.__timed_parse(
+                self.query.get, lambda: con.execute(self.query.get, (pk,)).fetchmany(1))
+        return objs[0] if objs else None
 
     def get_all(self,
                 where: dict[str, Any] | None = None,
-                subquery: str | None = None) -> list[T | None]:
-        with sqlite3.connect(self.db_file) as con:
-            cur = con.cursor()
-            query = f"SELECT * FROM {self.table_name}"
-            if where is not None:
-                query += " WHERE " + ' AND '.join(
-                    [f"{key} = {value}"
-                     for key, value in where.items()
-                     if value is not None
-                     and isinstance(value, int) or isinstance(value, float)] +
-                    [f"{key} = '{value}'"
-                     for key, value in where.items()
-                     if value is not None
-                     and not (isinstance(value, int) or isinstance(value, float))]
-                )
-            if subquery is not None:
-                query += " " + subquery
-
-            raw_res = cur.execute(query)
-            res = raw_res.fetchall()
-        con.close()
-        out = [self.__parse_query_to_class(res[pk]) for pk in range(len(res))]
-        return out
+                order_by: OrderBy = None,
+                limit: int | None = None) -> list[T]:
+        query, params = self.query.select(where, order_by, limit)
+        with self.pool.connection() as con:
+            if self.instrumentation is None or not self.instrumentation.enabled:
+                return self.__parse_rows(con.execute(query, params))
+            return self.__timed_parse(
+                query, lambda: con.execute(query, params).fetchall())
+
+    def iter_all(self,
+                 where: dict[str, Any] | None = None,
+                 order_by: OrderBy = None,
+                 batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[T]:
+        """
+        Без сортировки строки читаются страницами page по batch_size строк
+        (см. AbstractRepository.iter_all). Соединение берется из пула
+        на время чтения страницы, а не на весь перебор, поэтому запись
+        из этого же потока во время перебора фиксируется сразу.
+        """
+        return super().iter_all(where, order_by, batch_size)
+
+    def aggregate(self,
+                  func: str,
+                  field: str | None = None,
+                  where: dict[str, Any] | None = None,
+                  group_by: GroupBy = None) -> Any:
+        """ Агрегат считается в sqlite запросом SELECT ... GROUP BY """
+        query, params = self.query.aggregate(func, field, where, group_by)
+        with self.pool.connection() as con:
+            rows = self.__execute(con, query, params).fetchall()
+        if not group_by:
+            return rows[0][0]
+        return {row[0] if len(row) == 2 else row[:-1]: row[-1] for row in rows}
 
     def update(self, obj: T) -> None:
         if obj.pk == 0:
             raise ValueError('attempt to update object with unknown primary key')
-        with sqlite3.connect(self.db_file) as con:
-            cur = con.cursor()
-            sql_query = f"UPDATE {self.table_name} SET "
-            sql_query += ','.join(
-                [f"{attr} = {val}"
-                 for attr, val in obj.__dict__.items()
-                 if attr != 'pk' and val is not None
-                 and isinstance(val, int) or isinstance(val, float)] +
-                [f"{attr} = '{val}'"
-                 for attr, val in obj.__dict__.items()
-                 if attr != 'pk' and val is not None
-                 and not (isinstance(val, int) or isinstance(val, float))]
-            )
-            sql_query += f" WHERE pk={obj.pk}"
-            cur.execute(sql_query)
-        con.close()
+        with self.pool.connection() as con:
+            self.__execute(con, self.query.update, self.__values(obj) + [obj.pk])
+
+    def update_many(self, objs: Iterable[T]) -> None:
+        objs = list(objs)
+        if any(obj.pk == 0 for obj in objs):
+            raise ValueError('attempt to update object with unknown primary key')
+        with self.pool.connection() as con:
+            self.__execute(con, self.query.update,
+                           (self.__values(obj) + [obj.pk] for obj in objs), many=True)
 
     def delete(self, pk: int) -> None:
         if pk == 0:
             raise ValueError('attempt to update object with unknown primary key')
-        with sqlite3.connect(self.db_file) as con:
-            cur = con.cursor()
-            cur.execute(
-                f"DELETE FROM {self.table_name} WHERE pk={pk}"
-            )
-        con.close()
+        with self.pool.connection() as con:
+            self.__execute(con, self.query.delete, (pk,))
+
+    def delete_many(self, pks: Iterable[int]) -> None:
+        pks = list(pks)
+        if 0 in pks:
+            raise ValueError('attempt to delete object with unknown primary key')
+        with self.pool.connection() as con:
+            self.__execute(con, self.query.delete, [(pk,) for pk in pks], many=True)
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """
+        Транзакция пула (см. ConnectionPool.transaction): ее разделяют
+        все репозитории этого пула, а вложенные блоки - точки сохранения.
+        Изменения видны другим потокам только после выхода из внешнего блока.
+        """
+        with self.pool.transaction():
+            yield
 
     def create_table(self) -> None:
-        with sqlite3.connect(self.db_file) as con:
-            cur = con.cursor()
-            query = f"CREATE TABLE IF NOT EXISTS {self.table_name} "
-            query += "(pk INTEGER PRIMARY KEY, "
-            query += ', '.join(list(self.fields.keys())) + ')'
-            cur.execute(query)
-        con.close()
+        """
+        Создать таблицу, если ее нет. Типы столбцов определяются
+        по аннотациям полей модели.
+        """
+        with self.pool.connection() as con:
+            con.execute(self.query.create_table)
+
+    def migrate(self) -> list[str]:
+        """
+        Привести существующую таблицу (например, в файле, созданном
+        предыдущей версией программы) к описанию модели:
+        - таблицу, типы столбцов которой не совпадают с аннотациями полей,
+          пересоздать с нужными типами, сохранив данные;
+        - текстовые даты в столбцах TIMESTAMP и DATE перевести в числа
+          (см. sqlite_types);
+        - создать индексы, объявленные в атрибуте модели indexes,
+          которых еще нет в базе.
+        Повторный вызов ничего не меняет. Вернуть список имен созданных индексов.
+        Миграция выполняется в одной транзакции: при ошибке таблица остается
+        в прежнем виде.
+        """
+        created = []
+        with self.pool.transaction() as con:
+            columns = {row[1]: row[2] for row in con.execute(
+                f'PRAGMA table_info({quote(self.table_name)})')}
+            if any(columns.get(name, '').upper() != column_type(annotation)
+                   for name, annotation in self.fields.items()):
+                self._rebuild_table(con, columns)
+            self._convert_dates(con)
+            existing = {row[1] for row in con.execute(
+                f'PRAGMA index_list({quote(self.table_name)})')}
+            for index_columns in getattr(self.cls, 'indexes', ()):
+                name, query = self.query.create_index(index_columns)
+                if name not in existing:
+                    con.execute(query)
+                    created.append(name)
+        return created
+
+    def _rebuild_table(self, con: sqlite3.Connection, columns: dict[str, str]) -> None:
+        """ Пересоздать таблицу по описанию модели, скопировав данные """
+        table = quote(self.table_name)
+        old = quote(self.table_name + '__old')
+        names = ', '.join(quote(name) for name in ['pk', *self.fields] if name in columns)
+        con.execute(f'ALTER TABLE {table} RENAME TO {old}')
+        con.execute(self.query.create_table)
+        con.execute(f'INSERT INTO {table} ({names}) SELECT {names} FROM {old}')
+        con.execute(f'DROP TABLE {old}')
+
+    def _convert_dates(self, con: sqlite3.Connection) -> None:
+        """ Перевести текстовые даты в числа """
+        table = quote(self.table_name)
+        for name, annotation in self.fields.items():
+            if column_type(annotation) not in DATE_TYPES:
+                continue
+            column = quote(name)
+            # в sqlite любая строка больше любого числа, поэтому при наличии
+            # индекса по столбцу строки с текстом находятся без полного просмотра
+            rows = con.execute(f'SELECT pk, {column} FROM {table} '
+                               f'WHERE {column} >= ?', ('',)).fetchall()
+            con.executemany(f'UPDATE {table} SET {column} = ? WHERE pk = ?',
+                            [(value, pk) for pk, value in rows
+                             if isinstance(value, (date, datetime))])
 
     def drop_table(self) -> None:
-        with sqlite3.connect(self.db_file) as con:
+        with self.pool.connection() as con:
             cur = con.cursor()
             cur.execute(f"DROP TABLE IF EXISTS {self.table_name}")
-        con.close()
+
+    def __execute(self,
+                  con: sqlite3.Connection,
+                  query: str,
+                  params: Any,
+                  many: bool = False) -> sqlite3.Cursor:
+        """ Выполнить запрос (many - для каждого набора параметров) с замером времени """
+        execute = con.executemany if many else con.execute
+        if self.instrumentation is None or not self.instrumentation.enabled:
+            return execute(query, params)
+        start = time.perf_counter()
+        cur = execute(query, params)
+        self.instrumentation.record_sql(query, time.perf_counter() - start)
+        return cur
+
+    def __timed_parse(self,
+                      query: str,
+                      fetch: Callable[[], list[tuple[Any, ...]]]) -> list[T]:
+        """
+        Прочитать строки функцией fetch и превратить в объекты,
+        записав время чтения (как выполнение query) и разбора отдельно
+        """
+        assert self.instrumentation is not None
+        start = time.perf_counter()
+        rows = fetch()
+        fetched = time.perf_counter()
+        objs = self.__parse_rows(rows)
+        self.instrumentation.record_sql(query, fetched - start, len(rows))
+        self.instrumentation.record(f'{self.table_name}.parse_rows',
+                                    time.perf_counter() - fetched, len(rows))
+        return objs
+
+    def __values(self, obj: T) -> list[Any]:
+        return [getattr(obj, x) for x in self.fields]
 
     def __parse_query_to_class(self, query: tuple[Any] | None) -> T | None:
-        if query is not None:
-            query_dict = dict(zip({"pk": int} | self.fields, query))
-            out = self.cls(**query_dict)
-        else:
-            out = None
-        return out
+        if query is None:
+            return None
+        if self._positional:
+            return self.cls(*query)
+        return self.cls(**dict(zip(self.row_columns, query)))
+
+    def __parse_rows(self, rows: Iterable[tuple[Any]]) -> list[T]:
+        if self._positional:
+            return list(starmap(self.cls, rows))
+        return [self.cls(**dict(zip(self.row_columns, row))) for row in rows]
 
     @classmethod
     def repository_factory(cls,
                            models: list[type],
-                           db_file: str | None = None) -> dict[type, type]:
-        return {model: cls(model, db_file) for model in models}
+                           db_file: str | None = None,
+                           pool_size: int = DEFAULT_POOL_SIZE,
+                           cache_size: int | None = None,
+                           cache_ttl: float | None = None,
+                           profile: StorageProfile | str | None = None,
+                           instrumentation: Instrumentation | None = None
+                           ) -> dict[type, type]:
+        """
+        Создает словарь репозиториев для каждой из моделей.
+        Все репозитории используют общий пул соединений.
+        Если задан cache_size, каждый репозиторий оборачивается
+        в CachingRepository с таким размером кэша и временем жизни cache_ttl.
+        profile - профиль хранения (объект или имя, см. storage_profile);
+        если не задан, используются настройки sqlite по умолчанию.
+        Если задан instrumentation, репозитории записывают в него время
+        SQL-запросов и разбора строк, а каждый репозиторий (вместе с кэшем)
+        оборачивается в InstrumentedRepository с именем таблицы.
+        """
+        if db_file is None:
+            db_file = DB_FILE
+        pragmas = None if profile is None else get_profile(profile).pragmas()
+        pool = ConnectionPool(db_file, pool_size=pool_size, pragmas=pragmas)
+        repos: dict[type, Any] = {model: cls(model, db_file, pool, instrumentation)
+                                  for model in models}
+        if cache_size is not None:
+            repos = {model: CachingRepository(repo, cache_size, cache_ttl)
+                     for model, repo in repos.items()}
+        if instrumentation is not None:
+            repos = {model: InstrumentedRepository(repo, instrumentation,
+                                                   model.__name__.lower())
+                     for model, repo in repos.items()}
+        return repos
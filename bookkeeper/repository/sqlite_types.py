@@ -0,0 +1,64 @@
+"""
+Модуль описывает хранение дат в SQLite
+
+Даты (datetime и date) хранятся целым числом микросекунд от 1970-01-01
+в столбцах с типом TIMESTAMP или DATE. Преобразование выполняют адаптеры
+и конвертеры sqlite3, которые регистрируются при импорте модуля; соединения
+должны открываться с detect_types=sqlite3.PARSE_DECLTYPES.
+Сравнения дат в запросах (в том числе по индексу) - сравнения целых чисел,
+а при чтении строк даты не разбираются из текста.
+
+Текстовые даты, записанные предыдущими версиями программы (ISO или
+день-месяц-год), конвертер тоже понимает; SQLiteRepository.migrate
+переводит их в числа.
+"""
+
+from datetime import date, datetime, timedelta
+import sqlite3
+
+from bookkeeper.utils import to_datetime
+
+EPOCH = datetime(1970, 1, 1)
+EPOCH_SCALE = 1_000_000
+# умножение timedelta на целое в несколько раз быстрее, чем timedelta(microseconds=...)
+MICROSECOND = timedelta(microseconds=1)
+DATE_TYPES = ('TIMESTAMP', 'DATE')
+
+
+def datetime_to_epoch(value: datetime | date) -> int:
+    """ Число микросекунд от 1970-01-01 (часовой пояс не учитывается) """
+    delta = to_datetime(value).replace(tzinfo=None) - EPOCH
+    return (delta.days * 86400 + delta.seconds) * EPOCH_SCALE + delta.microseconds
+
+
+def epoch_to_datetime(value: int) -> datetime:
+    """ datetime по числу микросекунд от 1970-01-01 """
+    return EPOCH + MICROSECOND * value
+
+
+def epoch_sql(column: str) -> str:
+    """ Выражение sqlite, переводящее столбец с датой в секунды для date() """
+    return f'{column} / {float(EPOCH_SCALE)}'
+
+
+def _convert_timestamp(raw: bytes) -> datetime | str:
+    try:
+        return EPOCH + MICROSECOND * int(raw)
+    except ValueError:
+        pass
+    text = raw.decode()
+    try:
+        return to_datetime(text)
+    except ValueError:
+        return text
+
+
+def _convert_date(raw: bytes) -> date | str:
+    value = _convert_timestamp(raw)
+    return value.date() if isinstance(value, datetime) else value
+
+
+sqlite3.register_adapter(datetime, datetime_to_epoch)
+sqlite3.register_adapter(date, datetime_to_epoch)
+sqlite3.register_converter('TIMESTAMP', _convert_timestamp)
+sqlite3.register_converter('DATE', _convert_date)
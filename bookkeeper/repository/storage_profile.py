@@ -0,0 +1,95 @@
+"""
+Модуль описывает профили хранения - наборы PRAGMA для соединений SQLite
+
+Профиль передается в SQLiteRepository.repository_factory (по объекту или
+по имени готового профиля из PROFILES) и применяется пулом соединений
+к каждому новому соединению.
+
+Во всех готовых профилях база работает в режиме WAL: читатели не ждут
+писателя и не мешают ему, а фиксация транзакции - дописывание в журнал,
+без перезаписи страниц базы. Режим WAL сохраняется в файле базы.
+"""
+
+from dataclasses import dataclass
+
+from bookkeeper.repository.connection_pool import DEFAULT_PRAGMAS
+
+JOURNAL_MODES = ('DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF')
+SYNCHRONOUS = ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+TEMP_STORES = ('DEFAULT', 'FILE', 'MEMORY')
+MIB = 1024 * 1024
+
+
+@dataclass(frozen=True)
+class StorageProfile:
+    """
+    Профиль хранения.
+    journal_mode - режим журнала ('WAL', 'DELETE', ...)
+    synchronous - когда sqlite ждет записи на диск: 'FULL' - при каждой
+    фиксации, 'NORMAL' - в режиме WAL только при переносе журнала в базу
+    (зафиксированная транзакция может пропасть при отключении питания,
+    но база не повреждается), 'OFF' - никогда
+    cache_size - размер кэша страниц: положительное число - в страницах,
+    отрицательное - в килобайтах (как в PRAGMA cache_size)
+    mmap_size - сколько байт файла базы читать через отображение в память
+    temp_store - где хранить временные таблицы и индексы сортировки
+    busy_timeout - сколько миллисекунд ждать снятия блокировки базы
+    query_only - запретить изменение базы через эти соединения
+    """
+    journal_mode: str = 'WAL'
+    synchronous: str = 'NORMAL'
+    cache_size: int = -16 * 1024
+    mmap_size: int = 0
+    temp_store: str = 'DEFAULT'
+    busy_timeout: int = 5000
+    query_only: bool = False
+
+    def __post_init__(self) -> None:
+        for name, allowed in (('journal_mode', JOURNAL_MODES),
+                              ('synchronous', SYNCHRONOUS),
+                              ('temp_store', TEMP_STORES)):
+            if getattr(self, name).upper() not in allowed:
+                raise ValueError(f'unknown {name} {getattr(self, name)!r}, '
+                                 f'expected one of {allowed}')
+
+    def pragmas(self) -> dict[str, str]:
+        """
+        PRAGMA для ConnectionPool. busy_timeout задается первым, чтобы
+        переключение режима журнала дождалось других соединений,
+        а query_only - последним, после переключения.
+        """
+        return {'busy_timeout': str(self.busy_timeout),
+                **DEFAULT_PRAGMAS,
+                'journal_mode': self.journal_mode.upper(),
+                'synchronous': self.synchronous.upper(),
+                'cache_size': str(self.cache_size),
+                'mmap_size': str(self.mmap_size),
+                'temp_store': self.temp_store.upper(),
+                'query_only': 'ON' if self.query_only else 'OFF'}
+
+
+PROFILES: dict[str, StorageProfile] = {
+    # работа из интерфейса: короткие транзакции, чтение во время записи
+    'interactive': StorageProfile(mmap_size=64 * MIB, temp_store='MEMORY'),
+    # массовая загрузка: без ожидания диска, большой кэш; при сбое питания
+    # можно потерять последние транзакции (и загрузку нужно повторить)
+    'bulk-import': StorageProfile(synchronous='OFF', cache_size=-256 * 1024,
+                                  mmap_size=256 * MIB, temp_store='MEMORY',
+                                  busy_timeout=30000),
+    # отчеты: большой кэш и отображение файла в память, только чтение;
+    # таблицы должны быть уже созданы другим профилем
+    'read-only analytics': StorageProfile(cache_size=-128 * 1024,
+                                          mmap_size=1024 * MIB,
+                                          temp_store='MEMORY', query_only=True),
+}
+
+
+def get_profile(profile: StorageProfile | str) -> StorageProfile:
+    """ Профиль по объекту или имени готового профиля """
+    if isinstance(profile, StorageProfile):
+        return profile
+    try:
+        return PROFILES[profile]
+    except KeyError:
+        raise ValueError(f'unknown storage profile {profile!r}, '
+                         f'expected one of {tuple(PROFILES)}') from None
@@ -0,0 +1,34 @@
+"""
+Модуль описывает транзакцию над несколькими репозиториями (unit of work)
+
+Изменения нескольких репозиториев внутри блока
+
+    with transaction(repos):
+        ...
+
+сохраняются вместе или, при исключении, отменяются вместе. Репозитории
+SQLite, построенные одним repository_factory, разделяют пул соединений,
+поэтому их изменения фиксируются одним commit; репозитории в памяти
+отменяют изменения по журналу (см. MemoryRepository).
+"""
+
+from contextlib import ExitStack, contextmanager
+from typing import Any, Iterable, Iterator
+
+from bookkeeper.repository.abstract_repository import AbstractRepository
+
+
+@contextmanager
+def transaction(repos: dict[type, AbstractRepository[Any]]
+                | Iterable[AbstractRepository[Any]]) -> Iterator[None]:
+    """
+    Открыть транзакции (AbstractRepository.transaction) всех репозиториев
+    repos - словарь, который возвращает repository_factory, или список
+    репозиториев. Блоки можно вкладывать друг в друга.
+    """
+    if isinstance(repos, dict):
+        repos = repos.values()
+    with ExitStack() as stack:
+        for repo in repos:
+            stack.enter_context(repo.transaction())
+        yield
@@ -4,6 +4,7 @@
 
 import os
 
+from bookkeeper.importer import ExpenseImporter
 from bookkeeper.models.category import Category
 from bookkeeper.models.expense import Expense
 from bookkeeper.repository.memory_repository import MemoryRepository
@@ -45,6 +46,13 @@ while True:
         print(*cat_repo.get_all(), sep='\n')
     elif cmd == 'расходы':
         print(*exp_repo.get_all(), sep='\n')
+    elif cmd.startswith('импорт '):
+        report = ExpenseImporter(cat_repo, exp_repo, by='pk').import_file(
+            cmd.split(maxsplit=1)[1])
+        print(f'импортировано {report.imported}, отклонено {len(report.rejected)}, '
+              f'{report.rows_per_second:.0f} записей/с')
+        for rejected in report.rejected[:10]:
+            print(f'  {rejected.line}: {rejected.reason}')
     elif cmd[0].isdecimal():
         amount, name = cmd.split(maxsplit=1)
         try:
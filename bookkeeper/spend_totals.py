@@ -0,0 +1,185 @@
+"""
+Инкрементальный подсчет расходов за день, неделю и месяц
+
+Вместо того чтобы при каждом изменении перечитывать расходы за период
+и переписывать бюджеты, суммы по периодам хранятся в памяти и изменяются
+на величину добавленного, измененного или удаленного расхода.
+
+Функции latest_budgets и fill_budgets выбирают текущие бюджеты и
+заполняют в них суммы расходов; они не зависят от Qt и используются
+презентером и замерами.
+"""
+
+from datetime import date, datetime, timedelta
+from typing import Callable, Iterable
+
+from bookkeeper.models.budget import Budget
+from bookkeeper.models.expense import Expense
+from bookkeeper.repository.abstract_repository import AbstractRepository
+from bookkeeper.repository.query import Range
+from bookkeeper.utils import to_datetime
+
+PERIODS = ('day', 'week', 'month')
+DURATIONS = {"День": 'day', "Неделя": 'week', "Месяц": 'month'}
+TOLERANCE = 1e-6
+
+
+def period_start(period: str, moment: datetime | date | str) -> date:
+    """
+    Первый день периода (дня, недели с понедельника или месяца),
+    в который попадает момент moment
+    """
+    day = to_datetime(moment).date()
+    if period == 'day':
+        return day
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    if period == 'month':
+        return day.replace(day=1)
+    raise ValueError(f'unknown period {period!r}, expected one of {PERIODS}')
+
+
+class SpendTotals:
+    """
+    Суммы расходов по периодам (день, неделя, месяц).
+
+    Хранятся только суммы текущего и будущих периодов. Смена периода
+    происходит лениво: при первом обращении после наступления нового дня
+    (недели, месяца) суммы прошедших периодов отбрасываются, а расходы,
+    относящиеся к прошедшим периодам, не учитываются.
+    Чтение суммы текущего периода - одно обращение к словарю.
+
+    clock - функция, возвращающая текущее время
+    """
+
+    def __init__(self, clock: Callable[[], datetime] = datetime.now) -> None:
+        self.clock = clock
+        self._totals: dict[str, dict[date, float]] = {period: {} for period in PERIODS}
+        self._current: dict[str, date] = {}
+        self._rollover()
+
+    @classmethod
+    def from_expenses(cls,
+                      expenses: Iterable[Expense],
+                      clock: Callable[[], datetime] = datetime.now) -> 'SpendTotals':
+        """ Посчитать суммы по списку расходов """
+        totals = cls(clock)
+        for expense in expenses:
+            totals.add(expense)
+        return totals
+
+    @classmethod
+    def from_repository(cls,
+                        expense_repo: AbstractRepository[Expense],
+                        clock: Callable[[], datetime] = datetime.now) -> 'SpendTotals':
+        """
+        Посчитать суммы по расходам из репозитория: загружаются только
+        суммы за дни текущих периодов (см. rebuild_from_daily)
+        """
+        totals = cls(clock)
+        totals.rebuild_from_daily(expense_repo.aggregate(
+            'sum', 'amount', where={'expense_date': Range(start=totals.earliest_start())},
+            group_by='expense_date__day'))
+        return totals
+
+    def earliest_start(self) -> datetime:
+        """
+        Начало самого раннего из текущих периодов: расходы до этого момента
+        не влияют на суммы, поэтому загружать их не нужно
+        """
+        self._rollover()
+        start = min(self._current.values())
+        return datetime(start.year, start.month, start.day)
+
+    def _rollover(self) -> None:
+        now = self.clock()
+        for period in PERIODS:
+            current = period_start(period, now)
+            if self._current.get(period) != current:
+                self._current[period] = current
+                totals = self._totals[period]
+                for key in [key for key in totals if key < current]:
+                    del totals[key]
+
+    def _adjust(self, moment: datetime | date | str, amount: float) -> None:
+        for period in PERIODS:
+            key = period_start(period, moment)
+            if key < self._current[period]:
+                continue
+            totals = self._totals[period]
+            totals[key] = totals.get(key, 0.0) + amount
+
+    def add(self, expense: Expense) -> None:
+        """ Учесть новый расход """
+        self._rollover()
+        self._adjust(expense.expense_date, expense.amount)
+
+    def remove(self, expense: Expense) -> None:
+        """ Исключить удаленный расход """
+        self._rollover()
+        self._adjust(expense.expense_date, -expense.amount)
+
+    def replace(self, old: Expense, new: Expense) -> None:
+        """ Учесть изменение расхода old на new """
+        self._rollover()
+        self._adjust(old.expense_date, -old.amount)
+        self._adjust(new.expense_date, new.amount)
+
+    def total(self, period: str, moment: datetime | None = None) -> float:
+        """
+        Сумма расходов за период, в который попадает moment
+        (по умолчанию - за текущий период)
+        """
+        self._rollover()
+        key = self._current[period] if moment is None else period_start(period, moment)
+        return self._totals[period].get(key, 0.0)
+
+    def check(self, expenses: Iterable[Expense]) -> dict[tuple[str, date], float]:
+        """
+        Пересчитать суммы по исходным расходам и сравнить с накопленными.
+        Вернуть расхождения {(период, начало периода): накоплено - пересчитано}.
+        """
+        fresh = SpendTotals.from_expenses(expenses, self.clock)
+        self._rollover()
+        drift = {}
+        for period in PERIODS:
+            stored, actual = self._totals[period], fresh._totals[period]
+            for key in stored.keys() | actual.keys():
+                diff = stored.get(key, 0.0) - actual.get(key, 0.0)
+                if abs(diff) > TOLERANCE:
+                    drift[(period, key)] = diff
+        return drift
+
+    def rebuild_from_daily(self, daily: dict[date | str, float]) -> None:
+        """
+        Пересчитать все суммы по суммам расходов за дни
+        {день: сумма}, например, по результату
+        repo.aggregate('sum', 'amount', group_by='expense_date__day')
+        """
+        fresh = SpendTotals(self.clock)
+        for day, amount in daily.items():
+            fresh._adjust(day, amount)
+        self._totals = fresh._totals
+        self._current = fresh._current
+
+    def rebuild(self, expenses: Iterable[Expense]) -> None:
+        """ Пересчитать все суммы заново по исходным расходам """
+        fresh = SpendTotals.from_expenses(expenses, self.clock)
+        self._totals = fresh._totals
+        self._current = fresh._current
+
+
+def latest_budgets(budget_repo: AbstractRepository[Budget]) -> list[Budget]:
+    """ Последний по сроку окончания бюджет на день, неделю и месяц (если есть) """
+    budgets = []
+    for duration in DURATIONS:
+        budgets += budget_repo.get_all(where={'duration': duration},
+                                       order_by='-end', limit=1)
+    return budgets
+
+
+def fill_budgets(budgets: list[Budget], totals: SpendTotals) -> list[Budget]:
+    """ Записать в бюджеты суммы расходов за текущие периоды из totals """
+    for budget in budgets:
+        budget.amount = totals.total(DURATIONS[budget.duration])
+    return budgets
@@ -2,7 +2,10 @@
 Вспомогательные функции
 """
 
-from typing import Iterable, Iterator
+from datetime import date, datetime
+from typing import Any, Iterable, Iterator, Protocol
+
+USER_DATE_FORMAT = '%d-%m-%Y'
 
 
 def _get_indent(line: str) -> int:
@@ -63,86 +66,161 @@ def read_tree(lines: Iterable[str]) -> list[tuple[str, str | None]]:
     return result
 
 
-def build_dict_tree_from_list(sorted_list: list) -> dict:
+def to_datetime(value: datetime | date | str) -> datetime:
     """
-    Функция строит из массива записей вида (имя, родительский id, id) дерево
-    с json-подобной структурой (ключи - id)
+    Привести дату к datetime. Строки принимаются в формате ISO
+    (так sqlite3 сохраняет datetime) или в формате день-месяц-год.
     """
-    tree = {}
-    for element in sorted_list:
-        set_elem_in_tree(tree, element)
-    return tree
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return datetime.strptime(value, USER_DATE_FORMAT)
 
 
-def get_elem_in_tree(tree: dict, pk: int) -> list | None:
+class TreeElement(Protocol):  # pylint: disable=too-few-public-methods
     """
-    Функция по id элемента ищет его в json-like дереве
+    Запись для построения дерева: имя, id родителя и id (например, Category)
     """
-    for key, value in tree.items():
-        if key != pk and isinstance(key, int):
-            item = get_elem_in_tree(value, pk)
-            if item is not None:
-                return item
-        elif key == pk:
-            return value
+    name: str
+    parent: int | None
+    pk: int
 
 
-def get_elem_parent(tree: dict, pk: int, prev_parent: int = None) -> int | None:
+class CategoryTree:
     """
-    Функция по id элемента ищет id его родителя в json-like дереве
-    """
-    for key, value in tree.items():
-        if key != pk and isinstance(key, int):
-            parent = get_elem_parent(value, pk, key)
-            if parent is not None:
-                return parent
-        elif key == pk:
-            return prev_parent
-
+    json-подобное дерево {id: {"name": имя, id_потомка: {...}, ...}, ...}
+    с индексом id -> узел.
 
-def set_elem_in_tree(tree: dict, elem: list[type]) -> None:
+    Дерево строится за один проход по записям в любом порядке. Поиск узла,
+    его родителя, изменение и удаление узла не требуют обхода дерева.
+    Записи, родителя которых нет среди записей, в дерево не попадают.
     """
-    Функция по заданной записи вида (имя, родительский id, id) меняет элемент в дереве
-    """
-    if elem.parent is None:
-        tree[elem.pk] = {"name": elem.name}
-    else:
-        if isinstance(tree, dict):
-            for key, value in tree.items():
-                if key != elem.parent:
-                    set_elem_in_tree(value, elem)
-                else:
-                    value[elem.pk] = {"name": elem.name}
-                    break
-
-
-def delete_elem_from_tree(tree: dict, pk: int) -> None:
+
+    tree: dict[int, dict[Any, Any]]
+
+    def __init__(self, elements: Iterable[TreeElement] = ()) -> None:
+        self.tree = {}
+        self._nodes: dict[int, dict[Any, Any]] = {}
+        self._parents: dict[int, int | None] = {}
+        for element in elements:
+            node = self._nodes.setdefault(element.pk, {})
+            node["name"] = element.name
+            self._parents[element.pk] = element.parent
+            if element.parent is None:
+                self.tree[element.pk] = node
+            else:
+                self._nodes.setdefault(element.parent, {})[element.pk] = node
+        reachable: dict[int, dict[Any, Any]] = {}
+        stack = list(self.tree.items())
+        while stack:
+            pk, node = stack.pop()
+            reachable[pk] = node
+            stack.extend((key, value) for key, value in node.items()
+                         if isinstance(key, int))
+        self._nodes = reachable
+        self._parents = {pk: self._parents[pk] for pk in reachable}
+
+    def __contains__(self, pk: int) -> bool:
+        return pk in self._nodes
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def get(self, pk: int) -> dict[Any, Any] | None:
+        """ Узел дерева по id элемента """
+        return self._nodes.get(pk)
+
+    def parent(self, pk: int) -> int | None:
+        """ id родителя элемента """
+        return self._parents.get(pk)
+
+    def preorder(self) -> list[int]:
+        """
+        id элементов в порядке обхода в глубину: каждый элемент раньше
+        своих потомков (в обратном порядке - потомки раньше предков)
+        """
+        order = []
+        stack = list(reversed(self.tree.items()))
+        while stack:
+            pk, node = stack.pop()
+            order.append(pk)
+            stack.extend(reversed([(key, value) for key, value in node.items()
+                                   if isinstance(key, int)]))
+        return order
+
+    def set(self, element: TreeElement) -> None:
+        """
+        Добавить элемент или изменить существующий (имя и родителя).
+        При смене родителя узел переносится вместе с потомками.
+        Элемент, родителя которого нет в дереве, не добавляется.
+        """
+        if element.parent is not None and element.parent not in self._nodes:
+            return
+        ancestor = element.parent
+        while ancestor is not None:
+            if ancestor == element.pk:
+                raise ValueError(f'element {element.pk} cannot be moved '
+                                 f'under its descendant {element.parent}')
+            ancestor = self._parents[ancestor]
+        node = self._nodes.get(element.pk)
+        if node is None:
+            node = self._nodes[element.pk] = {}
+        else:
+            self._container(element.pk).pop(element.pk)
+        node["name"] = element.name
+        self._parents[element.pk] = element.parent
+        self._container(element.pk)[element.pk] = node
+
+    def delete(self, pk: int) -> None:
+        """ Удалить элемент вместе со всеми потомками """
+        node = self._nodes.get(pk)
+        if node is None:
+            return
+        self._container(pk).pop(pk)
+        stack = [(pk, node)]
+        while stack:
+            key, node = stack.pop()
+            del self._nodes[key]
+            del self._parents[key]
+            stack.extend((child, value) for child, value in node.items()
+                         if isinstance(child, int))
+
+    def _container(self, pk: int) -> dict[Any, Any]:
+        parent = self._parents[pk]
+        return self.tree if parent is None else self._nodes[parent]
+
+
+def build_dict_tree_from_list(sorted_list: Iterable[TreeElement]) -> dict[Any, Any]:
     """
-    Функция по id элемента удаляет его из json-like дерева
+    Функция строит из массива записей вида (имя, родительский id, id) дерево
+    с json-подобной структурой (ключи - id).
+    Порядок записей не важен, см. CategoryTree.
     """
-    for key, value in tree.items():
-        if key != pk and isinstance(key, int):
-            delete_elem_from_tree(value, pk)
-        elif key == pk:
-            del tree[key]
-            break
+    return CategoryTree(sorted_list).tree
 
 
 if __name__ == "__main__":
+    from collections import namedtuple
+
+    Element = namedtuple('Element', ['name', 'parent', 'pk'])
     example = [
-        ["продукты", None, 1],
-        ["мясо", 1, 2],
-        ["сырое мясо", 2, 3],
-        ["мясные продукты", 2, 4],
-        ["сладости", 1, 5],
-        ["книги", None, 6],
-        ["одежда", None, 7],
+        Element("продукты", None, 1),
+        Element("мясо", 1, 2),
+        Element("сырое мясо", 2, 3),
+        Element("мясные продукты", 2, 4),
+        Element("сладости", 1, 5),
+        Element("книги", None, 6),
+        Element("одежда", None, 7),
     ]
 
-    sample_tree = build_dict_tree_from_list(example)
-    set_elem_in_tree(sample_tree, ['почта', 5, 8])
-    set_elem_in_tree(sample_tree, ['пицца', 5, 8])
-    print(get_elem_parent(sample_tree, 6))
-    print(get_elem_in_tree(sample_tree, 8))
-    delete_elem_from_tree(sample_tree, 2)
-    print(sample_tree)
+    sample_tree = CategoryTree(example)
+    sample_tree.set(Element('почта', 5, 8))
+    sample_tree.set(Element('пицца', 5, 8))
+    print(sample_tree.parent(6))
+    print(sample_tree.get(8))
+    sample_tree.delete(2)
+    print(sample_tree.tree)
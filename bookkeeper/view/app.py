@@ -145,6 +145,9 @@ class View:
         self.window.show()
         sys.exit(self.app.exec())
 
+    def show_error(self, message: str) -> None:
+        QtWidgets.QMessageBox.critical(self.window, 'Ошибка', message)
+
     def register_handlers(self, handlers_obj: dict[str, list[Callable | None]]):
         self.category_handlers = handlers_obj["category"]
         self.expenses_handlers = handlers_obj["expenses"]
@@ -10,7 +10,9 @@ from bookkeeper.models.budget import Budget
 
 class BudgetWindow(QtWidgets.QWidget):
     """
-    Класс виджета окна, в котором отображается бюджет
+    Класс виджета окна, в котором отображается бюджет.
+    budgets_getter(on_done) загружает бюджеты в фоне и передает их в on_done;
+    до загрузки таблица пуста.
     """
     def __init__(self, *args,
                  budgets_getter: Callable | None,
@@ -34,7 +36,9 @@ class BudgetWindow(QtWidgets.QWidget):
         self.header.setSectionResizeMode(
             2, QtWidgets.QHeaderView.Stretch)
 
-        self.set_budgets(budgets_getter)
+        self.layout.addWidget(self.budgets_table)
+        if budgets_getter is not None:
+            budgets_getter(self.show_budgets)
 
     def build_budgets(self, data: list[Budget]) -> None:
         for i, row in enumerate(data):
@@ -51,6 +55,11 @@ class BudgetWindow(QtWidgets.QWidget):
                 QtWidgets.QTableWidgetItem(str(row.limits))
             )
 
+    def show_budgets(self, budgets: list[Budget]) -> None:
+        """ Показать загруженные бюджеты в той же таблице """
+        self.budgets_table.clearContents()
+        self.build_budgets(budgets)
+
     def set_budgets(self, budgets_getter: Callable) -> None:
         if self.budgets_table.itemAt(0, 0) is not None:
             self.layout.removeWidget(self.budgets_table)
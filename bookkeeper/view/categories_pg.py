@@ -4,18 +4,23 @@
 from PySide6 import QtWidgets, QtCore
 from typing import Callable
 
+from bookkeeper.models.category import Category
+
 
 class CategoriesList(QtWidgets.QWidget):
     """
     Элемент отображения дерева категорий
-    Для отображения необходимо указать функцию,
-    которая будет возвращать дерево для отображения
-    (json-like объект)
+    Для отображения необходимо указать функцию category_getter(on_done),
+    которая загружает в фоне дерево для отображения (json-like объект)
+    и передает его в on_done. После этого изменения категорий показываются
+    методами add_category, update_category и remove_category,
+    которые меняют только один элемент дерева.
     """
 
     def __init__(self, *args, category_getter: Callable | None, **kwargs) -> None:
         super().__init__(*args, **kwargs)
         self.getter = category_getter
+        self._items: dict[int, QtWidgets.QTreeWidgetItem] = {}
 
         self.layout = QtWidgets.QVBoxLayout()
         self.setLayout(self.layout)
@@ -36,6 +41,7 @@ class CategoriesList(QtWidgets.QWidget):
                 item = QtWidgets.QTreeWidgetItem(parent)
                 item.setText(0, value["name"])
                 item.setText(1, str(key))
+                self._items[key] = item
                 if isinstance(value, dict):
                     self.build_category_tree(data=value, parent=item)
 
@@ -50,9 +56,61 @@ class CategoriesList(QtWidgets.QWidget):
         self.category_tree.header().setSectionResizeMode(
             1, QtWidgets.QHeaderView.Stretch)
         self.category_tree.setColumnCount(2)
-        tree_data = category_tree_getter()
-        self.build_category_tree(data=tree_data, parent=self.category_tree)
+        self._items = {}
         self.layout.addWidget(self.category_tree)
+        category_tree_getter(self.show_tree)
+
+    def show_tree(self, tree_data: dict) -> None:
+        """ Показать загруженное дерево категорий """
+        self.category_tree.clear()
+        self._items = {}
+        self.build_category_tree(data=tree_data, parent=self.category_tree)
+
+    def _attach(self, item: QtWidgets.QTreeWidgetItem, parent: int | None) -> None:
+        parent_item = self._items.get(parent) if parent is not None else None
+        if parent_item is None:
+            self.category_tree.addTopLevelItem(item)
+        else:
+            parent_item.addChild(item)
+
+    def _detach(self, item: QtWidgets.QTreeWidgetItem) -> None:
+        parent_item = item.parent()
+        if parent_item is None:
+            self.category_tree.takeTopLevelItem(
+                self.category_tree.indexOfTopLevelItem(item))
+        else:
+            parent_item.removeChild(item)
+
+    def add_category(self, category: Category) -> None:
+        """ Добавить в дерево элемент новой категории """
+        item = QtWidgets.QTreeWidgetItem()
+        item.setText(0, category.name)
+        item.setText(1, str(category.pk))
+        self._items[category.pk] = item
+        self._attach(item, category.parent)
+
+    def update_category(self, category: Category) -> None:
+        """ Переименовать категорию и, если изменился родитель, перенести ее """
+        item = self._items.get(category.pk)
+        if item is None:
+            self.add_category(category)
+            return
+        item.setText(0, category.name)
+        if item.parent() is not self._items.get(category.parent):
+            self._detach(item)
+            self._attach(item, category.parent)
+
+    def remove_category(self, pk: int) -> None:
+        """
+        Удалить элемент категории; ее подкатегории становятся
+        категориями верхнего уровня, как в CategoryHierarchy
+        """
+        item = self._items.pop(pk, None)
+        if item is None:
+            return
+        children = item.takeChildren()
+        self._detach(item)
+        self.category_tree.addTopLevelItems(children)
 
 
 class AddCategoryInput(QtWidgets.QWidget):
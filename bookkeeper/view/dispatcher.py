@@ -0,0 +1,28 @@
+"""
+Передача функций в поток интерфейса Qt
+"""
+from typing import Callable
+
+from PySide6 import QtCore
+
+
+class QtDispatcher(QtCore.QObject):
+    """
+    dispatch для BackgroundExecutor: функция, переданная из любого потока,
+    выполняется в потоке, которому принадлежит объект (потоке интерфейса),
+    через очередь событий Qt.
+    Объект нужно создавать в потоке интерфейса после создания QApplication.
+    """
+
+    call = QtCore.Signal(object)
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.call.connect(self._run, QtCore.Qt.QueuedConnection)
+
+    @QtCore.Slot(object)
+    def _run(self, func: Callable[[], None]) -> None:
+        func()
+
+    def __call__(self, func: Callable[[], None]) -> None:
+        self.call.emit(func)
@@ -0,0 +1,207 @@
+"""
+Модель таблицы расходов для QTableView
+
+Строки загружаются из репозитория постранично по мере прокрутки
+(canFetchMore/fetchMore) в фоне, не задерживая поток интерфейса;
+отформатированный текст ячеек кэшируется, а добавление и изменение расхода
+меняют одну строку без перестроения таблицы.
+"""
+from dataclasses import replace
+from datetime import datetime
+from typing import Any, Callable
+
+from PySide6 import QtCore
+
+from bookkeeper.models.expense import Expense
+from bookkeeper.utils import USER_DATE_FORMAT, to_datetime
+
+DEFAULT_PAGE_SIZE = 200
+HEADERS = "Дата Сумма Категория Комментарий".split()
+
+
+def format_expense(expense: Expense) -> tuple[str, str, str, str]:
+    """ Текст ячеек строки таблицы для расхода """
+    return (to_datetime(expense.expense_date).strftime(USER_DATE_FORMAT),
+            str(expense.amount),
+            str(expense.category).capitalize(),
+            str(expense.comment))
+
+
+class ExpensesTableModel(QtCore.QAbstractTableModel):
+    """
+    Модель таблицы расходов.
+    page_getter(after_pk, limit, on_done, on_error) - функция, которая загружает
+    не более limit расходов с id больше after_pk в порядке возрастания id
+    и передает их в on_done (или исключение в on_error) в потоке интерфейса
+    editor(pk, amount, category, expense_date, comment) - сохранение изменений
+    budgets_editor(value=..., date=...) - учет изменения суммы расхода в бюджете
+    Сигнал error передает текст ошибки ввода.
+    """
+
+    error = QtCore.Signal(str)
+
+    def __init__(self, *args,
+                 page_getter: Callable[..., None],
+                 editor: Callable | None = None,
+                 budgets_editor: Callable | None = None,
+                 page_size: int = DEFAULT_PAGE_SIZE,
+                 **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.page_getter = page_getter
+        self.editor = editor
+        self.budgets_editor = budgets_editor
+        self.page_size = page_size
+        self._rows: list[Expense] = []
+        self._cells: list[tuple[str, str, str, str] | None] = []
+        self._row_by_pk: dict[int, int] = {}
+        self._exhausted = False
+        # запрошена страница, которая еще не загружена
+        self._loading = False
+        # номер загрузки таблицы: страницы, запрошенные до reset, не показываются
+        self._generation = 0
+
+    def rowCount(self, parent: QtCore.QModelIndex = QtCore.QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent: QtCore.QModelIndex = QtCore.QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(HEADERS)
+
+    def headerData(self, section: int, orientation: QtCore.Qt.Orientation,
+                   role: int = QtCore.Qt.DisplayRole) -> Any:
+        if role == QtCore.Qt.DisplayRole and orientation == QtCore.Qt.Horizontal:
+            return HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def flags(self, index: QtCore.QModelIndex) -> QtCore.Qt.ItemFlags:
+        return (QtCore.Qt.ItemIsEnabled | QtCore.Qt.ItemIsSelectable
+                | QtCore.Qt.ItemIsEditable)
+
+    def data(self, index: QtCore.QModelIndex,
+             role: int = QtCore.Qt.DisplayRole) -> Any:
+        if not index.isValid() or role not in (QtCore.Qt.DisplayRole,
+                                               QtCore.Qt.EditRole):
+            return None
+        row = index.row()
+        cells = self._cells[row]
+        if cells is None:
+            cells = self._cells[row] = format_expense(self._rows[row])
+        return cells[index.column()]
+
+    def expense(self, row: int) -> Expense:
+        """ Расход в строке row """
+        return self._rows[row]
+
+    def canFetchMore(self, parent: QtCore.QModelIndex = QtCore.QModelIndex()) -> bool:
+        return not parent.isValid() and not self._exhausted and not self._loading
+
+    def fetchMore(self, parent: QtCore.QModelIndex = QtCore.QModelIndex()) -> None:
+        if parent.isValid() or self._exhausted or self._loading:
+            return
+        self._loading = True
+        generation = self._generation
+        after_pk = self._rows[-1].pk if self._rows else 0
+        self.page_getter(after_pk, self.page_size,
+                         lambda page: self._page_loaded(generation, page),
+                         lambda exc: self._page_failed(generation, exc))
+
+    def _page_loaded(self, generation: int, page: list[Expense]) -> None:
+        if generation != self._generation:
+            return
+        self._loading = False
+        if len(page) < self.page_size:
+            self._exhausted = True
+        if not page:
+            return
+        first = len(self._rows)
+        self.beginInsertRows(QtCore.QModelIndex(), first, first + len(page) - 1)
+        for i, expense in enumerate(page, start=first):
+            self._row_by_pk[expense.pk] = i
+        self._rows.extend(page)
+        self._cells.extend([None] * len(page))
+        self.endInsertRows()
+
+    def _page_failed(self, generation: int, exc: BaseException) -> None:
+        if generation != self._generation:
+            return
+        # не запрашивать страницу снова, пока таблица не загружена заново
+        self._loading = False
+        self._exhausted = True
+        self.error.emit(str(exc))
+
+    def reset(self) -> None:
+        """ Забыть загруженные строки; они будут загружены заново при отображении """
+        self.beginResetModel()
+        self._rows.clear()
+        self._cells.clear()
+        self._row_by_pk.clear()
+        self._exhausted = False
+        self._loading = False
+        self._generation += 1
+        self.endResetModel()
+
+    def insert_expense(self, expense: Expense) -> None:
+        """
+        Показать добавленный расход. Если загружены еще не все страницы,
+        расход появится при загрузке последней из них.
+        """
+        self.insert_expenses([expense])
+
+    def insert_expenses(self, expenses: list[Expense]) -> None:
+        """ Показать добавленные расходы одной вставкой строк (см. insert_expense) """
+        if not self._exhausted:
+            return
+        expenses = [expense for expense in expenses
+                    if expense.pk not in self._row_by_pk]
+        if not expenses:
+            return
+        first = len(self._rows)
+        self.beginInsertRows(QtCore.QModelIndex(), first, first + len(expenses) - 1)
+        for row, expense in enumerate(expenses, start=first):
+            self._row_by_pk[expense.pk] = row
+        self._rows.extend(expenses)
+        self._cells.extend([None] * len(expenses))
+        self.endInsertRows()
+
+    def update_expense(self, expense: Expense) -> None:
+        """ Показать изменения расхода, если его строка загружена """
+        row = self._row_by_pk.get(expense.pk)
+        if row is None:
+            return
+        self._rows[row] = expense
+        self._cells[row] = None
+        self.dataChanged.emit(self.index(row, 0), self.index(row, len(HEADERS) - 1))
+
+    def setData(self, index: QtCore.QModelIndex, value: Any,
+                role: int = QtCore.Qt.EditRole) -> bool:
+        if not index.isValid() or role != QtCore.Qt.EditRole:
+            return False
+        old = self._rows[index.row()]
+        column = index.column()
+        try:
+            if column == 0:
+                try:
+                    new = replace(old, expense_date=datetime.strptime(
+                        str(value), USER_DATE_FORMAT))
+                except ValueError as exc:
+                    raise ValueError(
+                        "Введите дату числами в формате день-месяц-год") from exc
+            elif column == 1:
+                try:
+                    new = replace(old, amount=float(value))
+                except ValueError as exc:
+                    raise ValueError("Введите сумму числами") from exc
+            elif column == 2:
+                new = replace(old, category=str(value))
+            else:
+                new = replace(old, comment=str(value))
+        except ValueError as exc:
+            self.error.emit(str(exc))
+            return False
+        if self.editor is not None:
+            self.editor(new.pk, new.amount, new.category,
+                        to_datetime(new.expense_date), new.comment)
+        if column == 1 and self.budgets_editor is not None:
+            self.budgets_editor(value=new.amount - old.amount,
+                                date=to_datetime(new.expense_date))
+        self.update_expense(new)
+        return True
@@ -6,9 +6,17 @@ from PySide6 import QtWidgets, QtCore
 from typing import Callable
 
 from bookkeeper.models.expense import Expense
+from bookkeeper.view.expenses_model import ExpensesTableModel
 
 
 class CategoryComboBox(QtWidgets.QWidget):
+    """
+    Выпадающий список категорий. category_list_getter(on_done) загружает
+    в фоне пары (id, название) и передает их в on_done; id хранится в данных
+    элемента списка, по нему add_category, rename_category и remove_category
+    меняют один элемент.
+    """
+
     def __init__(self, *args, category_list_getter: Callable, **kwargs) -> None:
         super().__init__(*args, **kwargs)
 
@@ -22,15 +30,39 @@ class CategoryComboBox(QtWidgets.QWidget):
         self.layout.removeWidget(self.category_box)
 
         self.category_box = QtWidgets.QComboBox()
-        categories = category_list_getter()
-        for category in categories:
-            self.category_box.addItem(category)
-
         self.layout.addWidget(self.category_box)
+        category_list_getter(self.show_categories)
+
+    def show_categories(self, categories: list[tuple[int, str]]) -> None:
+        """ Заполнить список загруженными парами (id, название) """
+        self.category_box.clear()
+        for pk, name in categories:
+            self.category_box.addItem(name, pk)
+
+    def add_category(self, pk: int, name: str) -> None:
+        self.category_box.addItem(name, pk)
+
+    def rename_category(self, pk: int, name: str) -> None:
+        index = self.category_box.findData(pk)
+        if index < 0:
+            self.add_category(pk, name)
+        else:
+            self.category_box.setItemText(index, name)
+
+    def remove_category(self, pk: int) -> None:
+        index = self.category_box.findData(pk)
+        if index >= 0:
+            self.category_box.removeItem(index)
 
 
 class ExpensesList(QtWidgets.QWidget):
-    expenses_table: QtWidgets.QTableWidget
+    """
+    Таблица расходов. Строки загружаются моделью ExpensesTableModel
+    в фоне постранично через expenses_getter(after_pk, limit, on_done, on_error)
+    по мере прокрутки.
+    """
+    expenses_table: QtWidgets.QTableView
+    model: ExpensesTableModel
 
     def __init__(self, *args,
                  expenses_getter: Callable | None,
@@ -51,57 +83,13 @@ class ExpensesList(QtWidgets.QWidget):
         self.expenses_title = QtWidgets.QLabel("Последние расходы")
         self.layout.addWidget(self.expenses_title)
 
-        self.expenses_table = QtWidgets.QTableWidget(4, 20)
-        self.expenses_table.setColumnCount(4)
-        self.expenses_table.setRowCount(20)
-        self.expenses_table.setHorizontalHeaderLabels(
-            "Дата Сумма Категория Комментарий".split()
-        )
-        self.header = self.expenses_table.horizontalHeader()
-        self.header.setSectionResizeMode(
-            0, QtWidgets.QHeaderView.ResizeToContents)
-        self.header.setSectionResizeMode(
-            1, QtWidgets.QHeaderView.ResizeToContents)
-        self.header.setSectionResizeMode(
-            2, QtWidgets.QHeaderView.ResizeToContents)
-        self.header.setSectionResizeMode(
-            3, QtWidgets.QHeaderView.Stretch)
-
-        self.set_expenses(expenses_getter)
-
-    def build_expenses(self, data: list[Expense]) -> None:
-        for i, row in enumerate(data):
-            self.expenses_table.setItem(
-                i, 0,
-                QtWidgets.QTableWidgetItem(
-                    datetime.strptime(
-                        row.expense_date, "%Y-%m-%d %H:%M:%S").strftime("%d-%m-%Y"))
-            )
-            self.expenses_table.setItem(
-                i, 1,
-                QtWidgets.QTableWidgetItem(str(row.amount))
-            )
-            self.expenses_table.setItem(
-                i, 2,
-                QtWidgets.QTableWidgetItem(str(row.category).capitalize())
-            )
-            self.expenses_table.setItem(
-                i, 3,
-                QtWidgets.QTableWidgetItem(str(row.comment))
-            )
-
-    def set_expenses(self, expenses_getter: Callable) -> None:
-        if self.expenses_table.itemAt(0, 0) is not None:
-            self.layout.removeWidget(self.expenses_table)
+        self.model = ExpensesTableModel(page_getter=expenses_getter,
+                                        editor=expenses_editor,
+                                        budgets_editor=budgets_editor)
+        self.model.error.connect(self.show_error)
 
-        expenses_data = expenses_getter()
-
-        self.expenses_table = QtWidgets.QTableWidget(4, len(expenses_data))
-        self.expenses_table.setColumnCount(4)
-        self.expenses_table.setRowCount(len(expenses_data))
-        self.expenses_table.setHorizontalHeaderLabels(
-            "Дата Сумма Категория Комментарий".split()
-        )
+        self.expenses_table = QtWidgets.QTableView()
+        self.expenses_table.setModel(self.model)
         self.header = self.expenses_table.horizontalHeader()
         self.header.setSectionResizeMode(
             0, QtWidgets.QHeaderView.ResizeToContents)
@@ -111,43 +99,29 @@ class ExpensesList(QtWidgets.QWidget):
             2, QtWidgets.QHeaderView.ResizeToContents)
         self.header.setSectionResizeMode(
             3, QtWidgets.QHeaderView.Stretch)
-
-        self.build_expenses(expenses_data)
-        self.expenses_table.itemChanged.connect(self.table_item_changed)
         self.layout.addWidget(self.expenses_table)
 
-    @QtCore.Slot()
-    def table_item_changed(self, item):
-        table_position = self.expenses_table.indexFromItem(item)
-        row, column = table_position.row(), table_position.column()
+    def insert_expense(self, expense: Expense) -> None:
+        """ Добавить в таблицу строку нового расхода """
+        self.model.insert_expense(expense)
 
-        pk = row + 1
-        old_value = self.db_expense_getter(pk)
-        amount = old_value.amount
-        category = old_value.category
-        expense_date = old_value.expense_date
-        comment = old_value.comment
+    def insert_expenses(self, expenses: list[Expense]) -> None:
+        """ Добавить в таблицу строки расходов, добавленных пакетом """
+        self.model.insert_expenses(expenses)
 
-        try:
-            amount = float(self.expenses_table.item(row, 1).text())
-            category = self.expenses_table.item(row, 2).text()
-            expense_date = datetime.strptime(
-                self.expenses_table.item(row, 0).text(), "%d-%m-%Y"
-            )
-            comment = self.expenses_table.item(row, 3).text()
-            if column == 1:
-                self.budgets_editor(value=-old_value.amount + amount, date=expense_date)
-            print("table item changed: ",
-                  pk, " with amount ", amount,
-                  " and category ", category,
-                  " and expense date ", expense_date,
-                  " and comment ", comment)
-        except ValueError as e:
-            self.set_expenses(self.setter)
-            QtWidgets.QMessageBox.critical(self, 'Ошибка', str(e))
+    def update_expense(self, expense: Expense) -> None:
+        """ Обновить строку измененного расхода """
+        self.model.update_expense(expense)
+
+    def set_expenses(self, expenses_getter: Callable) -> None:
+        """ Загрузить таблицу заново (после изменений в обход таблицы) """
+        self.setter = expenses_getter
+        self.model.page_getter = expenses_getter
+        self.model.reset()
 
-        finally:
-            self.editor(pk, amount, category, expense_date, comment)
+    @QtCore.Slot(str)
+    def show_error(self, message: str) -> None:
+        QtWidgets.QMessageBox.critical(self, 'Ошибка', message)
 
 
 class AddAmountElement(QtWidgets.QWidget):
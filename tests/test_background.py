@@ -0,0 +1,91 @@
+import threading
+
+import pytest
+
+from bookkeeper.background import BackgroundExecutor
+
+
+@pytest.fixture
+def executor():
+    executor = BackgroundExecutor()
+    yield executor
+    executor.shutdown()
+
+
+def blocker(executor):
+    """ Занять фоновый поток до вызова release.set() """
+    release = threading.Event()
+    started = threading.Event()
+
+    def block():
+        started.set()
+        release.wait(5)
+
+    executor.submit(block)
+    started.wait(5)
+    return release
+
+
+def test_result_and_errors():
+    results, errors, default_errors = [], [], []
+    executor = BackgroundExecutor(error_handler=default_errors.append)
+    executor.submit(sum, [1, 2, 3], on_done=results.append)
+    executor.submit(int, 'x', on_error=errors.append)
+    executor.submit(int, 'y')
+    executor.submit(dict, a=1, on_done=results.append)
+    executor.shutdown()
+    assert results == [6, {'a': 1}]
+    assert isinstance(errors[0], ValueError)
+    assert isinstance(default_errors[0], ValueError)
+
+
+def test_coalescing_pending_tasks(executor):
+    calls, results = [], []
+    release = blocker(executor)
+    for i in range(5):
+        executor.submit(calls.append, i, key='refresh', on_done=results.append)
+    release.set()
+    executor.shutdown()
+    assert calls == [4]
+    assert results == [None]
+
+
+def test_stale_running_task_is_not_delivered(executor):
+    results = []
+    release = threading.Event()
+    started = threading.Event()
+
+    def reload(value):
+        started.set()
+        release.wait(5)
+        return value
+
+    executor.submit(reload, 'old', key='reload', on_done=results.append)
+    started.wait(5)
+    executor.submit(reload, 'new', key='reload', on_done=results.append)
+    release.set()
+    executor.shutdown()
+    assert results == ['new']
+
+
+def test_cancel_before_delivery():
+    queue, results = [], []
+    executor = BackgroundExecutor(dispatch=queue.append)
+    first = executor.submit(lambda: 1, on_done=results.append)
+    executor.submit(lambda: 2, on_done=results.append)
+    executor.shutdown()
+    first.cancel()
+    for callback in queue:
+        callback()
+    assert results == [2]
+
+
+def test_other_keys_are_independent(executor):
+    results = []
+    release = blocker(executor)
+    executor.submit(lambda: 'a', key='a', on_done=results.append)
+    executor.submit(lambda: 'b', key='b', on_done=results.append)
+    executor.submit(lambda: 'write', on_done=results.append)
+    release.set()
+    executor.shutdown()
+    assert results == ['a', 'b', 'write']
@@ -0,0 +1,111 @@
+import random
+
+import pytest
+
+from bookkeeper.categorizer import AhoCorasick, Categorizer, Rule, required_literal
+from bookkeeper.importer import ExpenseImporter
+from bookkeeper.models.category import Category
+from bookkeeper.repository.memory_repository import MemoryRepository
+
+
+@pytest.fixture
+def categories():
+    repo = MemoryRepository()
+    Category.create_from_tree([('продукты', None), ('мясо', 'продукты'),
+                               ('сладости', 'продукты'), ('транспорт', None)], repo)
+    return repo.get_all()
+
+
+def test_rule_validation():
+    with pytest.raises(ValueError):
+        Rule('мясо', 'x', kind='glob')
+    with pytest.raises(ValueError):
+        Rule('мясо', min_amount=10, max_amount=1)
+    assert Rule('мясо', max_amount=100).amount_matches(50)
+    assert not Rule('мясо', min_amount=100).amount_matches(None)
+
+
+def test_aho_corasick_overlapping():
+    automaton = AhoCorasick(['he', 'she', 'his', 'hers'])
+    assert automaton.find('ushers') == {0, 1, 3}
+    assert automaton.find('ahishe') == {0, 1, 2}
+    assert automaton.find('xyz') == set()
+    with pytest.raises(ValueError):
+        AhoCorasick([''])
+
+
+def test_aho_corasick_matches_naive_search():
+    rng = random.Random(0)
+    words = list({''.join(rng.choices('abc', k=rng.randint(1, 4))) for _ in range(40)})
+    automaton = AhoCorasick(words)
+    for _ in range(200):
+        text = ''.join(rng.choices('abcd', k=rng.randint(0, 12)))
+        assert automaton.find(text) == {number for number, word in enumerate(words)
+                                        if word in text}
+
+
+@pytest.mark.parametrize('pattern, literal, text', [
+    ('Lenta', 'lenta', 'LENTA'),
+    (r'coffee\s+shop', 'coffee', 'Coffee  shop'),
+    (r'uber\.com', 'uber.com', 'uber.com/ride'),
+    (r'[a-z]+market', 'market', 'supermarket'),
+    (r'(foo|bar)baz', 'baz', 'barbaz'),
+    ('x{2,3}yz', 'yz', 'xxxyz'),
+    ('a|b', None, 'b'),
+    (r'\d+', None, '7'),
+    (r'\x41BC', 'abc', 'ABC'),
+    (r'\u0041bc', 'abc', 'abc'),
+    (r'\U00000041bc', 'abc', 'Abc'),
+    (r'\101BC', 'abc', 'ABC'),
+    (r'\N{LATIN CAPITAL LETTER A}bc', 'abc', 'ABC'),
+    (r'a\0bc', 'a\0bc', 'a\0bc'),
+    (r'(x)\1yz', 'yz', 'xxyz'),
+    (r'\x41?bc', 'bc', 'bc'),
+])
+def test_required_literal(pattern, literal, text):
+    assert required_literal(pattern) == literal
+    assert Categorizer([Rule('cat', pattern, kind='regex')]).classify(text) == 'cat'
+
+
+def test_classify(categories):
+    categorizer = Categorizer([
+        Rule('мясо', 'мясная лавка'),
+        Rule('сладости', r'конфет(ы|a)', kind='regex'),
+        Rule('транспорт', r'^\d+ км', kind='regex'),
+        Rule('продукты', 'лавка', min_amount=1000, max_amount=10_000, priority=1),
+        Rule('транспорт', min_amount=100_000),
+    ], categories)
+    assert categorizer.classify('Мясная лавка №1', 500) == 'мясо'
+    assert categorizer.classify('Мясная лавка №1', 5000) == 'продукты'
+    assert categorizer.classify('КОНФЕТЫ') == 'сладости'
+    assert categorizer.classify('12 км') == 'транспорт'
+    assert categorizer.classify('аптека', 10) is None
+    # правила одного приоритета с разными категориями - общая родительская
+    assert categorizer.classify('мясная лавка, конфеты') == 'продукты'
+    # общей родительской нет - правило, стоящее раньше
+    assert categorizer.classify('мясная лавка', 200_000) == 'мясо'
+    with pytest.raises(ValueError):
+        Categorizer([Rule('одежда', 'x')], categories)
+
+
+def test_classify_many_in_processes(categories):
+    categorizer = Categorizer([Rule('мясо', 'мясо'), Rule('сладости', 'торт')],
+                              categories)
+    rows = [('мясо', 1.0), ('торт', None), ('хлеб', 2.0)] * 10
+    expected = ['мясо', 'сладости', None] * 10
+    assert categorizer.classify_many(rows, processes=1) == expected
+    assert categorizer.classify_many(rows, processes=2, chunk_size=7) == expected
+
+
+def test_importer_uses_categorizer(categories):
+    cat_repo = MemoryRepository()
+    cat_repo.add_many([Category(cat.name, cat.parent) for cat in categories])
+    expense_repo = MemoryRepository()
+    rows = [(1, {'date': '2024-01-01', 'amount': '10', 'comment': 'торт'}),
+            (2, {'date': '2024-01-01', 'amount': '10', 'comment': 'носки'})]
+    categorizer = Categorizer([Rule('сладости', 'торт')])
+    report = ExpenseImporter(cat_repo, expense_repo,
+                             categorizer=categorizer).import_rows(rows)
+    assert report.imported == 1
+    assert [row.line for row in report.rejected] == [2]
+    assert expense_repo.get_all()[0].category == 'сладости'
@@ -0,0 +1,87 @@
+from datetime import date, datetime, timedelta
+import random
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from bookkeeper.columnar import ExpenseColumns, epoch_day
+from bookkeeper.models.expense import Expense
+from bookkeeper.repository.memory_repository import MemoryRepository
+from bookkeeper.repository.query import Range
+from bookkeeper.repository.sqlite_repository import SQLiteRepository
+
+
+def expenses(n=300, seed=1):
+    rnd = random.Random(seed)
+    return [Expense(amount=rnd.randint(1, 100), category=rnd.choice('abcd'),
+                    expense_date=datetime(2023, 1, 1)
+                    + timedelta(hours=rnd.randint(0, 2000)),
+                    comment=rnd.choice(['', 'x', 'y']))
+            for _ in range(n)]
+
+
+@pytest.fixture
+def repo(tmp_path):
+    repo = SQLiteRepository(Expense, str(tmp_path / 'expenses.sqlite.db'))
+    repo.add_many(expenses())
+    return repo
+
+
+def test_epoch_day():
+    assert epoch_day(date(1970, 1, 2)) == 1
+    assert epoch_day('2023-03-15 12:00:00') == epoch_day(datetime(2023, 3, 15))
+
+
+def test_build_from_repository(repo):
+    columns = ExpenseColumns.from_repository(repo, batch_size=64)
+    assert len(columns) == 300
+    assert columns.total() == pytest.approx(repo.aggregate('sum', 'amount'))
+    assert len(columns.categories) == 4 and len(columns.comments) == 3
+    assert list(columns.pk) == [e.pk for e in repo.get_all()]
+
+
+@pytest.mark.parametrize('period', ['day', 'week', 'month'])
+def test_period_totals_match_aggregate(repo, period):
+    columns = ExpenseColumns.from_repository(repo)
+    start, end = datetime(2023, 1, 10), datetime(2023, 3, 1)
+    where = {'expense_date': Range(start, end)}
+    assert columns.period_totals(period, start, end) == \
+        repo.aggregate('sum', 'amount', where, group_by=f'expense_date__{period}')
+    with pytest.raises(ValueError):
+        columns.period_totals('year')
+
+
+def test_category_totals_and_updates():
+    repo = MemoryRepository()
+    items = expenses(50)
+    repo.add_many(items)
+    columns = ExpenseColumns.from_repository(repo)
+    assert columns.category_totals() == repo.aggregate('sum', 'amount',
+                                                       group_by='category')
+    new = Expense(1000, 'e', expense_date=datetime(2023, 2, 1))
+    repo.add(new)
+    columns.add(new)
+    changed = items[10]
+    changed.amount, changed.category = 500, 'a'
+    repo.update(changed)
+    columns.update(changed)
+    for pk in (items[0].pk, items[-1].pk, new.pk):
+        repo.delete(pk)
+        columns.remove(pk)
+    assert len(columns) == len(repo.get_all())
+    assert sorted(columns.pk) == sorted(e.pk for e in repo.get_all())
+    assert columns.category_totals() == repo.aggregate('sum', 'amount',
+                                                       group_by='category')
+
+
+def test_moving_average():
+    repo = MemoryRepository()
+    repo.add_many([Expense(amount, 'a', expense_date=datetime(2023, 1, day))
+                   for day, amount in [(1, 3), (2, 6), (4, 9), (4, 3)]])
+    days, averages = ExpenseColumns.from_repository(repo).moving_average(2)
+    assert list(days) == [np.datetime64('2023-01-01') + i for i in range(4)]
+    assert list(averages) == [1.5, 4.5, 3, 6]
+    days, averages = ExpenseColumns.from_repository(repo).moving_average(10)
+    assert list(averages) == [0.3, 0.9, 0.9, 2.1]
+    assert len(ExpenseColumns().moving_average(3)[0]) == 0
@@ -0,0 +1,44 @@
+from dataclasses import dataclass
+
+import pytest
+
+from bookkeeper.events import ADDED, DELETED, UPDATED, EventBus
+
+
+@dataclass
+class Item:
+    pk: int = 0
+
+
+def test_publish_subscribe():
+    bus = EventBus()
+    received = []
+    unsubscribe = bus.subscribe(Item, ADDED, received.append)
+    bus.subscribe(Item, DELETED, lambda pk: received.append(('deleted', pk)))
+    bus.publish(Item, ADDED, Item(1))
+    bus.publish(Item, DELETED, 1)
+    bus.publish(int, ADDED, 5)
+    assert received == [Item(1), ('deleted', 1)]
+    assert bus.has_subscribers(Item, ADDED)
+    assert not bus.has_subscribers(Item, UPDATED)
+    unsubscribe()
+    bus.publish(Item, ADDED, Item(2))
+    assert received == [Item(1), ('deleted', 1)]
+    assert not bus.has_subscribers(Item, ADDED)
+
+
+def test_unknown_event():
+    with pytest.raises(ValueError):
+        EventBus().subscribe(Item, 'renamed', print)
+
+
+def test_dispatch():
+    queue = []
+    bus = EventBus(dispatch=queue.append)
+    received = []
+    bus.subscribe(Item, UPDATED, lambda old, new: received.append((old, new)))
+    bus.publish(Item, UPDATED, Item(1), Item(1))
+    bus.publish(Item, ADDED, Item(2))
+    assert received == [] and len(queue) == 1
+    queue.pop()()
+    assert received == [(Item(1), Item(1))]
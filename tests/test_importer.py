@@ -0,0 +1,165 @@
+import io
+from datetime import datetime
+
+import pytest
+
+from bookkeeper.importer import (
+    ColumnMapping, ExpenseImporter, parse_amount, parse_date, read_csv, read_ofx,
+    read_qif
+)
+from bookkeeper.models.category import Category
+from bookkeeper.models.expense import Expense
+from bookkeeper.repository.memory_repository import MemoryRepository
+from bookkeeper.repository.sqlite_repository import SQLiteRepository
+
+CSV = '''date;amount;category;comment
+15.01.2024;1 234,50;Продукты;магазин
+16.01.2024;99.9;книги;
+not a date;10;Продукты;
+17.01.2024;15;Кино;
+'''
+
+OFX = '''OFXHEADER:100
+DATA:OFXSGML
+
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20240115120000.000[-5:EST]
+<TRNAMT>-42.10<NAME>Coffee &amp; Co<MEMO>card 1234</STMTTRN>
+<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20240116<TRNAMT>1000.00<NAME>Salary</STMTTRN>
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+'''
+
+QIF = '''!Type:Bank
+D01/15'24
+T-25.00
+PBook shop
+Lкниги
+^
+D1/16/2024
+T-7.5
+Mlunch
+^
+'''
+
+
+@pytest.fixture
+def cat_repo():
+    repo = MemoryRepository()
+    repo.add_many([Category('продукты'), Category('книги')])
+    return repo
+
+
+@pytest.fixture
+def expense_repo():
+    return MemoryRepository()
+
+
+def test_parse_amount():
+    assert parse_amount('1 234,50') == 1234.5
+    assert parse_amount('1,234.50') == 1234.5
+    assert parse_amount('1.234,50') == 1234.5
+    assert parse_amount('-99.9') == -99.9
+    with pytest.raises(ValueError):
+        parse_amount('')
+
+
+def test_parse_date_promotes_format():
+    formats = ['%Y%m%d', '%d.%m.%Y']
+    assert parse_date('2024-01-15 10:00') == datetime(2024, 1, 15, 10)
+    assert parse_date('15.01.2024', formats) == datetime(2024, 1, 15)
+    assert formats == ['%d.%m.%Y', '%Y%m%d']
+    with pytest.raises(ValueError):
+        parse_date('yesterday', formats)
+
+
+def test_read_csv_detects_delimiter():
+    rows = list(read_csv(io.StringIO(CSV)))
+    assert rows[0] == (2, {'date': '15.01.2024', 'amount': '1 234,50',
+                           'category': 'Продукты', 'comment': 'магазин'})
+    assert len(rows) == 4
+
+
+def test_read_ofx_streams_small_chunks(monkeypatch):
+    monkeypatch.setattr('bookkeeper.importer.OFX_CHUNK_SIZE', 7)
+    rows = list(read_ofx(io.StringIO(OFX)))
+    assert rows == [
+        (1, {'date': '20240115120000', 'amount': '-42.10',
+             'comment': 'Coffee & Co card 1234'}),
+        (2, {'date': '20240116', 'amount': '1000.00', 'comment': 'Salary'})]
+
+
+def test_read_qif():
+    rows = list(read_qif(io.StringIO(QIF)))
+    assert rows == [
+        (2, {'date': '01/15/24', 'amount': '-25.00', 'category': 'книги',
+             'comment': 'Book shop'}),
+        (7, {'date': '1/16/2024', 'amount': '-7.5', 'category': '',
+             'comment': 'lunch'})]
+
+
+def test_import_rows_rejects_bad_rows(cat_repo, expense_repo):
+    batches = []
+    importer = ExpenseImporter(cat_repo, expense_repo, batch_size=1,
+                               on_batch=lambda batch: batches.append(len(batch)))
+    report = importer.import_rows(read_csv(io.StringIO(CSV)))
+    assert report.imported == 2
+    assert [(row.line, row.reason) for row in report.rejected] == [
+        (4, "unknown date format 'not a date'"), (5, "unknown category 'Кино'")]
+    assert batches == [1, 1]
+    first, second = expense_repo.get_all()
+    assert (first.amount, first.category, first.comment) == (1234.5, 'продукты',
+                                                             'магазин')
+    assert first.expense_date == datetime(2024, 1, 15)
+    assert second.category == 'книги'
+
+
+def test_import_ofx_with_default_category(tmp_path, cat_repo, expense_repo):
+    path = tmp_path / 'statement.ofx'
+    path.write_text(OFX, encoding='utf-8')
+    importer = ExpenseImporter(cat_repo, expense_repo, by='pk',
+                               default_category='Продукты')
+    report = importer.import_file(str(path))
+    assert report.imported == 1
+    assert report.rejected[0].reason == 'not an expense'
+    expense = expense_repo.get_all()[0]
+    assert (expense.amount, expense.category) == (42.1, '1')
+    with pytest.raises(ValueError):
+        ExpenseImporter(cat_repo, expense_repo, default_category='нет').import_rows([])
+    with pytest.raises(ValueError):
+        importer.import_file(str(path), fmt='xls')
+
+
+def test_import_qif_and_mapping(tmp_path, cat_repo, expense_repo):
+    path = tmp_path / 'statement.qif'
+    path.write_text(QIF, encoding='utf-8')
+    report = ExpenseImporter(cat_repo, expense_repo).import_file(str(path))
+    assert report.imported == 1
+    assert expense_repo.get_all()[0].expense_date == datetime(2024, 1, 15)
+    mapping = ColumnMapping(amount='sum', date='day', category='kind',
+                            comment=('shop', 'note'))
+    rows = [(1, {'sum': '5', 'day': '2024-02-01', 'kind': 'книги',
+                 'shop': 'a', 'note': 'b'})]
+    ExpenseImporter(cat_repo, expense_repo).import_rows(rows, mapping)
+    assert expense_repo.get_all()[-1].comment == 'a b'
+
+
+def test_atomic_import_rolls_back(tmp_path):
+    repos = SQLiteRepository.repository_factory([Category, Expense],
+                                                str(tmp_path / 'import.sqlite.db'))
+    repos[Category].add(Category('продукты'))
+
+    def fail(batch):
+        if len(repos[Expense].get_all()) > 2:
+            raise RuntimeError
+
+    rows = [(line, {'date': '2024-01-01', 'amount': '1', 'category': 'продукты'})
+            for line in range(5)]
+    with pytest.raises(RuntimeError):
+        ExpenseImporter(repos[Category], repos[Expense], batch_size=2,
+                        on_batch=fail).import_rows(rows)
+    assert repos[Expense].get_all() == []
+    report = ExpenseImporter(repos[Category], repos[Expense], batch_size=2,
+                             atomic=False).import_rows(rows)
+    assert report.imported == 5
+    assert len(repos[Expense].get_all()) == 5
+    repos[Expense].pool.close()
@@ -0,0 +1,72 @@
+import json
+
+import pytest
+
+from bookkeeper.instrumentation import Instrumentation, Metric, instrument_handlers
+
+
+def test_metric_percentiles():
+    metric = Metric()
+    for ms in range(1, 101):
+        metric.add(ms / 1000, rows=2)
+    summary = metric.summary()
+    assert summary['count'] == 100 and summary['rows'] == 200
+    assert summary['max'] == pytest.approx(0.1)
+    assert summary['mean'] == pytest.approx(0.0505)
+    assert summary['p50'] == pytest.approx(0.050, rel=0.05)
+    assert summary['p95'] == pytest.approx(0.095, rel=0.05)
+    assert summary['p99'] == pytest.approx(0.099, rel=0.05)
+    assert Metric().percentile(50) == 0.0
+
+
+def test_wrap_and_timer():
+    instrumentation = Instrumentation()
+
+    def handler(x):
+        if x < 0:
+            raise ValueError(x)
+        return x * 2
+
+    wrapped = instrumentation.wrap('handler', handler)
+    assert wrapped(2) == 4
+    with pytest.raises(ValueError):
+        wrapped(-1)
+    with instrumentation.timer('block'):
+        pass
+    metrics = instrumentation.metrics()
+    assert metrics['handler']['count'] == 2
+    assert metrics['block']['count'] == 1
+    assert wrapped.__name__ == 'handler'
+
+
+def test_disabled_records_nothing():
+    instrumentation = Instrumentation(enabled=False)
+    assert instrumentation.wrap('f', lambda: 1)() == 1
+    with instrumentation.timer('block'):
+        pass
+    assert instrumentation.metrics() == {}
+
+
+def test_instrument_handlers():
+    instrumentation = Instrumentation()
+
+    def get_budget():
+        return []
+
+    handlers = instrument_handlers({'budget': [get_budget, None]}, instrumentation)
+    assert handlers['budget'][1] is None
+    handlers['budget'][0]()
+    assert instrumentation.metrics()['handler.get_budget']['count'] == 1
+
+
+def test_dump_and_reset(tmp_path):
+    instrumentation = Instrumentation()
+    instrumentation.record('op', 0.001, rows=3)
+    instrumentation.record_sql('SELECT 1', 0.002, rows=1)
+    path = tmp_path / 'metrics.json'
+    instrumentation.dump(str(path))
+    data = json.loads(path.read_text(encoding='utf-8'))
+    assert data['metrics']['op']['rows'] == 3
+    assert data['sql']['SELECT 1']['count'] == 1
+    instrumentation.reset()
+    assert instrumentation.metrics() == {} and instrumentation.sql() == {}
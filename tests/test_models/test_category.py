@@ -106,3 +106,21 @@ def test_create_from_tree_error(repo):
     tree = [('1', 'parent'), ('parent', None)]
     with pytest.raises(KeyError):
         Category.create_from_tree(tree, repo)
+
+
+def test_create_from_tree_batches_by_level(repo):
+    calls = []
+    add_many = repo.add_many
+
+    def spy(objs):
+        objs = list(objs)
+        calls.append([c.name for c in objs])
+        return add_many(objs)
+
+    repo.add_many = spy
+    tree = [('a', None), ('a1', 'a'), ('b', None), ('a11', 'a1'), ('b1', 'b')]
+    cats = Category.create_from_tree(tree, repo)
+    assert calls == [['a', 'b'], ['a1', 'b1'], ['a11']]
+    by_name = {c.name: c for c in cats}
+    assert by_name['a11'].parent == by_name['a1'].pk
+    assert by_name['b1'].parent == by_name['b'].pk
@@ -28,3 +28,16 @@ def test_can_add_to_repo(repo):
     e = Expense(100, 1)
     pk = repo.add(e)
     assert e.pk == pk
+
+
+def test_default_dates_are_datetimes():
+    e = Expense(100, 1)
+    assert isinstance(e.expense_date, datetime)
+    assert isinstance(e.added_date, datetime)
+
+
+def test_slotted():
+    e = Expense(100, 1)
+    assert not hasattr(e, '__dict__')
+    with pytest.raises(AttributeError):
+        e.unknown = 1
@@ -0,0 +1,57 @@
+from datetime import datetime
+
+import pytest
+
+from bookkeeper.models.category import Category
+from bookkeeper.models.expense import Expense
+from bookkeeper.reports import category_rollup
+from bookkeeper.repository.memory_repository import MemoryRepository
+from bookkeeper.repository.query import Range
+from bookkeeper.repository.sqlite_repository import SQLiteRepository
+
+
+@pytest.fixture
+def cat_repo():
+    repo = MemoryRepository()
+    Category.create_from_tree([('продукты', None), ('мясо', 'продукты'),
+                               ('сырое мясо', 'мясо'), ('сладости', 'продукты'),
+                               ('книги', None)], repo)
+    return repo
+
+
+def expenses():
+    return [Expense(100, 'мясо', expense_date=datetime(2023, 3, 1)),
+            Expense(50, 'сырое мясо', expense_date=datetime(2023, 3, 2)),
+            Expense(20, 'сладости', expense_date=datetime(2023, 3, 3)),
+            Expense(7, 'продукты', expense_date=datetime(2023, 4, 1)),
+            Expense(300, 'книги', expense_date=datetime(2023, 3, 4)),
+            Expense(1, 'неизвестно', expense_date=datetime(2023, 3, 4))]
+
+
+def test_category_rollup(cat_repo):
+    expense_repo = MemoryRepository()
+    expense_repo.add_many(expenses())
+    pk = {cat.name: cat.pk for cat in cat_repo.get_all()}
+    report = category_rollup(cat_repo, expense_repo, by='name')
+    food, meat = report[pk['продукты']], report[pk['продукты']][pk['мясо']]
+    assert food['own'] == 7 and food['total'] == 177
+    assert meat['total'] == 150 and meat[pk['сырое мясо']]['total'] == 50
+    assert food[pk['сладости']] == {'name': 'сладости', 'own': 20, 'total': 20}
+    assert report[pk['книги']]['total'] == 300
+
+    march = category_rollup(cat_repo, expense_repo, by='name', where={
+        'expense_date': Range(datetime(2023, 3, 1), datetime(2023, 4, 1))})
+    assert march[pk['продукты']]['total'] == 170
+    assert march[pk['продукты']]['own'] == 0
+
+
+def test_category_rollup_by_pk_in_sqlite(cat_repo, tmp_path):
+    expense_repo = SQLiteRepository(Expense, str(tmp_path / 'expenses.sqlite.db'))
+    by_pk = {cat.name: cat.pk for cat in cat_repo.get_all()}
+    items = expenses()[:-1]
+    for expense in items:
+        expense.category = by_pk[expense.category]
+    expense_repo.add_many(items)
+    report = category_rollup(cat_repo, expense_repo)
+    assert report[by_pk['продукты']]['total'] == 177
+    assert report[by_pk['книги']]['total'] == 300
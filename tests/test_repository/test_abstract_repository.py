@@ -1,4 +1,7 @@
+from types import SimpleNamespace
+
 from bookkeeper.repository.abstract_repository import AbstractRepository
+from bookkeeper.repository.query import Range, matches, sort_objects
 
 import pytest
 
@@ -18,3 +21,46 @@ def test_can_create_subclass():
 
     t = Test()
     assert isinstance(t, AbstractRepository)
+
+
+def test_default_batch_methods():
+    class Test(AbstractRepository):
+        def __init__(self):
+            self.calls = []
+        def add(self, obj): self.calls.append(('add', obj)); return obj
+        def get(self, pk): pass
+        def get_all(self, where=None): pass
+        def update(self, obj): self.calls.append(('update', obj))
+        def delete(self, pk): self.calls.append(('delete', pk))
+
+    t = Test()
+    assert t.add_many([1, 2]) == [1, 2]
+    t.update_many([3])
+    t.delete_many([4, 5])
+    assert t.calls == [('add', 1), ('add', 2), ('update', 3),
+                       ('delete', 4), ('delete', 5)]
+
+
+def test_default_page_and_iter_all():
+    class Test(AbstractRepository):
+        def __init__(self):
+            self.objs = [SimpleNamespace(pk=pk) for pk in range(1, 8)]
+            self.calls = 0
+        def add(self, obj): pass
+        def get(self, pk): pass
+        def get_all(self, where=None, order_by=None, limit=None):
+            self.calls += 1
+            result = [obj for obj in self.objs if matches(obj, where)]
+            return sort_objects(result, order_by)[:limit]
+        def update(self, obj): pass
+        def delete(self, pk): pass
+
+    t = Test()
+    assert [obj.pk for obj in t.page(after_pk=2, limit=3)] == [3, 4, 5]
+    assert [obj.pk for obj in t.page(after_pk=2, where={'pk': Range(end=5)})] == [3, 4]
+    assert [obj.pk for obj in t.page(after_pk=2, where={'pk': [1, 6]})] == [6]
+    assert t.page(after_pk=2, where={'pk': 2}) == []
+    t.calls = 0
+    assert [obj.pk for obj in t.iter_all(batch_size=3)] == list(range(1, 8))
+    assert t.calls == 3
+    assert [obj.pk for obj in t.iter_all(order_by='-pk')] == list(range(7, 0, -1))
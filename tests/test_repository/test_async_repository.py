@@ -0,0 +1,140 @@
+import asyncio
+from dataclasses import dataclass
+
+from bookkeeper.repository.async_memory_repository import AsyncMemoryRepository
+from bookkeeper.repository.async_sqlite_repository import AsyncSQLiteRepository
+from bookkeeper.repository.query import Range
+from bookkeeper.repository.sqlite_repository import SQLiteRepository
+
+import pytest
+
+
+@dataclass
+class Item:
+    pk: int = 0
+    name: str = ''
+    amount: int = 0
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def repo(request, tmp_path):
+    if request.param == 'memory':
+        yield AsyncMemoryRepository()
+        return
+    repo = AsyncSQLiteRepository.repository_factory(
+        [Item], str(tmp_path / 'async.sqlite.db'))[Item]
+    yield repo
+    repo.close()
+
+
+def test_crud(repo):
+    async def scenario():
+        item = Item(name='a', amount=1)
+        pk = await repo.add(item)
+        assert item.pk == pk
+        assert await repo.get(pk) == item
+        await repo.update(Item(pk=pk, name='b', amount=2))
+        assert await repo.get(pk) == Item(pk, 'b', 2)
+        await repo.delete(pk)
+        assert await repo.get(pk) is None
+
+    asyncio.run(scenario())
+
+
+def test_cannot_add_with_pk(repo):
+    with pytest.raises(ValueError):
+        asyncio.run(repo.add(Item(pk=1)))
+
+
+def test_get_all_and_iter_all(repo):
+    async def scenario():
+        await repo.add_many([Item(name=str(i), amount=i) for i in range(25)])
+        found = await repo.get_all({'amount': Range(10, 20)}, order_by='-amount', limit=3)
+        assert [item.amount for item in found] == [19, 18, 17]
+        assert [item.amount async for item in repo.iter_all(batch_size=7)] \
+            == list(range(25))
+        evens = [item.amount async for item in repo.iter_all(
+            where={'amount': list(range(0, 25, 2))}, batch_size=4)]
+        assert evens == list(range(0, 25, 2))
+        assert [item.pk for item in await repo.page(after_pk=20, limit=10)] \
+            == [21, 22, 23, 24, 25]
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_producers(repo):
+    async def producer(n):
+        return [await repo.add(Item(name=f'{n}-{i}', amount=i)) for i in range(50)]
+
+    async def scenario():
+        return await asyncio.gather(*(producer(n) for n in range(8)))
+
+    pks = [pk for batch in asyncio.run(scenario()) for pk in batch]
+    assert len(set(pks)) == 400
+    items = asyncio.run(repo.get_all())
+    assert len(items) == 400
+    assert all(item.name.endswith(f'-{item.amount}') for item in items)
+
+
+def test_sqlite_group_commit(tmp_path):
+    sync_repo = SQLiteRepository(Item, str(tmp_path / 'group.sqlite.db'))
+    calls = []
+    add_many = sync_repo.add_many
+    sync_repo.add_many = lambda objs: calls.append(len(objs)) or add_many(objs)
+    repo = AsyncSQLiteRepository(sync_repo)
+
+    async def scenario():
+        return await asyncio.gather(*(repo.add(Item(amount=i)) for i in range(100)))
+
+    pks = asyncio.run(scenario())
+    repo.close()
+    assert pks == list(range(1, 101))
+    assert sum(calls) == 100
+    assert len(calls) < 100
+
+
+def test_sqlite_failed_batch(tmp_path):
+    sync_repo = SQLiteRepository(Item, str(tmp_path / 'fail.sqlite.db'))
+
+    def fail(objs):
+        raise RuntimeError('disk is full')
+
+    sync_repo.add_many = fail
+    repo = AsyncSQLiteRepository(sync_repo)
+
+    async def scenario():
+        return await asyncio.gather(*(repo.add(Item()) for _ in range(3)),
+                                    return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    repo.close()
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_sqlite_bad_object_does_not_poison_batch(tmp_path):
+    repo = AsyncSQLiteRepository(SQLiteRepository(Item, str(tmp_path / 'bad.sqlite.db')))
+    items = [Item(name='a'), Item(name=object()), Item(name='c')]
+
+    async def scenario():
+        results = await asyncio.gather(*(repo.add(item) for item in items),
+                                       return_exceptions=True)
+        retried = [await repo.add(items[0]), await repo.add(items[2])]
+        return results, retried, await repo.get_all()
+
+    results, retried, stored = asyncio.run(scenario())
+    repo.close()
+    assert all(isinstance(result, Exception) for result in results)
+    assert [items[0].pk, items[2].pk] == retried
+    assert stored == [items[0], items[2]]
+
+
+def test_sqlite_factory_shares_thread(tmp_path):
+    @dataclass
+    class Other:
+        pk: int = 0
+
+    repos = AsyncSQLiteRepository.repository_factory(
+        [Item, Other], str(tmp_path / 'shared.sqlite.db'))
+    assert repos[Item].executor is repos[Other].executor
+    assert repos[Item].repo.pool is repos[Other].repo.pool
+    repos[Item].close()
@@ -0,0 +1,181 @@
+from dataclasses import dataclass
+import threading
+
+import pytest
+
+from bookkeeper.repository.caching_repository import CachingRepository
+from bookkeeper.repository.memory_repository import MemoryRepository
+from bookkeeper.repository.query import Range
+from bookkeeper.repository.sqlite_repository import SQLiteRepository
+
+
+@dataclass
+class Item:
+    category: int
+    amount: float = 0.0
+    pk: int = 0
+
+
+class CountingRepository(MemoryRepository):
+    def __init__(self):
+        super().__init__()
+        self.reads = 0
+
+    def get(self, pk):
+        self.reads += 1
+        return super().get(pk)
+
+    def get_all(self, where=None, order_by=None, limit=None):
+        self.reads += 1
+        return super().get_all(where, order_by, limit)
+
+
+class Clock:
+    now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def inner():
+    return CountingRepository()
+
+
+@pytest.fixture
+def repo(inner):
+    return CachingRepository(inner, max_size=3)
+
+
+def test_get_is_cached(repo, inner):
+    pk = repo.add(Item(1))
+    assert repo.get(pk) == Item(1, pk=pk)
+    assert repo.get(pk) == Item(1, pk=pk)
+    assert inner.reads == 1
+    assert (repo.hits, repo.misses) == (1, 1)
+
+
+def test_cached_objects_are_copies(repo):
+    pk = repo.add(Item(1))
+    repo.get(pk).amount = 100
+    assert repo.get(pk).amount == 0
+
+
+def test_get_all_is_cached(repo, inner):
+    repo.add_many([Item(1), Item(2), Item(1)])
+    first = repo.get_all({'category': 1})
+    assert repo.get_all({'category': 1}) == first
+    assert repo.get_all({'category': [1, 2]}, order_by='-pk') == repo.get_all(
+        {'category': [1, 2]}, order_by='-pk')
+    assert inner.reads == 2
+    assert repo.stats() == {'hits': 2, 'misses': 2, 'objects': 0, 'queries': 2}
+
+
+def test_precise_invalidation(repo, inner):
+    a, b = Item(1), Item(2)
+    repo.add_many([a, b])
+    repo.get_all({'category': 1})
+    repo.get_all({'category': 2})
+    repo.get(b.pk)
+    inner.reads = 0
+
+    repo.add(Item(1))
+    assert len(repo.get_all({'category': 1})) == 2
+    repo.get_all({'category': 2})
+    repo.get(b.pk)
+    assert inner.reads == 1
+
+    b.category = 3
+    repo.update(b)
+    assert repo.get_all({'category': 2}) == []
+    assert repo.get(b.pk).category == 3
+    assert inner.reads == 3
+
+    repo.delete(a.pk)
+    assert repo.get_all({'category': 1}) == [Item(1, pk=3)]
+    assert repo.get(a.pk) is None
+
+
+def test_negative_get_invalidated_on_add(repo):
+    assert repo.get(1) is None
+    pk = repo.add(Item(5))
+    assert pk == 1
+    assert repo.get(1) == Item(5, pk=1)
+
+
+def test_lru_eviction(repo, inner):
+    pks = repo.add_many([Item(i) for i in range(4)])
+    for pk in pks:
+        repo.get(pk)
+    inner.reads = 0
+    repo.get(pks[0])
+    assert inner.reads == 1
+    repo.get(pks[3])
+    assert inner.reads == 1
+
+
+def test_ttl(inner):
+    clock = Clock()
+    repo = CachingRepository(inner, ttl=10, clock=clock)
+    repo.add(Item(1))
+    repo.get_all()
+    clock.now = 5
+    repo.get_all()
+    assert inner.reads == 1
+    clock.now = 11
+    repo.get_all()
+    assert inner.reads == 2
+
+
+def test_batch_invalidation(repo):
+    items = [Item(1, amount=i) for i in range(3)]
+    repo.add_many(items)
+    assert len(repo.get_all({'amount': Range(1)})) == 2
+    for item in items:
+        item.amount = 10
+    repo.update_many(items)
+    assert len(repo.get_all({'amount': Range(1)})) == 3
+    repo.delete_many([items[0].pk])
+    assert len(repo.get_all({'amount': Range(1)})) == 2
+
+
+def test_factory_composition(tmp_path):
+    repos = SQLiteRepository.repository_factory(
+        [Item], str(tmp_path / 'cache.sqlite.db'), cache_size=10)
+    repo = repos[Item]
+    assert isinstance(repo, CachingRepository)
+    assert repo.table_name == 'item'
+    pk = repo.add(Item(1, 2.5))
+    assert repo.get(pk) == Item(1, 2.5, pk)
+    assert repo.get(pk) == Item(1, 2.5, pk)
+    assert repo.hits == 1
+
+
+def test_read_from_other_thread_during_transaction(tmp_path):
+    repo = SQLiteRepository.repository_factory(
+        [Item], str(tmp_path / 'cache.sqlite.db'), cache_size=10)[Item]
+    pk = repo.add(Item(1, 1.0))
+    written, read = threading.Event(), threading.Event()
+    seen = []
+
+    def writer():
+        with repo.transaction():
+            repo.update(Item(2, 2.0, pk))
+            seen.extend(repo.get_all({'category': 2}))
+            written.set()
+            read.wait(5)
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    assert written.wait(5)
+    # между записью и фиксацией другой поток читает и кэширует прежние данные
+    assert repo.get(pk) == Item(1, 1.0, pk)
+    assert repo.get_all({'category': 1}) == [Item(1, 1.0, pk)]
+    assert repo.get_all({'category': 2}) == []
+    read.set()
+    thread.join(5)
+    assert seen == [Item(2, 2.0, pk)]
+    assert repo.get(pk) == Item(2, 2.0, pk)
+    assert repo.get_all({'category': 1}) == []
+    assert repo.get_all({'category': 2}) == [Item(2, 2.0, pk)]
+    repo.pool.close()
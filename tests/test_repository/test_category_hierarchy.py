@@ -0,0 +1,121 @@
+import random
+
+import pytest
+
+from bookkeeper.models.category import Category
+from bookkeeper.repository.category_hierarchy import (
+    CategoryHierarchy, CategoryHierarchyRepository
+)
+from bookkeeper.repository.memory_repository import MemoryRepository
+
+
+@pytest.fixture
+def repo():
+    repo = CategoryHierarchyRepository(MemoryRepository())
+    tree = [('food', None), ('meat', 'food'), ('raw', 'meat'), ('sausage', 'meat'),
+            ('sweets', 'food'), ('books', None)]
+    Category.create_from_tree(tree, repo)
+    return repo
+
+
+def by_name(repo, name):
+    return repo.get_all({'name': name})[0]
+
+
+def names(cats):
+    return [c.name for c in cats]
+
+
+def test_build_from_unsorted_list():
+    cats = [Category('c', 2, pk=3), Category('a', None, pk=1), Category('b', 1, pk=2)]
+    hierarchy = CategoryHierarchy(cats)
+    assert hierarchy.path(3) == (1, 2, 3)
+    assert hierarchy.ancestors(3) == [2, 1]
+    assert hierarchy.descendants(1) == [2, 3]
+    assert hierarchy.depth(1) == 0
+    assert len(hierarchy) == 3
+
+
+def test_build_with_cycle():
+    with pytest.raises(ValueError):
+        CategoryHierarchy([Category('a', 2, pk=1), Category('b', 1, pk=2)])
+
+
+def test_ancestors_descendants_depth(repo):
+    raw = by_name(repo, 'raw')
+    assert names(raw.get_ancestors(repo)) == ['meat', 'food']
+    assert raw.get_depth(repo) == 2
+    assert raw.get_descendants(repo) == []
+    food = by_name(repo, 'food')
+    assert set(names(food.get_descendants(repo))) == {'meat', 'raw', 'sausage', 'sweets'}
+    assert food.get_ancestors(repo) == []
+
+
+def test_add_keeps_index(repo):
+    sweets = by_name(repo, 'sweets')
+    cake = Category('cake', sweets.pk)
+    repo.add(cake)
+    assert names(cake.get_ancestors(repo)) == ['sweets', 'food']
+    assert 'cake' in names(by_name(repo, 'food').get_descendants(repo))
+
+
+def test_move_subtree(repo):
+    meat = by_name(repo, 'meat')
+    books = by_name(repo, 'books')
+    meat.parent = books.pk
+    repo.update(meat)
+    assert names(by_name(repo, 'raw').get_ancestors(repo)) == ['meat', 'books']
+    assert set(names(books.get_descendants(repo))) == {'meat', 'raw', 'sausage'}
+    assert names(by_name(repo, 'food').get_descendants(repo)) == ['sweets']
+
+
+def test_cannot_move_under_descendant(repo):
+    food = by_name(repo, 'food')
+    food.parent = by_name(repo, 'raw').pk
+    with pytest.raises(ValueError):
+        repo.update(food)
+    assert repo.hierarchy.depth(food.pk) == 0
+
+
+def test_delete(repo):
+    meat = by_name(repo, 'meat')
+    repo.delete(meat.pk)
+    assert meat.pk not in repo.hierarchy
+    raw = by_name(repo, 'raw')
+    assert raw.get_depth(repo) == 0
+    assert names(by_name(repo, 'food').get_descendants(repo)) == ['sweets']
+
+
+def test_parent_and_move_after_delete():
+    hierarchy = CategoryHierarchy([Category('a', None, pk=1), Category('b', 1, pk=2),
+                                   Category('c', 2, pk=3), Category('d', None, pk=4)])
+    hierarchy.remove(1)
+    assert hierarchy.parent(2) is None
+    assert hierarchy.parent(3) == 2
+    hierarchy.move(3, 4)
+    hierarchy.move(2, 3)
+    assert hierarchy.path(2) == (4, 3, 2)
+    assert hierarchy.parent(2) == 3
+    hierarchy.build([Category(str(pk), hierarchy.parent(pk), pk=pk) for pk in (2, 3, 4)])
+    assert hierarchy.path(2) == (4, 3, 2)
+
+
+def test_random_tree_matches_naive():
+    rnd = random.Random(1)
+    mem = MemoryRepository()
+    for i in range(300):
+        parent = rnd.choice([None] + [c.pk for c in mem.get_all()])
+        mem.add(Category(str(i), parent))
+    repo = CategoryHierarchyRepository(mem)
+    for _ in range(50):
+        cat = rnd.choice(repo.get_all())
+        target = rnd.choice([None] + [c.pk for c in repo.get_all()])
+        cat.parent = target
+        try:
+            repo.update(cat)
+        except ValueError:
+            cat.parent = repo.hierarchy.parent(cat.pk)
+    for cat in repo.get_all():
+        assert [c.pk for c in cat.get_all_parents(repo)] == repo.hierarchy.ancestors(cat.pk)
+        assert {c.pk for c in cat.get_subcategories(repo)} == \
+            set(repo.hierarchy.descendants(cat.pk))
@@ -0,0 +1,135 @@
+import threading
+from dataclasses import dataclass
+
+import pytest
+
+from bookkeeper.repository.connection_pool import ConnectionPool
+from bookkeeper.repository.sqlite_repository import SQLiteRepository
+
+
+@pytest.fixture
+def db_file(tmp_path):
+    return str(tmp_path / 'pool.sqlite.db')
+
+
+@pytest.fixture
+def pool(db_file):
+    pool = ConnectionPool(db_file, pool_size=2)
+    yield pool
+    pool.close()
+
+
+def test_pragmas_applied_once(db_file):
+    pool = ConnectionPool(db_file, pragmas={'foreign_keys': 'ON', 'cache_size': '-512'})
+    with pool.connection() as con:
+        assert con.execute('PRAGMA foreign_keys').fetchone()[0] == 1
+        assert con.execute('PRAGMA cache_size').fetchone()[0] == -512
+    pool.close()
+
+
+def test_connection_reused(pool):
+    with pool.connection() as con1:
+        pass
+    with pool.connection() as con2:
+        pass
+    assert con1 is con2
+    assert pool.size == 1
+
+
+def test_nested_connection_in_same_thread(pool):
+    with pool.connection() as outer:
+        with pool.connection() as inner:
+            assert inner is outer
+    assert pool.size == 1
+
+
+def test_threads_get_different_connections(pool):
+    seen = []
+    barrier = threading.Barrier(2)
+
+    def worker():
+        with pool.connection() as con:
+            seen.append(con)
+            barrier.wait()
+
+    threads = [threading.Thread(target=worker) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert seen[0] is not seen[1]
+    assert pool.size == 2
+
+
+def test_pool_exhausted(db_file):
+    pool = ConnectionPool(db_file, pool_size=1, timeout=0.01)
+    errors = []
+    with pool.connection():
+        def worker():
+            try:
+                with pool.connection():
+                    pass
+            except TimeoutError as e:
+                errors.append(e)
+        t = threading.Thread(target=worker)
+        t.start()
+        t.join()
+    assert len(errors) == 1
+    pool.close()
+
+
+def test_rollback_on_error(pool):
+    with pool.connection() as con:
+        con.execute('CREATE TABLE t (x)')
+    with pytest.raises(RuntimeError):
+        with pool.connection() as con:
+            con.execute('INSERT INTO t VALUES (1)')
+            raise RuntimeError
+    with pool.connection() as con:
+        assert con.execute('SELECT COUNT(*) FROM t').fetchone()[0] == 0
+
+
+def test_transaction_inside_connection_commits_once(pool):
+    with pool.connection() as con:
+        con.execute('CREATE TABLE t (x)')
+    with pytest.raises(RuntimeError):
+        with pool.connection():
+            with pool.transaction() as con:
+                con.execute('INSERT INTO t VALUES (1)')
+            with pool.transaction() as con:
+                con.execute('INSERT INTO t VALUES (2)')
+            raise RuntimeError
+    with pool.connection() as con:
+        assert con.execute('SELECT COUNT(*) FROM t').fetchone()[0] == 0
+    with pool.connection():
+        with pool.transaction() as con:
+            con.execute('INSERT INTO t VALUES (1)')
+        with pytest.raises(RuntimeError):
+            with pool.transaction() as con:
+                con.execute('INSERT INTO t VALUES (2)')
+                raise RuntimeError
+    with pool.connection() as con:
+        assert con.execute('SELECT x FROM t').fetchall() == [(1,)]
+
+
+def test_wrong_pool_size(db_file):
+    with pytest.raises(ValueError):
+        ConnectionPool(db_file, pool_size=0)
+
+
+def test_factory_shares_pool(db_file):
+    @dataclass
+    class A:
+        x: int = 0
+        pk: int = 0
+
+    @dataclass
+    class B:
+        y: int = 0
+        pk: int = 0
+
+    repos = SQLiteRepository.repository_factory(models=[A, B], db_file=db_file)
+    assert repos[A].pool is repos[B].pool
+    repos[A].add(A())
+    repos[B].add(B())
+    assert repos[A].pool.size == 1
@@ -0,0 +1,62 @@
+from dataclasses import dataclass
+
+from bookkeeper.instrumentation import Instrumentation
+from bookkeeper.repository.instrumented_repository import InstrumentedRepository
+from bookkeeper.repository.memory_repository import MemoryRepository
+from bookkeeper.repository.sqlite_repository import SQLiteRepository
+
+
+@dataclass
+class Item:
+    pk: int = 0
+    amount: int = 0
+
+
+def test_repository_methods_recorded():
+    instrumentation = Instrumentation()
+    repo = InstrumentedRepository(MemoryRepository(), instrumentation, 'item')
+    pk = repo.add(Item(amount=1))
+    repo.add_many([Item(amount=i) for i in range(5)])
+    repo.get(pk)
+    repo.get(100)
+    assert len(repo.get_all({'amount': 1})) == 2
+    assert len(list(repo.iter_all(batch_size=2))) == 6
+    assert repo.aggregate('sum', 'amount') == 11
+    repo.update(Item(pk, 2))
+    repo.delete(pk)
+    metrics = instrumentation.metrics()
+    assert metrics['item.add']['count'] == 1
+    assert metrics['item.add_many']['rows'] == 5
+    assert metrics['item.get']['count'] == 2 and metrics['item.get']['rows'] == 1
+    assert metrics['item.get_all']['rows'] == 2
+    assert metrics['item.iter_all']['rows'] == 6
+    assert {'item.aggregate', 'item.update', 'item.delete'} <= set(metrics)
+
+
+def test_disabled_repository():
+    instrumentation = Instrumentation(enabled=False)
+    repo = InstrumentedRepository(MemoryRepository(), instrumentation, 'item')
+    repo.add(Item())
+    assert list(repo.iter_all()) == [Item(1)]
+    assert instrumentation.metrics() == {}
+
+
+def test_sqlite_sql_and_parse_time(tmp_path):
+    instrumentation = Instrumentation()
+    repo = SQLiteRepository.repository_factory(
+        [Item], str(tmp_path / 'metrics.sqlite.db'), cache_size=10,
+        instrumentation=instrumentation)[Item]
+    repo.add_many([Item(amount=i) for i in range(10)])
+    assert repo.get(1) == Item(1, 0)
+    assert len(repo.get_all({'amount': 3})) == 1
+    assert len(list(repo.iter_all(batch_size=4))) == 10
+    metrics = instrumentation.metrics()
+    assert metrics['item.parse_rows']['rows'] == 1 + 1 + 10
+    assert metrics['item.get_all']['count'] == 1
+    sql = instrumentation.sql()
+    insert = repo.query.insert
+    select = repo.query.select({'amount': 3})[0]
+    assert sql[insert]['count'] == 1
+    assert sql[select]['rows'] == 1
+    assert sql[repo.query.get]['rows'] == 1
+    repo.pool.close()
@@ -0,0 +1,47 @@
+from bookkeeper.repository.memory_index import HashIndex, SortedIndex
+from bookkeeper.repository.query import Range
+
+
+def test_hash_index():
+    index = HashIndex()
+    for pk, value in enumerate(['a', 'b', 'a', None], start=1):
+        index.add(value, pk)
+    assert index.lookup('a') == {1, 3}
+    assert index.lookup(['a', 'b', 'c']) == {1, 2, 3}
+    assert index.lookup(None) == {4}
+    assert index.lookup(Range('a', 'b')) is None
+    index.remove('a', 1)
+    assert index.lookup('a') == {3}
+    index.remove('b', 2)
+    assert index.lookup('b') == set()
+
+
+def test_sorted_index():
+    index = SortedIndex()
+    for pk, value in enumerate([5, 1, 3, 3, None, 10], start=1):
+        index.add(value, pk)
+    assert index.lookup(Range(3, 10)) == {1, 3, 4}
+    assert index.lookup(Range(3, 10, include_start=False, include_end=True)) == {1, 6}
+    assert index.lookup(Range(end=3)) == {2}
+    assert index.lookup(Range(start=5)) == {1, 6}
+    assert index.lookup(3) == {3, 4}
+    assert index.lookup([1, 10]) == {2, 6}
+    assert index.lookup(None) == {5}
+    index.remove(3, 3)
+    index.remove(None, 5)
+    index.add(0, 7)
+    assert index.lookup(Range(end=4)) == {2, 4, 7}
+    assert index.lookup(None) == set()
+
+
+def test_sorted_index_bulk_and_single_adds():
+    index = SortedIndex()
+    index.add_many([(5, 1), (None, 2), (1, 3), (3, 4)])
+    assert index.lookup(Range(1, 4)) == {3, 4}
+    # одиночные добавления в середину не откладывают сортировку
+    index.add(2, 5)
+    index.add(0, 6)
+    assert not index._dirty
+    index.remove(5, 1)
+    assert index._entries == [(0, 6), (1, 3), (2, 5), (3, 4)]
+    assert index.lookup(None) == {2}
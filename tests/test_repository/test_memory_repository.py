@@ -1,4 +1,8 @@
+import random
+from dataclasses import dataclass
+
 from bookkeeper.repository.memory_repository import MemoryRepository
+from bookkeeper.repository.query import Range
 
 import pytest
 
@@ -69,3 +73,148 @@ def test_get_all_with_condition(repo, custom_class):
         objects.append(o)
     assert repo.get_all({'name': '0'}) == [objects[0]]
     assert repo.get_all({'test': 'test'}) == objects
+
+
+def test_add_many(repo, custom_class):
+    objects = [custom_class() for i in range(5)]
+    pks = repo.add_many(objects)
+    assert [o.pk for o in objects] == pks
+    assert repo.get_all() == objects
+
+
+def test_cannot_add_many_with_pk(repo, custom_class):
+    objects = [custom_class() for i in range(3)]
+    objects[2].pk = 10
+    with pytest.raises(ValueError):
+        repo.add_many(objects)
+    assert repo.get_all() == []
+
+
+def test_update_many(repo, custom_class):
+    objects = [custom_class() for i in range(3)]
+    repo.add_many(objects)
+    new_objects = [custom_class() for i in range(3)]
+    for old, new in zip(objects, new_objects):
+        new.pk = old.pk
+    repo.update_many(new_objects)
+    assert repo.get_all() == new_objects
+    with pytest.raises(ValueError):
+        repo.update_many([custom_class()])
+
+
+def test_delete_many(repo, custom_class):
+    objects = [custom_class() for i in range(5)]
+    repo.add_many(objects)
+    repo.delete_many([objects[0].pk, objects[3].pk])
+    assert repo.get_all() == [objects[1], objects[2], objects[4]]
+    with pytest.raises(KeyError):
+        repo.delete_many([objects[1].pk, 100])
+    assert repo.get(objects[1].pk) is objects[1]
+
+
+def test_get_all_with_order_and_limit(repo, custom_class):
+    objects = []
+    for i in [3, 1, 2]:
+        o = custom_class()
+        o.value = i
+        repo.add(o)
+        objects.append(o)
+    assert repo.get_all(order_by='value') == [objects[1], objects[2], objects[0]]
+    assert repo.get_all(where={'value': Range(start=2)}, order_by='-value', limit=1) \
+        == [objects[0]]
+    assert repo.get_all(where={'value': [1, 3]}) == [objects[0], objects[1]]
+
+
+@dataclass
+class Item:
+    category: int
+    amount: float
+    pk: int = 0
+
+
+def test_wrong_index_kind():
+    with pytest.raises(ValueError):
+        MemoryRepository(indexes={'category': 'btree'})
+
+
+def test_get_all_uses_index():
+    repo = MemoryRepository(indexes={'category': 'hash'})
+    items = [Item(i % 3, i) for i in range(9)]
+    repo.add_many(items)
+    repo._container[items[1].pk] = None  # не должен просматриваться
+    assert repo.get_all({'category': 0}) == [items[0], items[3], items[6]]
+    assert repo.get_all({'pk': [items[2].pk, items[5].pk, 100]}) == [items[2], items[5]]
+
+
+def test_indexes_follow_mutations():
+    rnd = random.Random(0)
+    indexed = MemoryRepository(indexes={'category': 'hash', 'amount': 'sorted'})
+    plain = MemoryRepository()
+    for step in range(2000):
+        action = rnd.random()
+        if action < 0.5 or not plain.get_all():
+            values = (rnd.randint(0, 5), rnd.randint(0, 100))
+            indexed.add(Item(*values))
+            plain.add(Item(*values))
+        elif action < 0.8:
+            pk = rnd.choice(plain.get_all()).pk
+            values = (rnd.randint(0, 5), rnd.randint(0, 100))
+            # объект меняется на месте, без замены на новый
+            for repo in (indexed, plain):
+                obj = repo.get(pk)
+                obj.category, obj.amount = values
+                repo.update(obj)
+        else:
+            pk = rnd.choice(plain.get_all()).pk
+            indexed.delete(pk)
+            plain.delete(pk)
+        if step % 100 == 0:
+            for where in ({'category': 3}, {'amount': Range(20, 50)},
+                          {'category': [1, 2], 'amount': Range(start=70)}):
+                assert indexed.get_all(where) == plain.get_all(where)
+
+
+def test_create_index_on_filled_repo():
+    repo = MemoryRepository()
+    items = [Item(i % 2, i) for i in range(6)]
+    repo.add_many(items)
+    repo.create_index('amount', 'sorted')
+    assert repo.get_all({'amount': Range(2, 4)}) == items[2:4]
+    repo.delete_many([items[2].pk])
+    assert repo.get_all({'amount': Range(2, 4)}) == items[3:4]
+
+
+def test_iter_all_and_page():
+    repo = MemoryRepository(indexes={'category': 'hash'})
+    items = [Item(category=i % 3, amount=i) for i in range(10)]
+    repo.add_many(items)
+    it = repo.iter_all()
+    assert next(it) is items[0]
+    assert list(it) == items[1:]
+    assert list(repo.iter_all(where={'category': 1})) == items[1::3]
+    assert list(repo.iter_all(where={'amount': Range(end=3)}, order_by='-amount')) \
+        == [items[2], items[1], items[0]]
+    assert repo.page(after_pk=items[3].pk, limit=2) == items[4:6]
+    assert repo.page(after_pk=0, limit=2, where={'category': 2}) == [items[2], items[5]]
+
+
+@pytest.mark.parametrize('indexes', [None, {'category': 'hash'}])
+def test_page_with_pk_condition(indexes):
+    repo = MemoryRepository(indexes=indexes)
+    items = [Item(category=i % 3, amount=i) for i in range(10)]
+    repo.add_many(items)
+    pks = [item.pk for item in items]
+    assert repo.page(pks[2], 10, {'pk': Range(end=pks[6])}) == items[3:6]
+    assert repo.page(pks[2], 10, {'pk': Range(pks[5], pks[7], include_end=True)}) \
+        == items[5:8]
+    assert repo.page(pks[2], 10, {'pk': [pks[1], pks[4], pks[8]]}) == [items[4], items[8]]
+    assert repo.page(pks[2], 10, {'pk': pks[1]}) == []
+    assert repo.page(pks[2], 2, {'category': 1, 'pk': Range(end=pks[9])}) \
+        == [items[4], items[7]]
+    repo.delete(pks[4])
+    assert repo.page(pks[2], 2) == [items[3], items[5]]
+    with pytest.raises(ZeroDivisionError), repo.transaction():
+        repo.delete(pks[5])
+        1 / 0
+    assert repo.page(pks[3], 1) == [items[5]]
+    assert repo.page(pks[2], 0) == []
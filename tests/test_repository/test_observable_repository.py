@@ -0,0 +1,94 @@
+from dataclasses import dataclass
+
+import pytest
+
+from bookkeeper.events import ADDED, ADDED_MANY, DELETED, UPDATED, EventBus
+from bookkeeper.repository.memory_repository import MemoryRepository
+from bookkeeper.repository.observable_repository import ObservableRepository
+
+
+@dataclass
+class Item:
+    name: str = ''
+    pk: int = 0
+
+
+class CountingRepository(MemoryRepository):
+    def __init__(self):
+        super().__init__()
+        self.reads = 0
+
+    def get(self, pk):
+        self.reads += 1
+        return super().get(pk)
+
+
+@pytest.fixture
+def bus():
+    return EventBus()
+
+
+@pytest.fixture
+def inner():
+    return CountingRepository()
+
+
+@pytest.fixture
+def repo(inner, bus):
+    return ObservableRepository(inner, bus, Item)
+
+
+@pytest.fixture
+def events(bus):
+    events = []
+    bus.subscribe(Item, ADDED, lambda obj: events.append((ADDED, obj.pk)))
+    bus.subscribe(Item, UPDATED,
+                  lambda old, new: events.append((UPDATED, old.name, new.name)))
+    bus.subscribe(Item, DELETED, lambda pk: events.append((DELETED, pk)))
+    return events
+
+
+def test_events(repo, events):
+    pk = repo.add(Item('a'))
+    repo.update(Item('b', pk))
+    repo.delete(pk)
+    assert events == [(ADDED, pk), (UPDATED, 'a', 'b'), (DELETED, pk)]
+
+
+def test_batch_events(repo, events):
+    pks = repo.add_many([Item('a'), Item('b')])
+    repo.update_many([Item('c', pks[0]), Item('d', pks[1])])
+    repo.delete_many(pks)
+    assert events == [(ADDED, pks[0]), (ADDED, pks[1]),
+                      (UPDATED, 'a', 'c'), (UPDATED, 'b', 'd'),
+                      (DELETED, pks[0]), (DELETED, pks[1])]
+
+
+def test_added_many_published_once(repo, events, bus):
+    batches = []
+    bus.subscribe(Item, ADDED_MANY, lambda objs: batches.append([obj.pk for obj in objs]))
+    pks = repo.add_many([Item('a'), Item('b')])
+    with repo.transaction():
+        pks += repo.add_many([Item('c')])
+    repo.add(Item('d'))
+    assert batches == [pks[:2], pks[2:]]
+    assert events == [(ADDED, pks[-1] + 1)]
+
+
+def test_failed_write_publishes_nothing(repo, events):
+    with pytest.raises(ValueError):
+        repo.add(Item('a', pk=5))
+    with pytest.raises(KeyError):
+        repo.delete(5)
+    assert events == []
+
+
+def test_old_object_read_only_for_subscribers(repo, inner, bus):
+    pk = repo.add(Item('a'))
+    repo.update(Item('b', pk))
+    assert inner.reads == 0
+    updates = []
+    bus.subscribe(Item, UPDATED, lambda old, new: updates.append((old, new)))
+    repo.update(Item('c', pk))
+    assert inner.reads == 1
+    assert updates == [(Item('b', pk), Item('c', pk))]
@@ -0,0 +1,108 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from bookkeeper.repository.query import (
+    Range, aggregate_objects, condition_shape, group_key, keyset_where, matches,
+    parse_group_by, parse_order_by, sort_objects
+)
+
+
+def test_range_contains():
+    assert 1 in Range(1, 3)
+    assert 3 not in Range(1, 3)
+    assert 1 not in Range(1, 3, include_start=False)
+    assert 3 in Range(1, 3, include_end=True)
+    assert 100 in Range(start=1)
+    assert -100 in Range(end=1)
+    assert None not in Range()
+
+
+def test_condition_shape():
+    assert condition_shape(1) == condition_shape('a')
+    assert condition_shape([1, 2]) == condition_shape((3, 4))
+    assert condition_shape([1, 2]) != condition_shape([1, 2, 3])
+    assert condition_shape(Range(1, 2)) == condition_shape(Range(5, 6))
+    assert condition_shape(Range(1)) != condition_shape(Range(1, 2))
+    assert condition_shape(None) != condition_shape(1)
+
+
+def test_keyset_where():
+    assert keyset_where(None, 3) == {'pk': Range(3, include_start=False)}
+    assert keyset_where({'f': 1, 'pk': Range(end=9)}, 3) \
+        == {'f': 1, 'pk': Range(3, 9, include_start=False)}
+    assert keyset_where({'pk': Range(5, 9)}, 3) == {'pk': Range(5, 9)}
+    assert keyset_where({'pk': Range(3, 9)}, 3) \
+        == {'pk': Range(3, 9, include_start=False)}
+    assert keyset_where({'pk': [7, 1, 4, 3]}, 3) == {'pk': (4, 7)}
+    assert keyset_where({'pk': [1, 2]}, 3) is None
+    assert keyset_where({'pk': 5}, 3) == {'pk': 5}
+    assert keyset_where({'pk': 3}, 3) is None
+    assert keyset_where({'pk': None}, 0) is None
+
+
+def test_parse_order_by():
+    assert parse_order_by(None) == []
+    assert parse_order_by('a') == [('a', False)]
+    assert parse_order_by(['-a', 'b']) == [('a', True), ('b', False)]
+
+
+def test_matches():
+    obj = SimpleNamespace(a=1, b='x', c=None)
+    assert matches(obj, None)
+    assert matches(obj, {'a': 1, 'b': 'x'})
+    assert not matches(obj, {'a': 2})
+    assert matches(obj, {'c': None})
+    assert not matches(obj, {'a': None})
+    assert matches(obj, {'a': [1, 2], 'b': {'x'}})
+    assert not matches(obj, {'a': (2, 3)})
+    assert matches(obj, {'a': Range(0, 2)})
+    assert not matches(obj, {'a': Range(2)})
+
+
+def test_sort_objects():
+    objs = [SimpleNamespace(a=a, b=b) for a, b in [(2, 1), (1, 2), (None, 3), (2, 0)]]
+    assert [o.b for o in sort_objects(objs, 'a')] == [3, 2, 1, 0]
+    assert [o.b for o in sort_objects(objs, ['-a', 'b'])] == [0, 1, 2, 3]
+
+
+def test_unknown_attribute():
+    with pytest.raises(AttributeError):
+        matches(SimpleNamespace(a=1), {'b': 1})
+
+
+def test_group_key():
+    moment = datetime(2023, 3, 15, 12, 30)
+    assert group_key(moment, 'day') == '2023-03-15'
+    assert group_key('2023-03-15 12:30:00', 'week') == '2023-03-13'
+    assert group_key(moment, 'month') == '2023-03'
+    assert group_key(None, 'day') is None
+    assert group_key('x', None) == 'x'
+    assert parse_group_by(['category', 'day__week']) == \
+        [('category', None), ('day', 'week')]
+    with pytest.raises(ValueError):
+        parse_group_by('day__year')
+
+
+def test_aggregate_objects():
+    objs = [SimpleNamespace(category='a', amount=1, day=datetime(2023, 3, 12)),
+            SimpleNamespace(category='b', amount=2, day=datetime(2023, 3, 13)),
+            SimpleNamespace(category='a', amount=None, day=datetime(2023, 3, 14)),
+            SimpleNamespace(category=None, amount=4, day=datetime(2023, 4, 1))]
+    assert aggregate_objects(objs, 'sum', 'amount') == 7
+    assert aggregate_objects(objs, 'count') == 4
+    assert aggregate_objects(objs, 'count', 'amount') == 3
+    assert aggregate_objects([], 'sum', 'amount') == 0
+    assert aggregate_objects([], 'max', 'amount') is None
+    assert aggregate_objects(objs, 'sum', 'amount', group_by='category') == \
+        {None: 4, 'a': 1, 'b': 2}
+    assert aggregate_objects(objs, 'avg', 'amount', group_by='day__week') == \
+        {'2023-03-06': 1, '2023-03-13': 2, '2023-03-27': 4}
+    assert aggregate_objects(objs, 'max', 'amount',
+                             group_by=['category', 'day__month']) == \
+        {(None, '2023-04'): 4, ('a', '2023-03'): 1, ('b', '2023-03'): 2}
+    with pytest.raises(ValueError):
+        aggregate_objects(objs, 'median', 'amount')
+    with pytest.raises(ValueError):
+        aggregate_objects(objs, 'sum')
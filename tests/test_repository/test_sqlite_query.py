@@ -0,0 +1,96 @@
+from datetime import datetime
+
+import pytest
+
+from bookkeeper.repository.query import Range
+from bookkeeper.repository.sqlite_query import QueryBuilder, column_type
+
+
+@pytest.fixture
+def builder():
+    return QueryBuilder('expense', ['amount', 'category', 'end'])
+
+
+def test_statements(builder):
+    assert builder.insert == \
+        'INSERT INTO "expense" ("amount", "category", "end") VALUES (?, ?, ?)'
+    assert builder.update == \
+        'UPDATE "expense" SET "amount" = ?, "category" = ?, "end" = ? WHERE pk = ?'
+    assert builder.delete == 'DELETE FROM "expense" WHERE pk = ?'
+
+
+def test_select_parameters(builder):
+    query, params = builder.select(
+        where={'amount': Range(1, 5, include_end=True), 'category': [1, 2],
+               'end': None},
+        order_by='-amount', limit=10)
+    assert query == ('SELECT * FROM "expense" WHERE "amount" >= ? AND "amount" <= ?'
+                     ' AND "category" IN (?, ?) AND "end" IS NULL'
+                     ' ORDER BY "amount" DESC LIMIT ?')
+    assert params == [1, 5, 1, 2, 10]
+
+
+def test_select_cached_by_shape(builder):
+    query1, params1 = builder.select(where={'category': "it's"})
+    query2, params2 = builder.select(where={'category': 'other'})
+    assert query1 is query2
+    assert params1 == ["it's"] and params2 == ['other']
+    query3, _ = builder.select(where={'category': ['a', 'b']})
+    assert query3 is not query1
+
+
+def test_select_without_conditions(builder):
+    assert builder.select() == ('SELECT * FROM "expense"', [])
+    assert builder.select(where={'amount': Range()}) == ('SELECT * FROM "expense"', [])
+
+
+def test_explicit_row_columns():
+    builder = QueryBuilder('expense', ['amount', 'category'],
+                           row_columns=['amount', 'category', 'pk'])
+    assert builder.get == 'SELECT "amount", "category", "pk" FROM "expense" WHERE pk = ?'
+    assert builder.select(where={'amount': 1})[0] == \
+        'SELECT "amount", "category", "pk" FROM "expense" WHERE "amount" = ?'
+
+
+def test_unknown_field(builder):
+    with pytest.raises(ValueError):
+        builder.select(where={'amount; DROP TABLE expense': 1})
+    with pytest.raises(ValueError):
+        builder.select(order_by='nope')
+
+
+def test_aggregate(builder):
+    query, params = builder.aggregate('sum', 'amount', where={'category': 1},
+                                      group_by=['category', 'end__week'])
+    week = """date("end" / 1000000.0, 'unixepoch', 'weekday 0', '-6 days')"""
+    assert query == (f'SELECT "category", {week}, COALESCE(SUM("amount"), 0)'
+                     f' FROM "expense" WHERE "category" = ?'
+                     f' GROUP BY "category", {week} ORDER BY "category", {week}')
+    assert params == [1]
+    assert builder.aggregate('count') == ('SELECT COUNT(*) FROM "expense"', [])
+    assert builder.aggregate('sum', 'amount', where={'category': 2})[0] \
+        is builder.aggregate('sum', 'amount', where={'category': 3})[0]
+    with pytest.raises(ValueError):
+        builder.aggregate('sum', 'amount; --')
+
+
+def test_column_type():
+    assert column_type(int) == 'INTEGER'
+    assert column_type(float) == 'REAL'
+    assert column_type(str) == 'TEXT'
+    assert column_type(datetime) == 'TIMESTAMP'
+    assert column_type(int | None) == 'INTEGER'
+    assert column_type(int | str) == ''
+    assert column_type(list) == ''
+
+
+def test_create_statements():
+    builder = QueryBuilder('budget', {'amount': float, 'end': datetime, 'other': list})
+    assert builder.create_table == ('CREATE TABLE IF NOT EXISTS "budget" '
+                                    '(pk INTEGER PRIMARY KEY, "amount" REAL, '
+                                    '"end" TIMESTAMP, "other")')
+    assert builder.create_index(['amount', 'end']) == (
+        'budget_amount_end_idx',
+        'CREATE INDEX IF NOT EXISTS "budget_amount_end_idx" ON "budget" ("amount", "end")')
+    with pytest.raises(ValueError):
+        builder.create_index(['missing'])
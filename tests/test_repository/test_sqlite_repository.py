@@ -1,10 +1,19 @@
+import random
+import sqlite3
+from copy import deepcopy
 from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import ClassVar
+from bookkeeper.repository.memory_repository import MemoryRepository
+from bookkeeper.repository.query import Range
 from bookkeeper.repository.sqlite_repository import SQLiteRepository
 
 import pytest
 
 
-TEST_DB = 'bookkeeper/databases/test.sqlite.db'
+@pytest.fixture
+def db_file(tmp_path):
+    return str(tmp_path / 'test.sqlite.db')
 
 
 @pytest.fixture
@@ -17,8 +26,8 @@ def test_class():
 
 
 @pytest.fixture
-def repos(test_class):
-    repos = SQLiteRepository.repository_factory(models=[test_class], db_file=TEST_DB)
+def repos(test_class, db_file):
+    repos = SQLiteRepository.repository_factory(models=[test_class], db_file=db_file)
     return repos
 
 
@@ -28,8 +37,8 @@ def repo(repos, test_class):
     return repo
 
 
-def test_repo_factory(repos, test_class):
-    assert repos[test_class].db_file == TEST_DB \
+def test_repo_factory(repos, test_class, db_file):
+    assert repos[test_class].db_file == db_file \
            and repos[test_class].table_name == test_class.__name__.lower()
 
 
@@ -86,6 +95,281 @@ def test_get_all_with_condition(repo, test_class):
     assert repo.get_all(where={"f": 10}) == objects_2
 
 
+def test_add_many(repo, test_class):
+    objects = [test_class(f=i + 100) for i in range(5)]
+    pks = repo.add_many(objects)
+    assert [o.pk for o in objects] == pks
+    assert repo.get_all(where={"f": 102}) == [objects[2]]
+    assert repo.add_many([]) == []
+
+
+def test_add_many_with_random_rowids(repo, test_class, db_file):
+    # после строки с наибольшим возможным id sqlite выбирает rowid случайно
+    with sqlite3.connect(db_file) as con:
+        con.execute(f'INSERT INTO {repo.table_name} (pk, f) VALUES (?, 0)',
+                    (2 ** 63 - 1,))
+    con.close()
+    objects = [test_class(f=i + 1) for i in range(5)]
+    pks = repo.add_many(objects)
+    assert [o.pk for o in objects] == pks
+    assert [repo.get(pk) for pk in pks] == objects
+
+
+def test_failed_add_many_keeps_objects_new(repo, test_class):
+    objects = [test_class(f=1), test_class(f=2), test_class(f=object())]
+    with pytest.raises(sqlite3.Error):
+        repo.add_many(objects)
+    assert [o.pk for o in objects] == [0, 0, 0]
+    assert repo.get_all() == []
+    with repo.transaction():
+        pk = repo.add(test_class(f=0))
+        with pytest.raises(sqlite3.Error):
+            repo.add_many(objects)
+    assert repo.get_all() == [test_class(f=0, pk=pk)]
+    assert repo.add_many(objects[:2]) == [o.pk for o in objects[:2]]
+    assert repo.get_all(where={'f': [1, 2]}) == objects[:2]
+
+
+def test_cannot_add_many_with_pk(repo, test_class):
+    objects = [test_class(f=200), test_class(f=200, pk=1)]
+    with pytest.raises(ValueError):
+        repo.add_many(objects)
+    assert repo.get_all(where={"f": 200}) == []
+
+
+def test_update_many(repo, test_class):
+    objects = [test_class(f=300) for i in range(3)]
+    repo.add_many(objects)
+    for o in objects:
+        o.f = 301
+    repo.update_many(objects)
+    assert repo.get_all(where={"f": 301}) == objects
+    with pytest.raises(ValueError):
+        repo.update_many([test_class(f=302)])
+
+
+def test_delete_many(repo, test_class):
+    objects = [test_class(f=400) for i in range(3)]
+    repo.add_many(objects)
+    repo.delete_many([objects[0].pk, objects[2].pk])
+    assert repo.get_all(where={"f": 400}) == [objects[1]]
+
+
+def test_get_all_with_range_in_and_order(repo, test_class):
+    objects = [test_class(f=i) for i in range(500, 510)]
+    repo.add_many(objects)
+    assert repo.get_all(where={"f": Range(502, 505)}) == objects[2:5]
+    assert repo.get_all(where={"f": [501, 509, 1000]}) == [objects[1], objects[9]]
+    assert repo.get_all(where={"f": Range(start=500)}, order_by="-f", limit=2) == \
+        [objects[9], objects[8]]
+
+
+def test_quotes_in_values(tmp_path):
+    @dataclass
+    class Note:
+        comment: str = ''
+        pk: int = 0
+
+    repo = SQLiteRepository(Note, str(tmp_path / 'notes.sqlite.db'))
+    note = Note(comment="it's -- fine")
+    repo.add(note)
+    note.comment = "'; DROP TABLE note; --"
+    repo.update(note)
+    assert repo.get_all(where={"comment": "'; DROP TABLE note; --"}) == [note]
+
+
+@dataclass
+class Indexed:
+    amount: float
+    name: str
+    day: datetime
+    parent: int | None = None
+    pk: int = 0
+
+    indexes: ClassVar[tuple[tuple[str, ...], ...]] = (('day',), ('name', 'parent'))
+
+
+def test_typed_schema_with_indexes(tmp_path):
+    db_file = str(tmp_path / 'typed.sqlite.db')
+    repo = SQLiteRepository(Indexed, db_file)
+    assert 'indexes' not in repo.fields
+    with sqlite3.connect(db_file) as con:
+        columns = {row[1]: row[2] for row in con.execute('PRAGMA table_info(indexed)')}
+        indexes = {row[1] for row in con.execute('PRAGMA index_list(indexed)')}
+    assert columns == {'pk': 'INTEGER', 'amount': 'REAL', 'name': 'TEXT',
+                       'day': 'TIMESTAMP', 'parent': 'INTEGER'}
+    assert indexes == {'indexed_day_idx', 'indexed_name_parent_idx'}
+    assert repo.migrate() == []
+
+
+def test_migrate_adds_missing_indexes(tmp_path):
+    db_file = str(tmp_path / 'legacy.sqlite.db')
+    with sqlite3.connect(db_file) as con:
+        con.execute('CREATE TABLE indexed (pk INTEGER PRIMARY KEY, '
+                    'amount, name, day, parent)')
+        con.execute('CREATE INDEX indexed_day_idx ON indexed (day)')
+    con.close()
+    repo = SQLiteRepository(Indexed, db_file)
+    with sqlite3.connect(db_file) as con:
+        indexes = {row[1] for row in con.execute('PRAGMA index_list(indexed)')}
+    assert indexes == {'indexed_day_idx', 'indexed_name_parent_idx'}
+    assert repo.migrate() == []
+
+
+def test_iter_all_and_page(tmp_path):
+    @dataclass
+    class Row:
+        f: int = 0
+        pk: int = 0
+
+    repo = SQLiteRepository(Row, str(tmp_path / 'rows.sqlite.db'))
+    rows = [Row(f=i % 4) for i in range(25)]
+    repo.add_many(rows)
+    it = repo.iter_all(batch_size=4)
+    assert next(it) == rows[0]
+    assert list(it) == rows[1:]
+    assert list(repo.iter_all(where={'f': 3}, order_by='-pk', batch_size=2)) \
+        == rows[3::4][::-1]
+    assert repo.page(after_pk=rows[9].pk, limit=3) == rows[10:13]
+    assert repo.page(after_pk=rows[9].pk, limit=3, where={'f': 0}) \
+        == [rows[12], rows[16], rows[20]]
+    assert repo.page(after_pk=rows[-1].pk) == []
+
+
+def test_iter_all_releases_connection(tmp_path):
+    @dataclass
+    class Row:
+        f: int = 0
+        pk: int = 0
+
+    db_file = str(tmp_path / 'rows.sqlite.db')
+    repo = SQLiteRepository(Row, db_file)
+    repo.add_many([Row(f=i) for i in range(5)])
+    it = repo.iter_all(batch_size=2)
+    assert next(it).f == 0
+    repo.add(Row(f=5))
+    with sqlite3.connect(db_file) as con:
+        assert con.execute('SELECT count(*) FROM row').fetchone()[0] == 6
+    con.close()
+    assert [row.f for row in it] == [1, 2, 3, 4, 5]
+
+
+@pytest.mark.parametrize('func', ['sum', 'count', 'min', 'max', 'avg'])
+@pytest.mark.parametrize('group_by', [None, 'name', 'day__day', 'day__week',
+                                      'day__month', ['name', 'day__month']])
+def test_aggregate_matches_memory(tmp_path, func, group_by):
+    rnd = random.Random(7)
+    objs = [Indexed(amount=rnd.choice([None, rnd.randint(1, 100)]),
+                    name=rnd.choice(['a', 'b', None]),
+                    day=datetime(2023, 1, 1) + timedelta(hours=rnd.randint(0, 2000)))
+            for _ in range(200)]
+    repo = SQLiteRepository(Indexed, str(tmp_path / 'agg.sqlite.db'))
+    memory = MemoryRepository()
+    repo.add_many(deepcopy(objs))
+    memory.add_many(objs)
+    where = {'day': Range(start=datetime(2023, 1, 20))}
+    expected = memory.aggregate(func, 'amount', where, group_by)
+    actual = repo.aggregate(func, 'amount', where, group_by)
+    assert actual == pytest.approx(expected) if group_by is None else \
+        actual.keys() == expected.keys() and \
+        all(actual[k] == pytest.approx(expected[k]) for k in expected)
+
+
+@dataclass
+class Dated:
+    name: str
+    day: datetime
+    birthday: date | None = None
+    pk: int = 0
+
+    indexes: ClassVar[tuple[tuple[str, ...], ...]] = (('day',),)
+
+
+def test_dates_stored_as_epoch(tmp_path):
+    db_file = str(tmp_path / 'dated.sqlite.db')
+    repo = SQLiteRepository(Dated, db_file)
+    obj = Dated('a', datetime(2023, 3, 15, 12, 30, 1, 123456), date(1969, 12, 31))
+    repo.add(obj)
+    assert repo.get(obj.pk) == obj
+    with sqlite3.connect(db_file) as con:
+        row = con.execute('SELECT typeof(day), day, birthday FROM dated').fetchone()
+    assert row == ('integer', 1678883401123456, -86400 * 10 ** 6)
+    assert repo.get_all(where={'day': Range(datetime(2023, 3, 15),
+                                            datetime(2023, 3, 16))}) == [obj]
+
+
+def test_migrate_text_dates_and_untyped_table(tmp_path):
+    db_file = str(tmp_path / 'legacy_dates.sqlite.db')
+    with sqlite3.connect(db_file) as con:
+        con.execute('CREATE TABLE dated (pk INTEGER PRIMARY KEY, name, day, birthday)')
+        con.executemany('INSERT INTO dated (name, day, birthday) VALUES (?, ?, ?)',
+                        [('iso', '2023-03-15 12:00:00', None),
+                         ('user', '16-03-2023', '2000-01-02'),
+                         ('bad', 'someday', None)])
+    con.close()
+    repo = SQLiteRepository(Dated, db_file)
+    assert [obj.day for obj in repo.get_all(order_by='pk')] == \
+        [datetime(2023, 3, 15, 12), datetime(2023, 3, 16), 'someday']
+    assert repo.get(2).birthday == date(2000, 1, 2)
+    with sqlite3.connect(db_file) as con:
+        assert con.execute('SELECT typeof(day) FROM dated ORDER BY pk').fetchall() == \
+            [('integer',), ('integer',), ('text',)]
+        columns = {row[1]: row[2] for row in con.execute('PRAGMA table_info(dated)')}
+        indexes = {row[1] for row in con.execute('PRAGMA index_list(dated)')}
+    con.close()
+    assert columns == {'pk': 'INTEGER', 'name': 'TEXT', 'day': 'TIMESTAMP',
+                       'birthday': 'DATE'}
+    assert indexes == {'dated_day_idx'}
+    assert repo.migrate() == []
+    assert repo.get_all(where={'day': Range(end=datetime(2023, 3, 16))}) == \
+        [Dated('iso', datetime(2023, 3, 15, 12), pk=1)]
+
+
+def create_legacy_dated(db_file):
+    with sqlite3.connect(db_file) as con:
+        con.execute('CREATE TABLE dated (pk INTEGER PRIMARY KEY, name, day, birthday)')
+        con.executemany('INSERT INTO dated (name, day) VALUES (?, ?)',
+                        [('a', '2023-03-15 12:00:00'), ('b', '2023-03-16')])
+    con.close()
+
+
+def test_failed_migration_keeps_table(tmp_path, monkeypatch):
+    db_file = str(tmp_path / 'legacy_failed.sqlite.db')
+    create_legacy_dated(db_file)
+
+    def fail(self, con):
+        raise RuntimeError
+
+    with monkeypatch.context() as patch:
+        patch.setattr(SQLiteRepository, '_convert_dates', fail)
+        with pytest.raises(RuntimeError):
+            SQLiteRepository(Dated, db_file)
+    with sqlite3.connect(db_file) as con:
+        tables = {row[0] for row in con.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table'")}
+        assert con.execute('SELECT COUNT(*) FROM dated').fetchone()[0] == 2
+    con.close()
+    assert tables == {'dated'}
+    repo = SQLiteRepository(Dated, db_file)
+    assert [obj.day for obj in repo.get_all()] == [datetime(2023, 3, 15, 12),
+                                                   datetime(2023, 3, 16)]
+
+
+def test_keyword_construction_for_plain_classes(tmp_path):
+    class Plain:
+        name: str
+        pk: int
+
+        def __init__(self, *, name, pk=0):
+            self.name = name
+            self.pk = pk
+
+    repo = SQLiteRepository(Plain, str(tmp_path / 'plain.sqlite.db'))
+    repo.add_many([Plain(name='a'), Plain(name='b')])
+    assert [(obj.name, obj.pk) for obj in repo.get_all()] == [('a', 1), ('b', 2)]
+    assert repo.get(2).name == 'b'
+
+
 def test_drop_tables_in_repos(repos):
     for cls, repo in repos.items():
-        repo.drop_table()
\ No newline at end of file
+        repo.drop_table()
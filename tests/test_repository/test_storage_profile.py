@@ -0,0 +1,69 @@
+import sqlite3
+from dataclasses import dataclass
+
+import pytest
+
+from bookkeeper.repository.sqlite_repository import SQLiteRepository
+from bookkeeper.repository.storage_profile import PROFILES, StorageProfile, get_profile
+
+
+@dataclass
+class Item:
+    pk: int = 0
+    amount: int = 0
+
+
+def pragma(repo, name):
+    with repo.pool.connection() as con:
+        return con.execute(f'PRAGMA {name}').fetchone()[0]
+
+
+def test_pragmas_order():
+    pragmas = StorageProfile(query_only=True).pragmas()
+    assert list(pragmas)[0] == 'busy_timeout'
+    assert list(pragmas)[-1] == 'query_only'
+    assert pragmas['foreign_keys'] == 'ON'
+
+
+def test_validation():
+    with pytest.raises(ValueError):
+        StorageProfile(journal_mode='wall')
+    with pytest.raises(ValueError):
+        get_profile('fast')
+    assert get_profile('interactive') is PROFILES['interactive']
+
+
+@pytest.mark.parametrize('name', ['interactive', 'bulk-import'])
+def test_profile_applied(tmp_path, name):
+    repo = SQLiteRepository.repository_factory(
+        [Item], str(tmp_path / 'profile.sqlite.db'), profile=name)[Item]
+    profile = PROFILES[name]
+    assert pragma(repo, 'journal_mode') == 'wal'
+    assert pragma(repo, 'synchronous') == {'OFF': 0, 'NORMAL': 1}[profile.synchronous]
+    assert pragma(repo, 'cache_size') == profile.cache_size
+    assert pragma(repo, 'busy_timeout') == profile.busy_timeout
+    assert pragma(repo, 'temp_store') == 2
+    assert pragma(repo, 'foreign_keys') == 1
+    pk = repo.add(Item(amount=5))
+    assert repo.get(pk) == Item(pk, 5)
+    repo.pool.close()
+
+
+def test_read_only_analytics(tmp_path):
+    db_file = str(tmp_path / 'analytics.sqlite.db')
+    writer = SQLiteRepository.repository_factory([Item], db_file, profile='interactive')
+    writer[Item].add_many([Item(amount=i) for i in range(10)])
+    reader = SQLiteRepository.repository_factory(
+        [Item], db_file, profile='read-only analytics')[Item]
+    assert reader.aggregate('sum', 'amount') == 45
+    with pytest.raises(sqlite3.OperationalError):
+        reader.add(Item(amount=1))
+    reader.pool.close()
+    writer[Item].pool.close()
+
+
+def test_default_profile_unchanged(tmp_path):
+    repo = SQLiteRepository.repository_factory(
+        [Item], str(tmp_path / 'plain.sqlite.db'))[Item]
+    assert pragma(repo, 'journal_mode') == 'delete'
+    repo.pool.close()
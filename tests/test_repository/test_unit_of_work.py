@@ -0,0 +1,148 @@
+import sqlite3
+from dataclasses import dataclass
+
+import pytest
+
+from bookkeeper.events import ADDED, DELETED, EventBus
+from bookkeeper.models.category import Category
+from bookkeeper.repository.caching_repository import CachingRepository
+from bookkeeper.repository.category_hierarchy import CategoryHierarchyRepository
+from bookkeeper.repository.memory_repository import MemoryRepository
+from bookkeeper.repository.observable_repository import ObservableRepository
+from bookkeeper.repository.sqlite_repository import SQLiteRepository
+from bookkeeper.repository.unit_of_work import transaction
+
+
+@dataclass
+class Item:
+    name: str = ''
+    pk: int = 0
+
+
+@dataclass
+class Tag:
+    label: str = ''
+    pk: int = 0
+
+
+@pytest.fixture
+def db_file(tmp_path):
+    return str(tmp_path / 'uow.sqlite.db')
+
+
+@pytest.fixture
+def repos(db_file):
+    repos = SQLiteRepository.repository_factory([Item, Tag], db_file)
+    yield repos
+    repos[Item].pool.close()
+
+
+def count_rows(db_file, table):
+    with sqlite3.connect(db_file) as con:
+        return con.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+
+
+def test_sqlite_commit_once(repos, db_file):
+    with transaction(repos):
+        repos[Item].add(Item('a'))
+        repos[Tag].add(Tag('x'))
+        # другое соединение не видит незафиксированных изменений
+        assert count_rows(db_file, 'item') == 0
+    assert count_rows(db_file, 'item') == 1
+    assert count_rows(db_file, 'tag') == 1
+
+
+def test_sqlite_rollback_spans_repositories(repos, db_file):
+    repos[Item].add(Item('kept'))
+    with pytest.raises(RuntimeError):
+        with transaction(repos):
+            repos[Item].add(Item('a'))
+            repos[Tag].add(Tag('x'))
+            raise RuntimeError
+    assert [item.name for item in repos[Item].get_all()] == ['kept']
+    assert repos[Tag].get_all() == []
+
+
+def test_sqlite_nested_savepoint(repos):
+    with transaction(repos):
+        repos[Item].add(Item('outer'))
+        with pytest.raises(RuntimeError):
+            with repos[Item].transaction():
+                repos[Item].add(Item('inner'))
+                repos[Item].delete(1)
+                raise RuntimeError
+        repos[Tag].add(Tag('x'))
+    assert [item.name for item in repos[Item].get_all()] == ['outer']
+    assert len(repos[Tag].get_all()) == 1
+
+
+def test_memory_rollback():
+    repo = MemoryRepository({'name': 'hash'})
+    first, second = Item('a'), Item('b')
+    repo.add_many([first, second])
+    with pytest.raises(RuntimeError):
+        with repo.transaction():
+            repo.add(Item('c'))
+            repo.update(Item('changed', pk=first.pk))
+            repo.delete(second.pk)
+            raise RuntimeError
+    assert repo.get_all() == [first, second]
+    assert repo.get_all({'name': 'changed'}) == []
+    assert repo.get_all({'name': 'b'}) == [second]
+    assert repo.add(Item('d')) == 4
+
+
+def test_memory_nested_rollback_keeps_outer():
+    repo = MemoryRepository()
+    with pytest.raises(RuntimeError):
+        with repo.transaction():
+            repo.add(Item('outer'))
+            with pytest.raises(KeyError):
+                with repo.transaction():
+                    repo.add(Item('inner'))
+                    raise KeyError
+            assert [item.name for item in repo.get_all()] == ['outer']
+            raise RuntimeError
+    assert repo.get_all() == []
+    with repo.transaction():
+        with repo.transaction():
+            repo.add(Item('committed'))
+    assert len(repo.get_all()) == 1
+
+
+def test_observable_events_deferred():
+    bus = EventBus()
+    events = []
+    bus.subscribe(Item, ADDED, lambda obj: events.append(('added', obj.name)))
+    bus.subscribe(Item, DELETED, lambda pk: events.append(('deleted', pk)))
+    repo = ObservableRepository(MemoryRepository(), bus, Item)
+    with repo.transaction():
+        repo.add(Item('a'))
+        with pytest.raises(RuntimeError):
+            with repo.transaction():
+                repo.add(Item('b'))
+                raise RuntimeError
+        assert events == []
+        repo.delete(1)
+    assert events == [('added', 'a'), ('deleted', 1)]
+    with pytest.raises(RuntimeError):
+        with repo.transaction():
+            repo.add(Item('c'))
+            raise RuntimeError
+    assert len(events) == 2
+
+
+def test_decorators_recover_after_rollback():
+    memory = MemoryRepository()
+    cached = CachingRepository(memory)
+    hierarchy = CategoryHierarchyRepository(cached)
+    top = Category('top')
+    hierarchy.add(top)
+    with pytest.raises(RuntimeError):
+        with transaction([hierarchy]):
+            child = Category('child', parent=top.pk)
+            hierarchy.add(child)
+            assert cached.get_all() == [top, child]
+            raise RuntimeError
+    assert cached.get_all() == [top]
+    assert len(hierarchy.hierarchy) == 1
@@ -0,0 +1,123 @@
+from datetime import date, datetime
+
+import pytest
+
+from bookkeeper.models.budget import Budget
+from bookkeeper.models.expense import Expense
+from bookkeeper.repository.memory_repository import MemoryRepository
+from bookkeeper.spend_totals import (
+    SpendTotals, fill_budgets, latest_budgets, period_start
+)
+
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    # среда
+    return Clock(datetime(2023, 3, 15, 12, 0))
+
+
+@pytest.fixture
+def totals(clock):
+    return SpendTotals(clock)
+
+
+def test_period_start():
+    moment = datetime(2023, 3, 15, 12, 0)
+    assert period_start('day', moment) == date(2023, 3, 15)
+    assert period_start('week', moment) == date(2023, 3, 13)
+    assert period_start('month', moment) == date(2023, 3, 1)
+    assert period_start('day', '15-03-2023') == date(2023, 3, 15)
+    assert period_start('day', '2023-03-15 10:00:00') == date(2023, 3, 15)
+    with pytest.raises(ValueError):
+        period_start('year', moment)
+
+
+def test_add_and_total(totals):
+    totals.add(Expense(100, 1, expense_date=datetime(2023, 3, 15, 9, 0)))
+    totals.add(Expense(50, 1, expense_date=datetime(2023, 3, 13)))
+    totals.add(Expense(20, 1, expense_date=datetime(2023, 3, 2)))
+    totals.add(Expense(7, 1, expense_date=datetime(2023, 2, 28)))
+    assert totals.total('day') == 100
+    assert totals.total('week') == 150
+    assert totals.total('month') == 170
+    assert totals.total('day', datetime(2023, 3, 13)) == 0
+
+
+def test_replace_and_remove(totals):
+    old = Expense(100, 1, expense_date=datetime(2023, 3, 15))
+    totals.add(old)
+    new = Expense(30, 1, expense_date=datetime(2023, 3, 14), pk=old.pk)
+    totals.replace(old, new)
+    assert totals.total('day') == 0
+    assert totals.total('week') == 30
+    totals.remove(new)
+    assert totals.total('month') == 0
+
+
+def test_lazy_rollover(totals, clock):
+    totals.add(Expense(100, 1, expense_date=datetime(2023, 3, 15)))
+    totals.add(Expense(40, 1, expense_date=datetime(2023, 3, 16)))
+    clock.now = datetime(2023, 3, 16, 8, 0)
+    assert totals.total('day') == 40
+    assert totals.total('week') == 140
+    clock.now = datetime(2023, 4, 1)
+    assert totals.total('day') == 0
+    assert totals.total('month') == 0
+    # расход в прошедшем периоде не учитывается
+    totals.add(Expense(10, 1, expense_date=datetime(2023, 3, 31)))
+    assert totals.total('month') == 0
+
+
+def test_earliest_start(totals, clock):
+    assert totals.earliest_start() == datetime(2023, 3, 1)
+    clock.now = datetime(2023, 4, 1)
+    assert totals.earliest_start() == datetime(2023, 3, 27)
+
+
+def test_check_and_rebuild(totals, clock):
+    expenses = [Expense(100, 1, expense_date=datetime(2023, 3, 15)),
+                Expense(10, 1, expense_date=datetime(2023, 3, 14))]
+    for e in expenses:
+        totals.add(e)
+    assert totals.check(expenses) == {}
+    totals.add(Expense(5, 1, expense_date=datetime(2023, 3, 15)))
+    assert totals.check(expenses) == {('day', date(2023, 3, 15)): 5,
+                                      ('week', date(2023, 3, 13)): 5,
+                                      ('month', date(2023, 3, 1)): 5}
+    totals.rebuild(expenses)
+    assert totals.check(expenses) == {}
+    assert totals.total('week') == 110
+    assert SpendTotals.from_expenses(expenses, clock).total('month') == 110
+
+
+def test_rebuild_from_daily(totals, clock):
+    totals.rebuild_from_daily({'2023-03-14': 10, date(2023, 3, 15): 100,
+                               '2023-02-28': 1000})
+    assert totals.total('day') == 100
+    assert totals.total('week') == 110
+    assert totals.total('month') == 110
+
+
+def test_from_repository_and_budgets(clock):
+    expense_repo = MemoryRepository()
+    expense_repo.add_many([Expense(100, 1, expense_date=datetime(2023, 3, 15, 9, 0)),
+                           Expense(50, 1, expense_date=datetime(2023, 3, 13)),
+                           Expense(7, 1, expense_date=datetime(2023, 2, 28))])
+    totals = SpendTotals.from_repository(expense_repo, clock)
+    assert (totals.total('day'), totals.total('week'), totals.total('month')) \
+        == (100, 150, 150)
+    budget_repo = MemoryRepository()
+    budget_repo.add_many([Budget(0, 500, "Неделя", end=datetime(2023, 3, 20)),
+                          Budget(0, 900, "Неделя", end=datetime(2023, 3, 27)),
+                          Budget(0, 100, "День", end=datetime(2023, 3, 16))])
+    budgets = fill_budgets(latest_budgets(budget_repo), totals)
+    assert [(budget.duration, budget.limits, budget.amount) for budget in budgets] \
+        == [("День", 100, 100), ("Неделя", 900, 150)]
@@ -1,9 +1,13 @@
 import tempfile
+from datetime import date, datetime
 from textwrap import dedent
 
 import pytest
 
-from bookkeeper.utils import read_tree
+from bookkeeper.models.category import Category
+from bookkeeper.utils import (
+    CategoryTree, build_dict_tree_from_list, read_tree, to_datetime
+)
 
 
 def test_create_tree():
@@ -71,3 +75,61 @@ def test_with_file():
             ('child2', 'parent1'),
             ('parent2', None)
         ]
+
+
+def test_to_datetime():
+    moment = datetime(2023, 3, 15, 10, 30)
+    assert to_datetime(moment) is moment
+    assert to_datetime(date(2023, 3, 15)) == datetime(2023, 3, 15)
+    assert to_datetime('2023-03-15 10:30:00') == moment
+    assert to_datetime('15-03-2023') == datetime(2023, 3, 15)
+    with pytest.raises(ValueError):
+        to_datetime('15.03.2023')
+
+
+def test_build_dict_tree_from_unsorted_list():
+    cats = [Category('сырое мясо', 2, 3), Category('продукты', None, 1),
+            Category('мясо', 1, 2), Category('книги', None, 4),
+            Category('сирота', 100, 5)]
+    assert build_dict_tree_from_list(cats) == {
+        1: {'name': 'продукты', 2: {'name': 'мясо', 3: {'name': 'сырое мясо'}}},
+        4: {'name': 'книги'},
+    }
+
+
+def test_category_tree_index():
+    tree = CategoryTree([Category('a', None, 1), Category('b', 1, 2),
+                         Category('c', 2, 3), Category('d', None, 4)])
+    assert len(tree) == 4
+    assert 5 not in tree
+    assert tree.get(3) == {'name': 'c'}
+    assert tree.get(5) is None
+    assert tree.parent(3) == 2
+    assert tree.parent(1) is None
+
+    tree.set(Category('e', 3, 5))
+    assert tree.get(3) == {'name': 'c', 5: {'name': 'e'}}
+    tree.set(Category('b2', 4, 2))
+    assert tree.tree == {1: {'name': 'a'},
+                         4: {'name': 'd', 2: {'name': 'b2', 3: {'name': 'c',
+                                                                5: {'name': 'e'}}}}}
+    with pytest.raises(ValueError):
+        tree.set(Category('d', 5, 4))
+    tree.set(Category('x', 100, 6))
+    assert 6 not in tree
+
+    tree.delete(2)
+    assert tree.tree == {1: {'name': 'a'}, 4: {'name': 'd'}}
+    assert len(tree) == 2
+    assert tree.get(5) is None
+
+
+def test_category_tree_preorder():
+    tree = CategoryTree([Category('c', 2, 3), Category('a', None, 1),
+                         Category('d', None, 4), Category('b', 1, 2),
+                         Category('e', 1, 5)])
+    order = tree.preorder()
+    assert sorted(order) == [1, 2, 3, 4, 5]
+    for pk in order:
+        parent = tree.parent(pk)
+        assert parent is None or order.index(parent) < order.index(pk)